@@ -0,0 +1,109 @@
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from dotenv import load_dotenv
+
+load_dotenv("../secret.env")
+
+# Configurazione (sovrascrivibile da secret.env)
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "8"))     # run dell'agente in parallelo
+AGENT_QUEUE_SIZE = int(os.getenv("AGENT_QUEUE_SIZE", "32"))  # richieste in attesa prima del 429
+
+
+class AgentPoolFull(Exception):
+    """Raised when the admission queue is full and the request must be rejected."""
+
+
+class AgentPool:
+    """
+    Dedicated thread pool for the (synchronous) agent runs, so the event loop stays free.
+    At most `size` runs execute at once and at most `queue_size` more wait for a worker;
+    beyond that `submit` raises AgentPoolFull instead of piling up work.
+    """
+
+    def __init__(self, size: int = AGENT_POOL_SIZE, queue_size: int = AGENT_QUEUE_SIZE):
+        self.size = size
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="agent")
+        self._lock = threading.Lock()
+
+        # Metriche
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._cancelled = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+
+    def start(self, fn: Callable[..., Any], *args) -> "asyncio.Future":
+        """
+        Admits the job (or raises AgentPoolFull right away) and schedules it on the pool.
+        Returns the asyncio future of the run, useful when the caller must keep working
+        (e.g. streaming events) while the agent is running.
+        """
+        with self._lock:
+            if self._queued + self._running >= self.size + self.queue_size:
+                self._rejected += 1
+                raise AgentPoolFull(f"Agent pool saturated ({self.size} running, {self._queued} queued)")
+            self._queued += 1
+
+        enqueued_at = time.monotonic()
+
+        def _job():
+            started_at = time.monotonic()
+            waited = started_at - enqueued_at
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._run_total += time.monotonic() - started_at
+
+        def _release(future):
+            # Cancellato prima di partire (es. client disconnesso mentre era in coda):
+            # _job non girerà mai, il posto in coda va liberato qui
+            if future.cancelled():
+                with self._lock:
+                    self._queued -= 1
+                    self._cancelled += 1
+
+        future = self._executor.submit(_job)
+        future.add_done_callback(_release)
+        return asyncio.wrap_future(future)
+
+    async def submit(self, fn: Callable[..., Any], *args) -> Any:
+        return await self.start(fn, *args)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            started = self._completed + self._running
+            return {
+                "pool_size": self.size,
+                "queue_size": self.queue_size,
+                "running": self._running,
+                "queued": self._queued,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "cancelled_in_queue": self._cancelled,
+                "avg_wait_ms": round(1000 * self._wait_total / started, 1) if started else 0.0,
+                "max_wait_ms": round(1000 * self._wait_max, 1),
+                "avg_run_ms": round(1000 * self._run_total / self._completed, 1) if self._completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Istanza condivisa dal backend
+agent_pool = AgentPool()
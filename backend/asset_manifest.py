@@ -0,0 +1,181 @@
+"""
+Persisted manifest of a photo directory (backend/assets by default), so the generators, seed_db.py
+and the renovation input stage never list or re-read the raw directory. For every image:
+    name, category (filename prefix: "living_12.jpg" -> "living"), width, height, bytes, mtime, sha256
+plus the cached vision analyses, per content hash (the same photo under two names is analyzed once).
+refresh() is incremental: only files whose mtime or size changed are read again (hash + image
+header), deleted files are dropped. Stored in SQLite next to the directory (<directory>.manifest.db).
+In the backend the lookups are read-only: start() refreshes in a background task (at startup, then
+every ASSET_MANIFEST_REFRESH_INTERVAL seconds), never in the request path.
+"""
+
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PIL import Image
+from dotenv import load_dotenv
+
+load_dotenv("../secret.env")
+
+ASSETS_DIR = Path(__file__).parent / "assets"
+# Ogni quanto (secondi) il task in background del backend ricontrolla la cartella
+ASSET_MANIFEST_REFRESH_INTERVAL = int(os.getenv("ASSET_MANIFEST_REFRESH_INTERVAL", "300"))
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def category_of(filename: str) -> str:
+    return filename.split("_")[0].lower()
+
+
+class AssetManifest:
+
+    def __init__(self, directory=ASSETS_DIR, path: Optional[str] = None):
+        self.directory = str(directory).rstrip("/\\")
+        self.path = path or f"{self.directory}.manifest.db"
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS assets (
+                name TEXT PRIMARY KEY, category TEXT NOT NULL, width INTEGER, height INTEGER,
+                bytes INTEGER NOT NULL, mtime REAL NOT NULL, sha256 TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_assets_sha256 ON assets(sha256);
+            CREATE TABLE IF NOT EXISTS analyses (sha256 TEXT PRIMARY KEY, analysis TEXT NOT NULL);
+        """)
+        self._db.commit()
+        self._refreshed_at: Optional[float] = None
+        self._task = None
+        # Indici in memoria (ricostruiti a ogni refresh, sostituiti in blocco)
+        self._by_name: Dict[str, Dict] = {}
+        self._by_hash: Dict[str, str] = {}
+        self._load()
+
+    # --- Aggiornamento ---
+    def _load(self) -> None:
+        with self._lock:
+            rows = self._db.execute("SELECT name, category, width, height, bytes, mtime, sha256 FROM assets").fetchall()
+        by_name, by_hash = {}, {}
+        for name, category, width, height, size, mtime, sha256 in rows:
+            by_name[name] = {"name": name, "category": category, "width": width, "height": height,
+                             "bytes": size, "mtime": mtime, "sha256": sha256}
+            by_hash.setdefault(sha256, name)
+        self._by_name, self._by_hash = by_name, by_hash
+
+    @staticmethod
+    def _read(path: str) -> tuple:
+        with open(path, "rb") as f:
+            data = f.read()
+        try:
+            # Solo l'header: Image.open non decodifica i pixel
+            with Image.open(BytesIO(data)) as img:
+                width, height = img.size
+        except Exception:
+            width, height = None, None
+        return hashlib.sha256(data).hexdigest(), width, height
+
+    def refresh(self) -> Dict:
+        """Brings the manifest in line with the directory, reading only new or modified files."""
+        with self._refresh_lock:
+            return self._refresh()
+
+    def _refresh(self) -> Dict:
+        started = time.monotonic()
+        known = {name: (record["mtime"], record["bytes"]) for name, record in self._by_name.items()}
+        seen, changed = set(), []
+        if os.path.isdir(self.directory):
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    st = entry.stat()
+                    seen.add(entry.name)
+                    if known.get(entry.name) != (st.st_mtime, st.st_size):
+                        changed.append((entry.name, entry.path, st))
+
+        rows = []
+        for name, path, st in changed:
+            sha256, width, height = self._read(path)
+            rows.append((name, category_of(name), width, height, st.st_size, st.st_mtime, sha256))
+        removed = [name for name in known if name not in seen]
+
+        if rows or removed:
+            with self._lock:
+                self._db.executemany("INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self._db.executemany("DELETE FROM assets WHERE name = ?", [(name,) for name in removed])
+                self._db.commit()
+            self._load()
+        self._refreshed_at = time.monotonic()
+
+        added = sum(1 for name, _, _ in changed if name not in known)
+        return {"assets": len(self._by_name), "added": added, "updated": len(changed) - added,
+                "removed": len(removed), "seconds": round(time.monotonic() - started, 2)}
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            try:
+                # Scansione e hash in un thread: le lookup intanto usano l'indice precedente
+                result = await asyncio.to_thread(self.refresh)
+                if result["added"] or result["updated"] or result["removed"]:
+                    print(f"🗂️  Asset manifest: {result}")
+            except Exception as e:
+                print(f"⚠️ Asset manifest refresh failed: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float = ASSET_MANIFEST_REFRESH_INTERVAL) -> None:
+        """Keeps the manifest in sync from a background task (called from the event loop)."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(interval))
+
+    # --- Lookup ---
+    def get(self, name: str) -> Optional[Dict]:
+        record = self._by_name.get(name)
+        return dict(record, path=os.path.join(self.directory, name)) if record else None
+
+    def path_of(self, name: str) -> Optional[str]:
+        return os.path.join(self.directory, name) if name in self._by_name else None
+
+    def path_for_hash(self, sha256: str) -> Optional[str]:
+        name = self._by_hash.get(sha256)
+        return os.path.join(self.directory, name) if name else None
+
+    def categories(self) -> Dict[str, List[str]]:
+        """category -> sorted filenames."""
+        buckets: Dict[str, List[str]] = {}
+        for name in sorted(self._by_name):
+            buckets.setdefault(self._by_name[name]["category"], []).append(name)
+        return buckets
+
+    # --- Analisi visive ---
+    def get_analysis(self, sha256: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT analysis FROM analyses WHERE sha256 = ?", (sha256,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_analysis(self, sha256: str, analysis: dict) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO analyses VALUES (?, ?)", (sha256, json.dumps(analysis)))
+            self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            analyses = self._db.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+        records = list(self._by_name.values())
+        return {
+            "assets": len(records),
+            "unique_contents": len(self._by_hash),
+            "bytes": sum(r["bytes"] for r in records),
+            "analyses": analyses,
+        }
+
+
+# Istanza condivisa dal backend (backend/assets)
+asset_manifest = AssetManifest()
@@ -0,0 +1,226 @@
+"""
+In-memory columnar property catalog (optional, CATALOG_IN_MEMORY=true).
+Loads the `property_cards` read model once at startup: numeric fields live in NumPy
+arrays, zone/city/specs are dictionary encoded, so filter + sort run vectorized without
+a database round trip. Rows are refreshed one by one from the catalog_changed notifications.
+"""
+
+import os
+import json
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+load_dotenv("../secret.env")
+
+CATALOG_IN_MEMORY = os.getenv("CATALOG_IN_MEMORY", "false").lower() == "true"
+
+NUMERIC_COLUMNS = ["price", "sqm", "rooms", "bathrooms", "floor"]
+
+CATALOG_QUERY = """
+    SELECT
+        p.id::text AS id, p.title, p.city, p.zone, p.address, p.price,
+        p.rooms, p.bathrooms, p.sqm, p.floor, p.total_floors, p.elevator,
+        p.specs, p.description_ai, p.main_image, p.images, p.ai_vibe_tags, p.gallery
+    FROM property_cards p
+"""
+
+SORT_KEYS = {"price_asc": ("price", False), "price_desc": ("price", True), "sqm_desc": ("sqm", True)}
+
+
+class _Dictionary:
+    """Case-insensitive string -> int code mapping (code -1 = missing)."""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value) -> int:
+        if value is None or value == "":
+            return -1
+        key = str(value).strip().lower()
+        if key not in self.codes:
+            self.codes[key] = len(self.codes)
+        return self.codes[key]
+
+    def lookup(self, value) -> Optional[int]:
+        return self.codes.get(str(value).strip().lower())
+
+
+class PropertyCatalog:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.ready = False
+        self._engine = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._cards: List[dict] = []
+        self._row_of: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._num = {c: np.zeros(0, dtype=np.float64) for c in NUMERIC_COLUMNS}
+        self._elevator = np.zeros(0, dtype=np.int8)   # 1 / 0 / -1 (sconosciuto)
+        self._zone = np.zeros(0, dtype=np.int32)
+        self._city = np.zeros(0, dtype=np.int32)
+        self._specs: Dict[str, np.ndarray] = {}
+        self._zone_dict, self._city_dict = _Dictionary(), _Dictionary()
+        self._specs_dict: Dict[str, _Dictionary] = {}
+
+    # --- Caricamento ---
+    def load(self, engine) -> None:
+        self._engine = engine
+        with engine.connect() as conn:
+            rows = [dict(r) for r in conn.execute(text(CATALOG_QUERY)).mappings()]
+
+        with self._lock:
+            self._reset()
+            n = len(rows)
+            self._alive = np.ones(n, dtype=bool)
+            self._num = {c: np.full(n, np.nan) for c in NUMERIC_COLUMNS}
+            self._elevator = np.full(n, -1, dtype=np.int8)
+            self._zone = np.full(n, -1, dtype=np.int32)
+            self._city = np.full(n, -1, dtype=np.int32)
+            self._cards = [None] * n
+            for i, row in enumerate(rows):
+                self._write_row(i, row)
+            self.ready = True
+        print(f"🗂️  In-memory catalog loaded: {n} properties")
+
+    def refresh(self, property_id: Optional[str]) -> None:
+        """Re-reads a single property (or everything when property_id is None)."""
+        if self._engine is None:
+            return
+        if property_id is None:
+            self.load(self._engine)
+            return
+
+        with self._engine.connect() as conn:
+            row = conn.execute(text(CATALOG_QUERY + " WHERE p.id = CAST(:id AS uuid)"), {"id": property_id}).mappings().first()
+
+        with self._lock:
+            i = self._row_of.get(property_id)
+            if row is None:
+                if i is not None:
+                    self._alive[i] = False
+                    del self._row_of[property_id]
+                return
+            if i is None:
+                i = self._append_slot()
+            self._write_row(i, dict(row))
+
+    def on_catalog_change(self, table: str, property_id: Optional[str]) -> None:
+        if not self.ready:
+            return
+        try:
+            self.refresh(None if table == "*" else property_id)
+        except Exception as e:
+            print(f"⚠️ Catalog refresh failed: {e}")
+
+    # --- Ricerca ---
+    def search(self, city=None, zone=None, min_price=None, max_price=None, min_rooms=None, max_rooms=None,
+               min_bathrooms=None, min_sqm=None, elevator=None, specs=None, sort="price_asc", limit=5) -> List[dict]:
+        with self._lock:
+            mask = self._alive.copy()
+
+            for value, dictionary, column in ((city, self._city_dict, self._city), (zone, self._zone_dict, self._zone)):
+                if value:
+                    code = dictionary.lookup(value)
+                    if code is None:
+                        return []
+                    mask &= column == code
+
+            for column, low, high in (("price", min_price, max_price), ("rooms", min_rooms, max_rooms),
+                                      ("bathrooms", min_bathrooms, None), ("sqm", min_sqm, None)):
+                if low is not None:
+                    mask &= self._num[column] >= low
+                if high is not None:
+                    mask &= self._num[column] <= high
+
+            if elevator is not None:
+                mask &= self._elevator == (1 if elevator else 0)
+
+            for key, value in (specs or {}).items():
+                dictionary = self._specs_dict.get(key)
+                code = dictionary.lookup(value) if dictionary else None
+                if code is None:
+                    return []
+                mask &= self._specs[key] == code
+
+            idx = np.flatnonzero(mask)
+            column, descending = SORT_KEYS.get(sort, SORT_KEYS["price_asc"])
+            values = self._num[column][idx]
+            # NaN sempre in fondo, anche in ordine decrescente
+            order = np.argsort(-values if descending else values, kind="stable")
+            top = idx[order[:max(1, min(int(limit), 20))]]
+            return [dict(self._cards[i]) for i in top]
+
+    def get_cards(self, property_ids: List[str]) -> List[dict]:
+        with self._lock:
+            return [dict(self._cards[self._row_of[pid]]) for pid in property_ids if pid in self._row_of]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": CATALOG_IN_MEMORY,
+                "ready": self.ready,
+                "properties": int(self._alive.sum()),
+                "zones": len(self._zone_dict.codes),
+                "cities": len(self._city_dict.codes),
+                "spec_keys": sorted(self._specs_dict),
+            }
+
+    # --- Interni (da chiamare con il lock acquisito) ---
+    def _append_slot(self) -> int:
+        i = len(self._cards)
+        self._cards.append(None)
+        if i >= len(self._alive):
+            # Crescita a raddoppio: gli inserimenti durante un seed restano O(1) ammortizzati
+            self._grow(max(16, 2 * len(self._alive)))
+        return i
+
+    def _grow(self, capacity: int) -> None:
+        def grown(array: np.ndarray, fill) -> np.ndarray:
+            out = np.full(capacity, fill, dtype=array.dtype)
+            out[:len(array)] = array
+            return out
+
+        self._alive = grown(self._alive, False)
+        self._num = {c: grown(a, np.nan) for c, a in self._num.items()}
+        self._elevator = grown(self._elevator, -1)
+        self._zone = grown(self._zone, -1)
+        self._city = grown(self._city, -1)
+        self._specs = {k: grown(a, -1) for k, a in self._specs.items()}
+
+    def _write_row(self, i: int, row: dict) -> None:
+        specs = row.get("specs") or {}
+        if isinstance(specs, str):
+            specs = json.loads(specs)
+
+        images = list(row.get("images") or [])
+        card = {**row, "specs": specs, "images": images, "main_image": row.get("main_image") or (images[0] if images else None)}
+        self._cards[i] = card
+        self._row_of[card["id"]] = i
+        self._alive[i] = True
+
+        for c in NUMERIC_COLUMNS:
+            self._num[c][i] = np.nan if row.get(c) is None else row[c]
+        self._elevator[i] = -1 if row.get("elevator") is None else int(bool(row["elevator"]))
+        self._zone[i] = self._zone_dict.encode(row.get("zone"))
+        self._city[i] = self._city_dict.encode(row.get("city"))
+
+        for key in self._specs:
+            self._specs[key][i] = -1
+        for key, value in specs.items():
+            if isinstance(value, (dict, list)):
+                continue
+            if key not in self._specs:
+                self._specs_dict[key] = _Dictionary()
+                self._specs[key] = np.full(len(self._alive), -1, dtype=np.int32)
+            self._specs[key][i] = self._specs_dict[key].encode(value)
+
+
+# Istanza condivisa dal backend
+property_catalog = PropertyCatalog()
@@ -0,0 +1,73 @@
+"""
+Catalog change notifications.
+The triggers in schema.sql send a NOTIFY on `catalog_changed` for every write to
+`properties` / `property_images` (payload: "<table>:<property_id>"), whoever the writer is
+(seed_db.py, SQL editor, future services). A background thread LISTENs and calls the
+registered subscribers, so in-process caches can be invalidated.
+After a reconnect (notifications may have been lost) subscribers get a "*"; the first connect
+at startup does not send one, the caches are loaded fresh anyway.
+Bulk loads (scripts/bulk_load.py) mute the per-row notifications and send a single "*:".
+"""
+
+import select
+import threading
+import time
+from typing import Callable, List, Optional
+
+import psycopg2
+
+CHANNEL = "catalog_changed"
+
+_subscribers: List[Callable[[str, Optional[str]], None]] = []
+_listener: Optional[threading.Thread] = None
+
+
+def subscribe(callback: Callable[[str, Optional[str]], None]) -> None:
+    """Registers `callback(table, property_id)`; property_id is None for bulk changes."""
+    _subscribers.append(callback)
+
+
+def publish(table: str, property_id: Optional[str] = None) -> None:
+    """Dispatches a change to the subscribers of this process."""
+    for callback in _subscribers:
+        try:
+            callback(table, property_id)
+        except Exception as e:
+            print(f"⚠️ Catalog subscriber failed: {e}")
+
+
+def _listen_forever(db_uri: str) -> None:
+    connected_before = False
+    while True:
+        try:
+            conn = psycopg2.connect(db_uri)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CHANNEL};")
+            print(f"👂 Listening for catalog changes on '{CHANNEL}'")
+
+            # Riconnessione: potremmo aver perso notifiche, meglio invalidare tutto
+            # (non al primo avvio: evita per esempio di ri-calcolare gli embedding di tutto il catalogo)
+            if connected_before:
+                publish("*", None)
+            connected_before = True
+
+            while True:
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    note = conn.notifies.pop(0)
+                    table, _, property_id = note.payload.partition(":")
+                    publish(table or "*", property_id or None)
+        except Exception as e:
+            print(f"⚠️ Catalog listener error: {e}. Retrying in 5s...")
+            time.sleep(5)
+
+
+def start_listener(db_uri: str) -> None:
+    global _listener
+    if _listener is not None:
+        return
+    _listener = threading.Thread(target=_listen_forever, args=(db_uri,), name="catalog-listener", daemon=True)
+    _listener.start()
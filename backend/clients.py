@@ -0,0 +1,157 @@
+"""
+Shared outbound client layer.
+- One pooled keep-alive `requests.Session` (per-host connection limit, retries with jittered backoff).
+- One process-wide Google GenAI client, with a cap on concurrent calls to the API host.
+- Circuit breakers that remember an unavailable model and skip it until a probe succeeds.
+"""
+
+import os
+import time
+import random
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+load_dotenv("../secret.env")
+
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "2"))
+BREAKER_RESET_SECONDS = int(os.getenv("BREAKER_RESET_SECONDS", "300"))
+
+TRANSIENT_STATUS = (429, 500, 502, 503, 504)
+
+
+# --- HTTP (download immagini, ecc.) ---
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        backoff_jitter=0.3,
+        status_forcelist=TRANSIENT_STATUS,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        raise_on_status=False,
+    )
+    # pool_block: oltre il limite per host si aspetta una connessione libera invece di aprirne altre
+    adapter = HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=HTTP_MAX_CONNECTIONS_PER_HOST,
+        pool_block=True,
+        max_retries=retry,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": "immobiliare-ai-backend"})
+    return session
+
+
+http_session = _build_session()
+
+
+# --- GOOGLE GENAI ---
+_genai_client = None
+_genai_lock = threading.Lock()
+_genai_slots = threading.BoundedSemaphore(GEMINI_MAX_CONCURRENCY)
+
+
+def get_genai_client():
+    """Process-wide GenAI client (its HTTP connections are reused across calls)."""
+    global _genai_client
+    if _genai_client is None:
+        with _genai_lock:
+            if _genai_client is None:
+                from google import genai
+                _genai_client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+    return _genai_client
+
+
+def is_transient(error: Exception) -> bool:
+    """Rate limits, 5xx and network timeouts are worth a retry; anything else is not."""
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code in TRANSIENT_STATUS:
+        return True
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, TimeoutError, ConnectionError))
+
+
+def call_with_retry(fn: Callable[[], Any], attempts: int = 3, base_delay: float = 1.0, max_delay: float = 10.0) -> Any:
+    """Calls `fn`, retrying transient errors with exponential backoff and full jitter."""
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_transient(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            print(f"🔁 Transient error ({e}), retry {attempt + 1}/{attempts - 1} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def genai_generate(**kwargs) -> Any:
+    """models.generate_content on the shared client, within the concurrency cap and with retries."""
+    def _call():
+        with _genai_slots:
+            return get_genai_client().models.generate_content(**kwargs)
+    return call_with_retry(_call)
+
+
+# --- CIRCUIT BREAKER ---
+class CircuitBreaker:
+    """
+    closed -> (N consecutive failures) -> open -> (after reset_seconds) -> half-open:
+    a single probe call is allowed; success closes the circuit, failure reopens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                print(f"🩺 Probing {self.name}...")
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                print(f"✅ {self.name} is back, circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    print(f"🚫 {self.name} unavailable, circuit open for {self.reset_seconds}s")
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"name": self.name, "state": self.state, "consecutive_failures": self._failures}
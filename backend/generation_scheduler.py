@@ -0,0 +1,198 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv("../secret.env")
+
+# Configurazione (sovrascrivibile da secret.env)
+GENERATION_MAX_CONCURRENCY = int(os.getenv("GENERATION_MAX_CONCURRENCY", "4"))   # render in parallelo, in tutto il processo
+GENERATION_RATE_PER_MINUTE = float(os.getenv("GENERATION_RATE_PER_MINUTE", "30"))  # avvii al minuto (token bucket)
+GENERATION_BURST = int(os.getenv("GENERATION_BURST", "8"))                        # avvii consecutivi concessi a bucket pieno
+
+# Priorità: valore più basso = servito prima
+PRIORITY_ROOM = 0
+PRIORITY_HOUSE = 1
+PRIORITY_NAMES = {PRIORITY_ROOM: "room", PRIORITY_HOUSE: "house"}
+
+
+class TokenBucket:
+    """`rate` tokens per second, up to `capacity`. Not thread-safe: used from the event loop only."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self) -> bool:
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def refund(self) -> None:
+        self._tokens = min(self.capacity, self._tokens + 1)
+
+    def wait_time(self) -> float:
+        """Seconds until the next token is available."""
+        self._refill()
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+
+class _Task:
+    __slots__ = ("fn", "args", "user", "priority", "future", "enqueued_at")
+
+    def __init__(self, fn, args, user, priority, future):
+        self.fn = fn
+        self.args = args
+        self.user = user
+        self.priority = priority
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+def _percentile(samples: Deque[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return round(1000 * ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+
+class GenerationScheduler:
+    """
+    Process-wide scheduler for the image generations (Gemini calls).
+    - at most `max_concurrency` renders at once, on a dedicated pool of the same size
+    - starts limited by a token bucket (`rate_per_minute`, bursts up to `burst`)
+    - single-room requests are served before house-mode ones
+    - within a priority, users are served round-robin: one render each, in turn,
+      so a house-mode request cannot occupy every slot while others wait
+    Lives in the event loop: queueing and dispatching need no locks.
+    """
+
+    def __init__(self, max_concurrency: int = GENERATION_MAX_CONCURRENCY,
+                 rate_per_minute: float = GENERATION_RATE_PER_MINUTE, burst: int = GENERATION_BURST):
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="render")
+        self._bucket = TokenBucket(rate_per_minute / 60.0, burst)
+        # priorità -> utente -> coda FIFO; l'ordine degli utenti è il turno del round-robin
+        self._queues: Dict[int, "OrderedDict[str, Deque[_Task]]"] = {p: OrderedDict() for p in PRIORITY_NAMES}
+        self._running = 0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+        # Metriche
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._throttled = 0
+        self._waits: Deque[float] = deque(maxlen=500)
+        self._runs: Deque[float] = deque(maxlen=500)
+
+    async def submit(self, fn: Callable[..., Any], *args, user: str = "anonymous",
+                     priority: int = PRIORITY_ROOM) -> Any:
+        """Queues `fn(*args)` and returns its result once a slot (and a token) is available."""
+        task = _Task(fn, args, user, priority, asyncio.get_running_loop().create_future())
+        self._queues[priority].setdefault(user, deque()).append(task)
+        self._submitted += 1
+        self._dispatch()
+        # Se il chiamante viene cancellato (es. job annullato) il task in coda viene saltato
+        return await task.future
+
+    def _next_task(self) -> Optional[_Task]:
+        for priority in sorted(self._queues):
+            users = self._queues[priority]
+            while users:
+                user, queue = next(iter(users.items()))
+                task = queue.popleft()
+                # L'utente servito passa in fondo al turno (o esce se non ha altro in coda)
+                del users[user]
+                if queue:
+                    users[user] = queue
+                if task.future.cancelled():
+                    self._cancelled += 1
+                    continue
+                return task
+        return None
+
+    def _has_queued(self) -> bool:
+        return any(users for users in self._queues.values())
+
+    def _on_wakeup(self) -> None:
+        self._wakeup = None
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._running < self.max_concurrency and self._has_queued():
+            if not self._bucket.try_take():
+                # Rate limit: riproviamo quando sarà disponibile il prossimo token (un solo timer alla volta)
+                if self._wakeup is None:
+                    self._throttled += 1
+                    self._wakeup = asyncio.get_running_loop().call_later(self._bucket.wait_time(), self._on_wakeup)
+                return
+            task = self._next_task()
+            if task is None:
+                # Erano tutti task annullati: il token non è stato usato
+                self._bucket.refund()
+                return
+            self._start(task)
+
+    def _start(self, task: _Task) -> None:
+        loop = asyncio.get_running_loop()
+        started_at = time.monotonic()
+        self._waits.append(started_at - task.enqueued_at)
+        self._running += 1
+
+        def _done(result: "asyncio.Future") -> None:
+            self._running -= 1
+            self._runs.append(time.monotonic() - started_at)
+            if result.exception() is not None:
+                self._failed += 1
+                if not task.future.done():
+                    task.future.set_exception(result.exception())
+            else:
+                self._completed += 1
+                if not task.future.done():
+                    task.future.set_result(result.result())
+            self._dispatch()
+
+        loop.run_in_executor(self._executor, task.fn, *task.args).add_done_callback(_done)
+
+    def stats(self) -> Dict:
+        queued = {PRIORITY_NAMES[p]: sum(len(q) for q in users.values()) for p, users in self._queues.items()}
+        waiting_users = {user for users in self._queues.values() for user in users}
+        return {
+            "max_concurrency": self.max_concurrency,
+            "rate_per_minute": round(self._bucket.rate * 60, 1),
+            "tokens": round(self._bucket.tokens, 2),
+            "running": self._running,
+            "queued": queued,
+            "waiting_users": len(waiting_users),
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "cancelled": self._cancelled,
+            "throttled": self._throttled,
+            "p50_wait_ms": _percentile(self._waits, 0.50),
+            "p95_wait_ms": _percentile(self._waits, 0.95),
+            "p50_run_ms": _percentile(self._runs, 0.50),
+            "p95_run_ms": _percentile(self._runs, 0.95),
+        }
+
+
+# Istanza condivisa dal backend
+generation_scheduler = GenerationScheduler()
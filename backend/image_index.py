@@ -0,0 +1,218 @@
+"""
+Visual similarity index over the room photos in backend/assets.
+For every file we precompute once (python image_index.py):
+- dhash / phash: 64-bit perceptual hashes (near-duplicate detection via Hamming distance)
+- color: 32-bin HSV histogram, texture: 8-bin gradient orientation histogram
+Features are stored in a structured .npy opened memory-mapped, plus a JSON sidecar with the
+filenames, so queries never decode a JPEG.
+"""
+
+import os
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image, ImageOps
+
+BASE_DIR = Path(__file__).parent
+ASSETS_DIR = BASE_DIR / "assets"
+INDEX_FILE = BASE_DIR / "image_index.npy"
+NAMES_FILE = BASE_DIR / "image_index.json"
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+CATEGORIES = ("living", "kitchen", "bed", "bath", "din")
+
+FEATURE_DTYPE = np.dtype([
+    ("dhash", "<u8"),
+    ("phash", "<u8"),
+    ("color", "<f4", (32,)),
+    ("texture", "<f4", (8,)),
+])
+
+# Matrice DCT-II 32x32 per il phash (evitiamo la dipendenza da scipy)
+_N = 32
+_DCT = np.cos(np.pi * (2 * np.arange(_N)[None, :] + 1) * np.arange(_N)[:, None] / (2 * _N))
+
+# Popcount per byte, per la distanza di Hamming vettoriale
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def category_of(filename: str) -> str:
+    prefix = filename.split("_")[0].lower()
+    return prefix if prefix in CATEGORIES else "other"
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int(np.packbits(bits.astype(np.uint8)).view(">u8")[0])
+
+
+def compute_features(path: str) -> np.void:
+    """Decodes one image (at reduced size) and returns its feature record."""
+    img = Image.open(path)
+    img.draft("RGB", (128, 128))  # decodifica JPEG ridotta: molto più veloce
+    img = ImageOps.exif_transpose(img).convert("RGB")
+
+    gray = img.convert("L")
+    # dHash: differenze orizzontali su 9x8
+    small = np.asarray(gray.resize((9, 8), Image.BILINEAR), dtype=np.int16)
+    dhash = _bits_to_int((small[:, 1:] > small[:, :-1]).ravel())
+
+    # pHash: DCT 32x32, blocco 8x8 a bassa frequenza confrontato con la mediana
+    pixels = np.asarray(gray.resize((_N, _N), Image.BILINEAR), dtype=np.float64)
+    dct = (_DCT @ pixels @ _DCT.T)[:8, :8].ravel()
+    phash = _bits_to_int(dct > np.median(dct[1:]))
+
+    # Colore: istogramma HSV 8 (hue) x 2 (sat) x 2 (val)
+    hsv = np.asarray(img.resize((64, 64)).convert("HSV"), dtype=np.int32).reshape(-1, 3)
+    bins = (hsv[:, 0] * 8 // 256) * 4 + (hsv[:, 1] * 2 // 256) * 2 + (hsv[:, 2] * 2 // 256)
+    color = np.bincount(bins, minlength=32).astype(np.float32)
+    color /= np.linalg.norm(color) or 1.0
+
+    # Texture: orientamento dei gradienti (8 bin) pesato per magnitudo
+    g = np.asarray(gray.resize((64, 64)), dtype=np.float32)
+    gx, gy = np.diff(g, axis=1)[:-1, :], np.diff(g, axis=0)[:, :-1]
+    magnitude = np.hypot(gx, gy).ravel()
+    angle = ((np.arctan2(gy, gx).ravel() + np.pi) / (2 * np.pi) * 8).astype(np.int32) % 8
+    texture = np.bincount(angle, weights=magnitude, minlength=8).astype(np.float32)
+    texture /= np.linalg.norm(texture) or 1.0
+
+    record = np.zeros((), dtype=FEATURE_DTYPE)
+    record["dhash"], record["phash"], record["color"], record["texture"] = dhash, phash, color, texture
+    return record
+
+
+def _safe_features(path: str) -> Optional[np.void]:
+    try:
+        return compute_features(path)
+    except Exception as e:
+        print(f"⚠️ Cannot index {Path(path).name}: {e}")
+        return None
+
+
+def build_index(assets_dir: Path = ASSETS_DIR, workers: int = os.cpu_count() or 2) -> int:
+    """Computes the features of every photo and writes the memory-mappable index."""
+    names = sorted(f for f in os.listdir(assets_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+    print(f"🖼️  Indexing {len(names)} images with {workers} workers...")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        records = list(pool.map(_safe_features, [str(assets_dir / n) for n in names], chunksize=32))
+
+    kept = [(n, r) for n, r in zip(names, records) if r is not None]
+    features = np.lib.format.open_memmap(INDEX_FILE, mode="w+", dtype=FEATURE_DTYPE, shape=(len(kept),))
+    for i, (_, record) in enumerate(kept):
+        features[i] = record
+    features.flush()
+    del features
+
+    with open(NAMES_FILE, "w", encoding="utf-8") as f:
+        json.dump([n for n, _ in kept], f)
+
+    print(f"✅ Image index written: {INDEX_FILE.name} ({len(kept)} images)")
+    return len(kept)
+
+
+class ImageIndex:
+
+    def __init__(self, index_file: Path = INDEX_FILE, names_file: Path = NAMES_FILE):
+        self.index_file = index_file
+        self.names_file = names_file
+        self._lock = threading.Lock()
+        self._features = None
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._features is not None:
+                return
+            if not self.index_file.exists():
+                raise FileNotFoundError("Image index not built: run `python image_index.py`")
+            features = np.load(self.index_file, mmap_mode="r")
+            with open(self.names_file, encoding="utf-8") as f:
+                self.names = json.load(f)
+            self._row_of = {n: i for i, n in enumerate(self.names)}
+            self._categories = np.array([category_of(n) for n in self.names])
+            # Le hash come byte per il popcount vettoriale
+            self._dhash_bytes = features["dhash"].astype(">u8").view(np.uint8).reshape(-1, 8)
+            self._phash_bytes = features["phash"].astype(">u8").view(np.uint8).reshape(-1, 8)
+            self._features = features
+
+    def _hamming(self, hash_bytes: np.ndarray, row: int) -> np.ndarray:
+        return _POPCOUNT[np.bitwise_xor(hash_bytes, hash_bytes[row])].sum(axis=1)
+
+    def similar(self, image: str, k: int = 8, same_category: bool = True) -> List[dict]:
+        """
+        Most similar photos to `image` (filename or URL ending with the filename).
+        Score combines phash distance with colour and texture descriptor similarity.
+        """
+        self._load()
+        name = os.path.basename(image.split("?")[0])
+        row = self._row_of.get(name)
+        if row is None:
+            raise KeyError(f"Image not indexed: {name}")
+
+        f = self._features
+        phash_sim = 1.0 - self._hamming(self._phash_bytes, row) / 64.0
+        color_sim = f["color"] @ f["color"][row]
+        texture_sim = f["texture"] @ f["texture"][row]
+        score = 0.35 * phash_sim + 0.45 * color_sim + 0.20 * texture_sim
+
+        score[row] = -np.inf
+        if same_category:
+            score[self._categories != self._categories[row]] = -np.inf
+
+        k = max(1, min(k, 50))
+        top = np.argpartition(-score, min(k, len(score) - 1))[:k]
+        top = top[np.argsort(-score[top])]
+        return [
+            {"filename": self.names[i], "category": str(self._categories[i]), "score": round(float(score[i]), 4)}
+            for i in top if np.isfinite(score[i])
+        ]
+
+    def duplicates_of(self, image: str, max_distance: int = 6) -> List[dict]:
+        """Near-duplicate photos: dhash AND phash within `max_distance` bits."""
+        self._load()
+        name = os.path.basename(image.split("?")[0])
+        row = self._row_of.get(name)
+        if row is None:
+            raise KeyError(f"Image not indexed: {name}")
+        # Niente cache: il popcount vettoriale su tutto il dataset costa pochi ms
+        d = np.maximum(self._hamming(self._dhash_bytes, row), self._hamming(self._phash_bytes, row))
+        matches = np.flatnonzero(d <= max_distance)
+        return [{"filename": self.names[i], "distance": int(d[i])} for i in matches if i != row]
+
+    def duplicate_groups(self, max_distance: int = 6) -> List[List[str]]:
+        """All groups of near-duplicate photos across the dataset."""
+        self._load()
+        seen = set()
+        groups = []
+        for row in range(len(self.names)):
+            if row in seen:
+                continue
+            d = np.maximum(self._hamming(self._dhash_bytes, row), self._hamming(self._phash_bytes, row))
+            matches = [int(i) for i in np.flatnonzero(d <= max_distance)]
+            if len(matches) > 1:
+                seen.update(matches)
+                groups.append([self.names[i] for i in matches])
+        return groups
+
+    def stats(self) -> Dict:
+        try:
+            self._load()
+        except FileNotFoundError as e:
+            return {"ready": False, "error": str(e)}
+        categories, counts = np.unique(self._categories, return_counts=True)
+        return {
+            "ready": True,
+            "images": len(self.names),
+            "index_bytes": self.index_file.stat().st_size,
+            "categories": {str(c): int(n) for c, n in zip(categories, counts)},
+        }
+
+
+# Istanza condivisa dal backend
+image_index = ImageIndex()
+
+if __name__ == "__main__":
+    build_index()
@@ -0,0 +1,173 @@
+"""
+Lightweight intent router placed in front of the agent.
+Greetings and searches still missing zone/budget are answered from templates
+(same behaviour the SYSTEM_PROMPT asks of the agent), everything else goes to the LLM.
+"""
+
+import os
+import re
+import json
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv("../secret.env")
+
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+
+GREETINGS = {"ciao", "salve", "buongiorno", "buonasera", "hello", "hi", "hey", "hola", "buondi", "ehi"}
+
+# Parole che indicano una ricerca immobiliare
+SEARCH_KEYWORDS = {
+    "cerco", "cerchiamo", "cercando", "vorrei", "voglio", "comprare", "acquistare", "affittare", "affitto",
+    "vendita", "casa", "appartamento", "monolocale", "bilocale", "trilocale", "quadrilocale", "attico",
+    "loft", "locali", "camere", "stanze", "mq", "metri", "budget", "prezzo", "euro", "search", "looking",
+    "apartment", "flat", "house", "rent", "buy",
+}
+
+# Zone note: quelle del generatore + quelle presenti nel catalogo (real_data.json)
+KNOWN_ZONES = {
+    "brera", "isola", "navigli", "citta studi", "porta romana", "nolo", "corvetto", "city life", "citylife",
+    "portello", "lambrate", "porta venezia", "porta nuova", "centrale", "loreto", "sempione", "tortona",
+}
+KNOWN_CITIES = {"milano", "roma", "torino", "bologna"}
+
+_DATA_FILE = Path(__file__).parent / "real_data.json"
+if _DATA_FILE.exists():
+    try:
+        for _item in json.loads(_DATA_FILE.read_text(encoding="utf-8")):
+            if _item.get("zone"):
+                KNOWN_ZONES.add(_item["zone"].lower())
+    except (ValueError, OSError) as e:
+        print(f"⚠️ Intent router: cannot read zones from {_DATA_FILE.name}: {e}")
+
+_BUDGET_RE = re.compile(
+    r"(\d+(?:[.,]\d+)?)\s*(k|mila|mln|milioni|milione|m\b)"       # 500k, 1,2 mln
+    r"|(\d{1,3}(?:[.\s]\d{3})+|\d{5,})"                          # 450.000, 450000
+    r"|(?:€|euro)\s*\d+|\d+\s*(?:€|euro)"                        # 1200 €, € 1200
+    # Importi brevi (affitti) solo accanto a una parola di contesto: "max 1200", "1500 al mese"
+    r"|\b(?:max|massimo|sotto|entro|fino a|budget(?: di)?|spesa(?: di)?)\s*(?:i\s*)?\d{3,4}\b"
+    r"|\b\d{3,4}\s*(?:al mese|mensili|/\s*mese|a mese)"
+)
+# Risposte di chi il budget non vuole o non sa darlo: non va richiesto di nuovo
+_NO_BUDGET_RE = re.compile(
+    r"\b(?:non ho (?:un |alcun )?budget|nessun budget|senza (?:un )?budget|senza limiti?"
+    r"|budget (?:libero|flessibile|aperto|indifferente)|qualsiasi (?:prezzo|budget|cifra)"
+    r"|non (?:lo )?so|non saprei|indifferente|non importa|vedremo)\b"
+)
+_ZONE_HINT_RE = re.compile(r"\b(?:zona|quartiere|vicino a|near)\s+\w+")
+
+TEMPLATES = {
+    "greeting": "Ciao! 👋 Come posso aiutarti nella ricerca della tua casa?",
+    "missing_both": "Volentieri! In quale zona ti piacerebbe vivere e qual è il tuo budget indicativo? "
+                    "Se vuoi, dimmi anche se hai famiglia, bambini o animali.",
+    "missing_zone": "Perfetto! In quale zona preferisci cercare?",
+    "missing_budget": "Ottimo! Qual è il budget massimo che hai in mente?",
+}
+
+
+def _normalize(text: str) -> str:
+    # minuscolo e senza accenti ("Città" -> "citta")
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", text)
+
+
+def has_zone(text: str) -> bool:
+    norm = _normalize(text)
+    padded = f" {' '.join(_tokens(norm))} "
+    return (
+        any(f" {_normalize(z)} " in padded for z in KNOWN_ZONES | KNOWN_CITIES)
+        or bool(_ZONE_HINT_RE.search(norm))
+    )
+
+
+def has_budget(text: str) -> bool:
+    return bool(_BUDGET_RE.search(_normalize(text)))
+
+
+def declines_budget(text: str) -> bool:
+    return bool(_NO_BUDGET_RE.search(_normalize(text)))
+
+
+def _clarifications_asked(history: List[Dict]) -> int:
+    """Clarification templates we sent since the last real agent answer."""
+    clarify = {TEMPLATES["missing_both"], TEMPLATES["missing_zone"], TEMPLATES["missing_budget"]}
+    count = 0
+    for m in reversed(history):
+        if m.get("role") != "assistant":
+            continue
+        if m.get("content") not in clarify:
+            break
+        count += 1
+    return count
+
+
+def classify(message: str, history: List[Dict]) -> Tuple[str, Optional[str]]:
+    """
+    Returns (intent, template_reply). intent is one of:
+    "greeting", "clarify" (reply set) or "search", "agent" (reply None -> agent).
+    Slots already given in previous user turns of the session count as known.
+    """
+    tokens = _tokens(_normalize(message))
+    if not tokens:
+        return "agent", None
+
+    is_search = any(t in SEARCH_KEYWORDS for t in tokens)
+    if tokens[0] in GREETINGS and len(tokens) <= 4 and not is_search:
+        return "greeting", TEMPLATES["greeting"]
+
+    previous_user = " ".join(m["content"] for m in history if m.get("role") == "user")
+    # Una risposta breve dopo una nostra domanda di chiarimento fa parte della stessa ricerca
+    asked_before = bool(history) and history[-1].get("content") in TEMPLATES.values()
+    if not (is_search or asked_before):
+        return "agent", None
+
+    context = f"{previous_user} {message}"
+    zone, budget = has_zone(context), has_budget(context) or declines_budget(context)
+    # Un solo chiarimento: alla risposta successiva decide l'agente (niente loop sul template)
+    if (zone and budget) or _clarifications_asked(history) >= 1:
+        return "search", None
+    if not zone and not budget:
+        return "clarify", TEMPLATES["missing_both"]
+    return "clarify", TEMPLATES["missing_budget" if zone else "missing_zone"]
+
+
+class IntentRouter:
+    """Applies `classify` and keeps the counters (how many LLM calls were avoided)."""
+
+    def __init__(self, enabled: bool = INTENT_ROUTER_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counts = {"greeting": 0, "clarify": 0, "search": 0, "agent": 0}
+
+    def route(self, message: str, history: List[Dict]) -> Optional[str]:
+        """Returns the local reply, or None if the message must go to the agent."""
+        if not self.enabled:
+            return None
+        intent, reply = classify(message, history)
+        with self._lock:
+            self._counts[intent] += 1
+        if reply:
+            print(f"🧭 Intent '{intent}' answered locally")
+        return reply
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = sum(self._counts.values())
+            saved = self._counts["greeting"] + self._counts["clarify"]
+            return {
+                "enabled": self.enabled,
+                "intents": dict(self._counts),
+                "llm_calls_saved": saved,
+                "saved_ratio": round(saved / total, 3) if total else 0.0,
+            }
+
+
+# Istanza condivisa dal backend
+intent_router = IntentRouter()
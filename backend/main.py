@@ -1,31 +1,47 @@
-import requests
 import uuid
 import os
 import json
 import traceback
 import asyncio
-from io import BytesIO
+import threading
+import functools
 # IMPORTANTE: Questa riga risolve l'errore "NameError: name 'Optional' is not defined"
 from typing import List, Optional
 
-from PIL import Image
-from fastapi import FastAPI
-from fastapi.responses import PlainTextResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 
-# Google GenAI Imports
-from google import genai
-from google.genai import types
-
 # Datapizza Imports
 from datapizza.clients.openai import OpenAIClient
 from datapizza.agents import Agent
+from datapizza.tools import Tool
 
 # Import Tools and Models
-from tools import sql_db, get_property_details
-from models import ChatRequest, RenovateRequest, RenovateResponse, ContractorQuote
+from tools import (
+    sql_db, db_uri, engine, details_cache,
+    get_property_details, get_properties_details, search_properties, run_sql_query,
+    search_property_cards, semantic_search_properties,
+)
+from models import ChatRequest, RenovateRequest, RenovateResponse, RenovationJobStatus
+from sessions import session_store
+from agent_pool import agent_pool, AgentPoolFull
+from streaming import split_reply, sse_channel, sse_stream, sse_static
+from intent_router import intent_router
+from query_cache import sql_cache
+import catalog_events
+from catalog import property_catalog, CATALOG_IN_MEMORY
+from semantic_search import semantic_index
+from image_index import image_index
+from renovation import process_renovation_sync, primary_model_breaker, estimate_costs
+from renovation_jobs import renovation_jobs, MAX_HOUSE_IMAGES
+from generation_scheduler import generation_scheduler, PRIORITY_ROOM, PRIORITY_HOUSE
+from render_cache import render_cache
+from render_outputs import variant_urls, PUBLIC_BASE_URL
+from render_storage import render_storage, RenderStaticFiles
+from asset_manifest import asset_manifest
+import render_inputs
 
 # 1. Setup
 load_dotenv("../secret.env")
@@ -37,15 +53,54 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Session-Id"],
 )
 
+@app.on_event("startup")
+def start_catalog_listener():
+    # Invalida le cache quando il catalogo cambia (seed_db.py o altri writer)
+    catalog_events.start_listener(db_uri)
+
+@app.on_event("startup")
+def load_catalog():
+    # Catalogo in RAM opzionale: le ricerche non passano più da Postgres
+    if CATALOG_IN_MEMORY:
+        try:
+            property_catalog.load(engine)
+        except Exception as e:
+            print(f"⚠️ In-memory catalog not loaded, falling back to SQL: {e}")
+
+@app.on_event("startup")
+async def warm_semantic_index():
+    # Indice vettoriale vuoto (es. Qdrant in memoria o primo avvio): lo costruiamo dal DB,
+    # passando da schedule_rebuild così non si sovrappone a un rebuild chiesto da catalog_events
+    def _warm():
+        try:
+            if semantic_index.count() == 0:
+                semantic_index.schedule_rebuild(engine)
+        except Exception as e:
+            print(f"⚠️ Semantic index not available: {e}")
+    asyncio.get_running_loop().run_in_executor(None, _warm)
+
+@app.on_event("startup")
+def start_asset_manifest():
+    # Manifest delle foto locali aggiornato in background: le richieste di renovation lo leggono soltanto
+    asset_manifest.start()
+
+@app.on_event("startup")
+def start_render_janitor():
+    # Tiene generated_images entro il budget su disco, senza toccare i render dei job in memoria
+    render_storage.add_references(renovation_jobs.referenced_files)
+    render_storage.start()
+
 os.makedirs("generated_images", exist_ok=True)
-app.mount("/generated_images", StaticFiles(directory="generated_images"), name="generated")
+# Render immutabili: Cache-Control a lungo termine, ETag/304 e richieste Range
+app.mount("/generated_images", RenderStaticFiles(directory="generated_images", storage=render_storage), name="generated")
 
 client = OpenAIClient(api_key=os.getenv("OPENAI_API_KEY"), model="gpt-5-mini")
 
 # --- AGENT SETUP ---
-chat_history_buffer = []
+# La history è per sessione (vedi sessions.py), non più un buffer globale condiviso
 
 SYSTEM_PROMPT = """You are a Real Estate Concierge for Immobiliare.ai.
 Your goal is to assist users in a natural, conversational way.
@@ -56,29 +111,33 @@ BEHAVIORAL RULES (STRICT):
 3. **DISCOVERY:** Before searching, ensure you know: Zone AND Budget. If missing, ask nicely. those are information necessary but don't limit to them.ask about family, children, pets, etc those are not mandatory but increase the sense of personalization.if the user already gave you those informations don't ask for confirmations or ask again, go for the query
 
 DATABASE SCHEMA:
-- Table `properties`: id, title, city, zone, address, price, rooms, bathrooms, sqm, floor, elevator, specs (JSONB), description_ai.
-- Table `property_images`: property_id, storage_url, is_main.
+- Table `property_cards` (READ THIS ONE): id, title, city, zone, address, price, rooms, bathrooms, sqm, floor, total_floors, elevator, specs (JSONB), description_ai, ai_vibe_tags, main_image, images (TEXT[], ordered, main first), gallery (JSONB).
+  One row = one complete UI card: no joins or aggregations needed.
+- Table `properties`: source data (same fields + description_original).
+- Table `property_images`: property_id, storage_url, room_type, is_main.
+
+SEARCH TOOL (PREFERRED):
+For standard searches (city, zone, budget, rooms, bathrooms, sqm, elevator, contract/heating/furnished) ALWAYS call `search_properties`.
+It returns the cards already in the final JSON format: copy them as they are into the JSON block, do not call other tools for the same results.
+For vibe/lifestyle wishes (bright, quiet, family with dog, view...) call `semantic_search_properties` with the wish as `query`, plus zone/budget filters: it returns cards in the same format.
+Write SQL only for requests the tools cannot express (e.g. filters on address).
+For full details of several properties call `get_properties_details` ONCE with all the ids (never one call per property).
 
 SQL QUERY RULES (Only run when you have specific criteria):
-1. **UUID CAST:** ALWAYS use `p.id::text`.
-2. **AGGREGATION:** Use `array_agg(pi.storage_url)` to get ALL images.
-3. **MAIN IMAGE:** Select a single image for the cover.
+1. **UUID CAST:** ALWAYS use `id::text`.
+2. **SOURCE:** Query `property_cards` only. Never aggregate `property_images`.
 
 SQL QUERY INSTRUCTIONS:
 Always select specific technical details to populate the UI cards.
 Pattern:
 ```sql
 SELECT
-p.id::text as id,
-p.title, p.city, p.zone, p.address, p.price, 
-p.rooms, p.bathrooms, p.sqm, p.floor, p.total_floors, p.elevator,
-p.specs, p.description_ai,
-(SELECT storage_url FROM property_images WHERE property_id = p.id LIMIT 1) as main_image,
-array_agg(pi.storage_url) as all_images
-FROM properties p
-LEFT JOIN property_images pi ON p.id = pi.property_id
+id::text as id,
+title, city, zone, address, price,
+rooms, bathrooms, sqm, floor, total_floors, elevator,
+specs, description_ai, main_image, images
+FROM property_cards
 WHERE ... (filters) ...
-GROUP BY p.id
 LIMIT 5;
 RESPONSE FORMAT:
 
@@ -108,34 +167,83 @@ Example Output Structure:
     "description_ai": "AI description..."
   }
 ]
-CRITICAL: If all_images is null, put main_image inside images. """
-
-real_estate_agent = Agent(
-    name="real_estate_sql_agent",
-    system_prompt=SYSTEM_PROMPT,
-    client=client,
-    tools=[sql_db.list_tables, sql_db.get_table_schema, sql_db.run_sql_query, get_property_details],
-    max_steps=10,
-    terminate_on_text=True,
-)
+CRITICAL: If images is empty, put main_image inside images. """
+
+AGENT_TOOLS = [search_properties, semantic_search_properties, sql_db.list_tables, sql_db.get_table_schema, run_sql_query, get_property_details, get_properties_details]
+
+def build_agent(stream: bool = False) -> Agent:
+    return Agent(
+        name="real_estate_sql_agent",
+        system_prompt=SYSTEM_PROMPT,
+        client=client,
+        # In streaming i tool avvisano lo stream prima di partire (vedi announced_tool)
+        tools=[announced_tool(t) for t in AGENT_TOOLS] if stream else AGENT_TOOLS,
+        max_steps=10,
+        terminate_on_text=True,
+        stream=stream,
+    )
+
+# Ogni worker del pool (vedi agent_pool.py) usa la propria istanza dell'agente,
+# così run concorrenti non condividono lo stato interno della conversazione
+_agent_local = threading.local()
+
+def get_agent() -> Agent:
+    if not hasattr(_agent_local, "agent"):
+        _agent_local.agent = build_agent()
+    return _agent_local.agent
+
+def get_stream_agent() -> Agent:
+    # Agente con stream=True: i delta di testo arrivano dal client LLM mentre il modello scrive
+    if not hasattr(_agent_local, "stream_agent"):
+        _agent_local.stream_agent = build_agent(stream=True)
+    return _agent_local.stream_agent
+
+def announced_tool(original: Tool) -> Tool:
+    """
+    Copia del tool che, prima di eseguire, emette l'evento "tool" sullo stream del thread corrente
+    (l'agente restituisce lo step solo dopo aver eseguito i tool).
+    """
+    @functools.wraps(original.func)
+    def _run(*args, **kwargs):
+        emit = getattr(_agent_local, "emit", None)
+        if emit:
+            emit("tool", {"name": original.name, "arguments": kwargs})
+        return original(*args, **kwargs)
+
+    return Tool(func=_run, name=original.name, description=original.description, end=original.end_invoke,
+                properties=original.properties, required=original.required, strict=original.strict)
+
+def build_prompt(user_message: str, session_id: str) -> str:
+    context_str = ""
+    history = session_store.get_history(session_id)
+    if history:
+        # Clean history to avoid confusion
+        history_lines = [f"- {m['role']}: {m['content'].split('```json')[0].strip()}" for m in history[-6:]]
+        context_str = "HISTORY:\n" + "\n".join(history_lines)
+
+    return f"{context_str}\nUSER: {user_message}\n(Reply naturally. If searching, use id::text cast. Append JSON if results found)."
+
+def answer_locally(user_message: str, session_id: str) -> Optional[str]:
+    """
+    Saluti e richieste di chiarimento (zona/budget mancanti) vengono gestiti dal router
+    senza chiamare l'LLM. Ritorna None se il messaggio deve andare all'agente.
+    """
+    reply = intent_router.route(user_message, session_store.get_history(session_id))
+    if reply:
+        session_store.append(session_id, "user", user_message)
+        session_store.append(session_id, "assistant", reply)
+    return reply
 
-def run_agent(user_message: str) -> str:
-    global chat_history_buffer
+def run_agent(user_message: str, session_id: str) -> str:
     try:
-        print(f"🤖 Agent received: {user_message}")
+        print(f"🤖 Agent received [{session_id[:8]}]: {user_message}")
         
-        context_str = ""
-        if chat_history_buffer:
-            # Clean history to avoid confusion
-            history_lines = [f"- {m['role']}: {m['content'].split('```json')[0].strip()}" for m in chat_history_buffer[-6:]]
-            context_str = "HISTORY:\n" + "\n".join(history_lines)
-
-        augmented = f"{context_str}\nUSER: {user_message}\n(Reply naturally. If searching, use p.id::text cast. Append JSON if results found)."
+        augmented = build_prompt(user_message, session_id)
         
-        result = real_estate_agent.run(augmented)
+        result = get_agent().run(augmented)
         
-        chat_history_buffer.append({"role": "user", "content": user_message})
-        chat_history_buffer.append({"role": "assistant", "content": result.text})
+        session_store.append(session_id, "user", user_message)
+        session_store.append(session_id, "assistant", result.text)
         return result.text
     except Exception as e:
         print(f"Error: {e}")
@@ -143,85 +251,62 @@ def run_agent(user_message: str) -> str:
         traceback.print_exc()
         return "Si è verificato un errore tecnico. Riprova tra poco."
 
-# --- HELPER: Elaborazione Singola Immagine (UPDATED FOR GEMINI 3 PRO) ---
-def process_renovation_sync(image_url: str, style: str) -> Optional[str]:
+def stream_agent(user_message: str, session_id: str, emit) -> None:
     """
-    Scarica, genera e salva una singola immagine usando Google GenAI (Gemini 3 Pro).
+    Come run_agent, ma emette eventi durante il loop dell'agente:
+    - "tool":       nome del tool che sta per essere eseguito (progresso)
+    - "text":       testo del riassunto man mano che il modello lo scrive (senza il blocco JSON)
+    - "text_reset": il testo già inviato era il preambolo di uno step con tool call, va scartato
+    - "properties": le card già parsate lato server
+    - "done" / "error"
     """
+    _agent_local.emit = emit
     try:
-        # 1. Download dell'immagine originale
-        img_response = requests.get(image_url, timeout=10)
-        img_response.raise_for_status()
-        input_image = Image.open(BytesIO(img_response.content))
-
-        client_gen = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
-
-        # Prompt Ottimizzato per Interior Design
-        full_prompt = f"""
-        Act as a professional interior designer. 
-        Renovate this room in a **{style}** style.
-        Preserve the structural elements (windows, ceiling, general layout) but completely replace furniture, flooring, and decor to match the {style} aesthetic.
-        High quality, photorealistic 4k render.
-        """
-
-        # 2. Configurazione Modello (Gemini 3 Pro Image Preview)
-        model_name = "gemini-3-pro-image-preview"
-        
-        try:
-            print(f"🎨 Generating with {model_name}...")
-            response = client_gen.models.generate_content(
-                model=model_name,
-                contents=[full_prompt, input_image],
-                config=types.GenerateContentConfig(
-                    response_modalities=["IMAGE"], # Ci interessa solo l'immagine
-                    image_config=types.ImageConfig(
-                        aspect_ratio="4:3", # Standard per foto immobiliari
-                        image_size="2K"     # Alta qualità
-                    )
-                ),
-            )
-        except Exception as e:
-            print(f"⚠️ Primary model failed: {e}")
-            print("🔄 Falling back to Gemini 2.5 Pro...")
-            # Fallback a 2.5 Pro se il 3.0 Preview non è disponibile per la chiave API
-            response = client_gen.models.generate_content(
-                model="gemini-2.5-pro",
-                contents=[full_prompt, input_image],
-            )
-
-        # 3. Salvataggio Immagine Generata
-        renovated_filename = f"renovated_{uuid.uuid4()}.png"
-        save_path = os.path.join("generated_images", renovated_filename)
-        
-        image_saved = False
-        if hasattr(response, "parts"):
-            for part in response.parts:
-                if hasattr(part, "as_image"):
-                    # Metodo diretto SDK
-                    part.as_image().save(save_path)
-                    image_saved = True
-                    break
-                elif hasattr(part, "inline_data"):
-                    # Metodo Base64
-                    import base64
-                    with open(save_path, "wb") as f:
-                        f.write(base64.b64decode(part.inline_data.data))
-                    image_saved = True
-                    break
-        
-        if image_saved:
-            print(f"✅ Image saved: {renovated_filename}")
-            # URL per il frontend
-            return f"http://localhost:8000/generated_images/{renovated_filename}"
-        else:
-            print("❌ No image found in response parts.")
-            
+        print(f"🤖 Agent (stream) received [{session_id[:8]}]: {user_message}")
+        emit("status", {"session_id": session_id})
+
+        full_text = ""
+        step_text = ""
+        streamed_text = ""
+        for step in get_stream_agent().stream_invoke(build_prompt(user_message, session_id)):
+            if step is None:
+                continue
+
+            # Delta di testo dello step in corso
+            delta = getattr(step, "delta", None)
+            if delta:
+                step_text += delta
+                visible = step_text.split("```")[0]
+                if len(visible) > len(streamed_text):
+                    emit("text", {"delta": visible[len(streamed_text):]})
+                    streamed_text = visible
+                continue
+
+            # Step completato: se ha chiamato tool il suo testo non è la risposta finale
+            if getattr(step, "tools_used", None):
+                if streamed_text:
+                    emit("text_reset", {})
+                step_text = streamed_text = ""
+                continue
+            if getattr(step, "text", None):
+                full_text = step.text
+            step_text = ""
+
+        summary, properties = split_reply(full_text)
+        if len(summary) > len(streamed_text):
+            emit("text", {"delta": summary[len(streamed_text):]})
+        if properties:
+            emit("properties", properties)
+
+        session_store.append(session_id, "user", user_message)
+        session_store.append(session_id, "assistant", full_text)
+        emit("done", {"session_id": session_id})
     except Exception as e:
-        print(f"⚠️ Error processing {image_url[-15:]}: {e}")
+        print(f"Error: {e}")
         traceback.print_exc()
-    
-    return None
-
+        emit("error", {"message": "Si è verificato un errore tecnico. Riprova tra poco."})
+    finally:
+        _agent_local.emit = None
 
 # --- ENDPOINTS ---
 
@@ -231,22 +316,146 @@ def read_root():
 
 @app.post("/api/chat")
 async def chat(request: ChatRequest):
-    return PlainTextResponse(run_agent(request.message))
+    # Se il client non ha ancora una sessione ne creiamo una e la restituiamo nell'header
+    session_id = request.session_id or str(uuid.uuid4())
+    local_reply = answer_locally(request.message, session_id)
+    if local_reply:
+        return PlainTextResponse(local_reply, headers={"X-Session-Id": session_id})
+    try:
+        # L'agente è sincrono e lento: gira nel pool dedicato, non nell'event loop
+        reply = await agent_pool.submit(run_agent, request.message, session_id)
+    except AgentPoolFull as e:
+        print(f"🚦 {e}")
+        raise HTTPException(status_code=429, detail="Troppe richieste, riprova tra poco.", headers={"Retry-After": "5"})
+    return PlainTextResponse(reply, headers={"X-Session-Id": session_id})
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest):
+    session_id = request.session_id or str(uuid.uuid4())
+    headers = {"X-Session-Id": session_id, "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+    local_reply = answer_locally(request.message, session_id)
+    if local_reply:
+        events = [("text", {"delta": local_reply}), ("done", {"session_id": session_id})]
+        return StreamingResponse(sse_static(events), media_type="text/event-stream", headers=headers)
+
+    emit, queue = sse_channel()
+    try:
+        future = agent_pool.start(stream_agent, request.message, session_id, emit)
+    except AgentPoolFull as e:
+        print(f"🚦 {e}")
+        raise HTTPException(status_code=429, detail="Troppe richieste, riprova tra poco.", headers={"Retry-After": "5"})
+    return StreamingResponse(sse_stream(queue, future), media_type="text/event-stream", headers=headers)
+
+@app.get("/api/properties/search")
+async def properties_search(
+    city: Optional[str] = None, zone: Optional[str] = None,
+    min_price: Optional[int] = None, max_price: Optional[int] = None,
+    min_rooms: Optional[int] = None, max_rooms: Optional[int] = None,
+    min_bathrooms: Optional[int] = None, min_sqm: Optional[int] = None,
+    elevator: Optional[bool] = None, contract: Optional[str] = None,
+    sort: str = "price_asc", limit: int = 5,
+):
+    specs = {"contract": contract} if contract else None
+    return await asyncio.to_thread(
+        search_property_cards, city, zone, min_price, max_price, min_rooms, max_rooms,
+        min_bathrooms, min_sqm, elevator, specs, sort, limit,
+    )
+
+@app.get("/api/images/similar")
+async def similar_images(image: str, k: int = 8, same_category: bool = True):
+    # "Altre stanze come questa": image può essere il filename o l'URL della foto
+    try:
+        return await asyncio.to_thread(image_index.similar, image, k, same_category)
+    except (KeyError, FileNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/api/images/duplicates")
+async def duplicate_images(image: str, max_distance: int = 6):
+    try:
+        return await asyncio.to_thread(image_index.duplicates_of, image, max_distance)
+    except (KeyError, FileNotFoundError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/api/images/stats")
+def images_stats():
+    return image_index.stats()
+
+@app.get("/api/renovate/stats")
+def renovate_stats():
+    return {
+        "primary_model": primary_model_breaker.stats(),
+        "render_cache": render_cache.stats(),
+        "inputs": render_inputs.stats(),
+        "storage": render_storage.stats(),
+        "jobs": renovation_jobs.stats(),
+        "scheduler": generation_scheduler.stats(),
+    }
+
+@app.get("/api/catalog/stats")
+def catalog_stats():
+    return property_catalog.stats()
+
+@app.get("/api/chat/stats")
+def chat_stats():
+    return agent_pool.stats()
+
+@app.get("/api/router/stats")
+def router_stats():
+    return intent_router.stats()
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    return {"sql": sql_cache.stats(), "details": details_cache.stats()}
+
+@app.get("/api/sessions/stats")
+def sessions_stats():
+    return session_store.stats()
+
+@app.delete("/api/sessions/{session_id}")
+def clear_session(session_id: str):
+    session_store.clear(session_id)
+    return {"cleared": session_id}
+
+def renovation_user(request: RenovateRequest, http_request: Request) -> str:
+    # Senza sessione il turno dello scheduler è per indirizzo del client
+    return request.session_id or (http_request.client.host if http_request.client else "anonymous")
+
+@app.post("/api/renovate/jobs", response_model=RenovationJobStatus, status_code=202)
+async def create_renovation_job(request: RenovateRequest, http_request: Request):
+    # Ritorna subito: le stanze arrivano su /events (SSE) o con il polling dello stato
+    job = renovation_jobs.submit(request, renovation_user(request, http_request))
+    return job.snapshot()
+
+@app.get("/api/renovate/jobs/{job_id}", response_model=RenovationJobStatus)
+def get_renovation_job(job_id: str):
+    job = renovation_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.snapshot()
+
+@app.get("/api/renovate/jobs/{job_id}/events")
+async def renovation_job_events(job_id: str):
+    job = renovation_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(renovation_jobs.stream(job), media_type="text/event-stream", headers=headers)
+
+@app.delete("/api/renovate/jobs/{job_id}", response_model=RenovationJobStatus)
+def cancel_renovation_job(job_id: str):
+    job = renovation_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.snapshot()
 
 @app.post("/api/renovate", response_model=RenovateResponse)
-async def renovate(request: RenovateRequest):
+async def renovate(request: RenovateRequest, http_request: Request):
+    user = renovation_user(request, http_request)
     print(f"🎨 Renovation Request: {request.style} (Mode: {request.mode})")
     
     # 1. Cost Calculation
-    base_price_mq = 600 if request.style == "Industrial" else 800 if request.style == "Modern" else 1000
-    area_to_calculate = request.sqm if request.mode == 'house' else 25
-    total_est = base_price_mq * area_to_calculate
-
-    contractors = [
-        ContractorQuote(name="EdilMilano Pro", price=int(total_est * 0.9), rating=4.8),
-        ContractorQuote(name="RistrutturaFacile", price=int(total_est * 0.85), rating=4.5),
-        ContractorQuote(name="Luxury Design Studio", price=int(total_est * 1.2), rating=4.9),
-    ]
+    estimate = estimate_costs(request.style, request.mode, request.sqm)
 
     # 2. Image Generation Logic
     main_renovated_url = ""
@@ -257,11 +466,11 @@ async def renovate(request: RenovateRequest):
         print(f"🚀 Starting PARALLEL generation for {len(request.gallery_images)} images...")
         
         # Limitiamo a max 4 immagini per sicurezza demo (evitare rate limits)
-        images_to_process = request.gallery_images[:4] 
+        images_to_process = request.gallery_images[:MAX_HOUSE_IMAGES]
         
-        # Creiamo i task asincroni wrappando la funzione sincrona in thread
+        # Le generazioni passano dallo scheduler globale (rate limit, priorità, turno tra utenti)
         tasks = [
-            asyncio.to_thread(process_renovation_sync, url, request.style) 
+            generation_scheduler.submit(process_renovation_sync, url, request.style, user=user, priority=PRIORITY_HOUSE)
             for url in images_to_process
         ]
         
@@ -280,16 +489,18 @@ async def renovate(request: RenovateRequest):
     else:
         # Generazione Singola Stanza
         print("🚀 Starting SINGLE generation...")
-        result = await asyncio.to_thread(process_renovation_sync, request.image_url, request.style)
+        result = await generation_scheduler.submit(
+            process_renovation_sync, request.image_url, request.style, user=user, priority=PRIORITY_ROOM,
+        )
         main_renovated_url = result if result else "[https://via.placeholder.com/800x600?text=Error](https://via.placeholder.com/800x600?text=Error)"
         gallery_urls = [main_renovated_url]
 
     return {
         "renovated_image_url": main_renovated_url,
         "renovated_gallery": gallery_urls,
-        "estimated_cost_min": int(total_est * 0.9),
-        "estimated_cost_max": int(total_est * 1.1),
-        "contractors": contractors
+        # Allineato per posizione a renovated_gallery: null se l'immagine non ha varianti (es. placeholder)
+        "renovated_variants": [variant_urls(url) if url.startswith(PUBLIC_BASE_URL) else None for url in gallery_urls],
+        **estimate,
     }
 
 if __name__ == "__main__":
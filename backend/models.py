@@ -1,8 +1,10 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class ChatRequest(BaseModel):
     message: str
+    # Id della conversazione: se assente il backend ne genera uno (header X-Session-Id)
+    session_id: Optional[str] = None
 
 class RenovateRequest(BaseModel):
     image_url: str
@@ -14,6 +16,8 @@ class RenovateRequest(BaseModel):
     prompt: Optional[str] = "" 
     style: str = "Modern"
     sqm: int = 80
+    # Id del client (stesso della chat): serve al turno equo tra utenti dello scheduler
+    session_id: Optional[str] = None
 
 class ContractorQuote(BaseModel):
     name: str
@@ -24,6 +28,31 @@ class RenovateResponse(BaseModel):
     renovated_image_url: str
     # Campo necessario per la galleria
     renovated_gallery: List[str] = [] 
+    # Per ogni immagine della galleria (stessa posizione): variante -> URL (thumb, card, full, original), o null
+    renovated_variants: List[Optional[Dict[str, str]]] = []
     estimated_cost_min: int
     estimated_cost_max: int
-    contractors: List[ContractorQuote]
\ No newline at end of file
+    contractors: List[ContractorQuote]
+
+class RenovationJobImage(BaseModel):
+    index: int
+    source_url: str
+    status: str  # 'pending' | 'done' | 'failed' | 'cancelled'
+    url: Optional[str] = None
+    variants: Dict[str, str] = {}
+
+class RenovationJobStatus(BaseModel):
+    job_id: str
+    status: str  # 'queued' | 'running' | 'done' | 'failed' | 'cancelled'
+    mode: str
+    style: str
+    total: int
+    completed: int
+    # Prima stanza pronta: il frontend la mostra mentre le altre sono ancora in generazione
+    renovated_image_url: Optional[str] = None
+    renovated_gallery: List[str] = []
+    renovated_variants: List[Optional[Dict[str, str]]] = []
+    images: List[RenovationJobImage] = []
+    estimated_cost_min: int
+    estimated_cost_max: int
+    contractors: List[ContractorQuote]
@@ -0,0 +1,104 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+from dotenv import load_dotenv
+
+load_dotenv("../secret.env")
+
+# Configurazione (sovrascrivibile da secret.env)
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", "300"))            # secondi
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1000"))
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a per-entry time to live and hit/miss counters.
+    """
+
+    def __init__(self, ttl: float = QUERY_CACHE_TTL, max_entries: int = QUERY_CACHE_MAX_ENTRIES, name: str = "cache"):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.name = name
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING and item[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            if item is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+# Letterali SQL ('...') da preservare così come sono durante la normalizzazione
+_SQL_LITERAL_RE = re.compile(r"('(?:[^']|'')*')")
+_SQL_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Canonical form of a query used as cache key: no comments, collapsed whitespace,
+    no trailing semicolon, lowercase outside string literals.
+    """
+    parts = _SQL_LITERAL_RE.split(query)
+    normalized = []
+    for i, part in enumerate(parts):
+        if i % 2:  # letterale: invariato
+            normalized.append(part)
+        else:
+            part = _SQL_COMMENT_RE.sub(" ", part)
+            normalized.append(re.sub(r"\s+", " ", part).lower())
+    return "".join(normalized).strip().rstrip(";").strip()
+
+
+def is_read_only(normalized_query: str) -> bool:
+    return normalized_query.startswith(("select", "with")) and not re.search(
+        r"\b(insert|update|delete|alter|drop|create|truncate)\b", normalized_query
+    )
+
+
+# Cache condivisa per i risultati delle query dell'agente
+sql_cache = TTLCache(name="sql")
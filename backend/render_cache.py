@@ -0,0 +1,150 @@
+"""
+Content-addressed cache for renovation renders.
+Key = sha256(source image bytes) + style + prompt + requested model: the same photo renovated in the
+same style returns the stored render without a new (paid) generation. Each entry also records the
+model that actually produced it, so callers can refuse fallback renders once the primary is back. Concurrent identical requests
+wait on the generation already in flight. The cache only indexes files: disk usage is bounded by the
+render_storage janitor alone (LRU, skips renders still referenced by jobs); an entry whose file the
+janitor removed is dropped on the next lookup.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+from render_outputs import GENERATED_DIR, render_files
+
+load_dotenv("../secret.env")
+
+RENDER_CACHE_DB = os.getenv("RENDER_CACHE_DB", "render_cache.db")
+
+
+def make_key(source_bytes: bytes, style: str, prompt: str, model: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(hashlib.sha256(source_bytes).digest())
+    for part in (style, prompt, model):
+        digest.update(b"\x00" + part.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class RenderCache:
+
+    def __init__(self, db_path: str = RENDER_CACHE_DB, directory: str = GENERATED_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS renders ("
+            "key TEXT PRIMARY KEY, filename TEXT NOT NULL, bytes INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL, model TEXT)"
+        )
+        # Cache creata prima della colonna model: le vecchie entry restano con model NULL (provenienza ignota)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(renders)")}
+        if "model" not in columns:
+            self._db.execute("ALTER TABLE renders ADD COLUMN model TEXT")
+        self._db.commit()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.superseded = 0
+
+    def get_or_generate(self, key: str, generate: Callable[[], Optional[Tuple[str, str]]],
+                        accept: Optional[Callable[[Optional[str]], bool]] = None) -> Optional[str]:
+        """
+        Returns the filename of the render for `key`: from cache, from a generation already
+        in flight for the same key, or by calling `generate()` (which must save the file and
+        return (filename, model that produced it), or None on failure).
+        A cached entry whose model is rejected by `accept(model)` counts as a miss and is
+        replaced by the new generation.
+        """
+        with self._lock:
+            filename = self._lookup(key, accept)
+            if filename:
+                self.hits += 1
+                print(f"♻️  Render cache hit: {filename}")
+                return filename
+
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            print("⏳ Same render already in progress, waiting for it...")
+            return future.result()
+
+        try:
+            result = generate()
+            filename = None
+            if result:
+                filename, model = result
+                self._store(key, filename, model)
+            future.set_result(filename)
+            return filename
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM renders").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "renders": count,
+                "bytes": total,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._inflight),
+                "superseded": self.superseded,
+            }
+
+    # --- Interni (da chiamare con il lock acquisito, tranne _store) ---
+    def _lookup(self, key: str, accept: Optional[Callable[[Optional[str]], bool]] = None) -> Optional[str]:
+        row = self._db.execute("SELECT filename, model FROM renders WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None
+        if accept is not None and not accept(row[1]):
+            # Render del fallback (o di provenienza ignota): si rigenera con un nuovo filename e la entry
+            # punta a quello; il vecchio file resta valido per chi lo ha già (lo rimuove il janitor)
+            self.superseded += 1
+            print(f"🔁 Cached render {row[0]} comes from {row[1] or 'an unknown model'}, regenerating")
+            return None
+        if not os.path.exists(os.path.join(self.directory, row[0])):
+            # File rimosso dal janitor (o a mano): la entry non è più valida
+            self._db.execute("DELETE FROM renders WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+        self._db.execute("UPDATE renders SET last_access = ? WHERE key = ?", (time.time(), key))
+        self._db.commit()
+        return row[0]
+
+    def _store(self, key: str, filename: str, model: str) -> None:
+        # Il render occupa tutte le sue varianti (thumb, card, full...)
+        size = sum(os.path.getsize(os.path.join(self.directory, f)) for f in render_files(filename))
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO renders (key, filename, bytes, created_at, last_access, model) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, filename, size, now, now, model),
+            )
+            self._db.commit()
+
+
+# Istanza condivisa dal backend
+render_cache = RenderCache()
@@ -0,0 +1,110 @@
+"""
+Input stage of the renovation pipeline.
+- Source photos that live on this machine (our /generated_images mount, listing photos that are
+  copies of backend/assets) are read from disk instead of being downloaded again; listing photos
+  are located by name or content hash through the asset manifest (asset_manifest.py), which is
+  only read here: it is refreshed in the background (asset_manifest.start() at startup).
+- Before upload the photo is decoded at reduced size, EXIF-rotated, converted to RGB and
+  downsized to what the model actually uses (RENDER_INPUT_MAX_SIDE), then re-encoded as JPEG.
+"""
+
+import os
+import re
+import threading
+from io import BytesIO
+from typing import Dict, Optional
+from urllib.parse import urlparse, unquote
+
+from PIL import Image, ImageOps
+from dotenv import load_dotenv
+
+from clients import http_session
+from render_outputs import GENERATED_DIR
+from asset_manifest import asset_manifest
+
+load_dotenv("../secret.env")
+
+RENDER_INPUT_MAX_SIDE = int(os.getenv("RENDER_INPUT_MAX_SIDE", "1536"))
+RENDER_INPUT_QUALITY = int(os.getenv("RENDER_INPUT_QUALITY", "90"))
+
+LOCAL_HOSTS = ("", "localhost", "127.0.0.1", "0.0.0.0")
+# Foto caricate da seed_db.py: .../storage/v1/object/public/listings/by-hash/<xx>/<sha256>.jpg
+# (o, per i seed precedenti, .../listings/<property_id>/<file in assets>)
+STORAGE_PATH = "/storage/v1/object/"
+
+CONTENT_HASH_RE = re.compile(r"[0-9a-f]{64}")
+
+_lock = threading.Lock()
+_stats = {"local": 0, "downloaded": 0, "source_bytes": 0, "upload_bytes": 0}
+
+
+def _count(**increments: int) -> None:
+    with _lock:
+        for name, value in increments.items():
+            _stats[name] += value
+
+
+def resolve_local_path(image_url: str) -> Optional[str]:
+    """Path on disk of the photo behind `image_url`, or None if it must be downloaded."""
+    parsed = urlparse(image_url)
+    path = unquote(parsed.path)
+    name = os.path.basename(path)
+    if not name:
+        return None
+
+    if parsed.hostname in LOCAL_HOSTS or parsed.hostname is None:
+        if path.startswith("/generated_images/"):
+            candidate = os.path.join(GENERATED_DIR, name)
+            return candidate if os.path.isfile(candidate) else None
+        if path.startswith("/assets/"):
+            return asset_manifest.path_of(name)
+
+    if STORAGE_PATH in path:
+        # seed_db.py salva le foto per contenuto (by-hash/<sha256>.jpg): le ritroviamo per hash
+        stem = name.rsplit(".", 1)[0]
+        if CONTENT_HASH_RE.fullmatch(stem):
+            return asset_manifest.path_for_hash(stem)
+        return asset_manifest.path_of(name)
+    return None
+
+
+def read_source(image_url: str) -> bytes:
+    """Original bytes of the source photo: from disk when we have it, otherwise over HTTP."""
+    local_path = resolve_local_path(image_url)
+    if local_path:
+        try:
+            with open(local_path, "rb") as f:
+                data = f.read()
+            _count(local=1, source_bytes=len(data))
+            return data
+        except FileNotFoundError:
+            # Rimossa dopo l'ultimo refresh del manifest: la scarichiamo
+            pass
+
+    # Sessione condivisa: connessioni keep-alive riutilizzate
+    response = http_session.get(image_url, timeout=10)
+    response.raise_for_status()
+    _count(downloaded=1, source_bytes=len(response.content))
+    return response.content
+
+
+def prepare_for_model(source_bytes: bytes, max_side: int = RENDER_INPUT_MAX_SIDE) -> bytes:
+    """Upright RGB JPEG no larger than `max_side` on its longest edge."""
+    img = Image.open(BytesIO(source_bytes))
+    # JPEG: decodifica direttamente a scala ridotta (meno CPU e memoria)
+    img.draft("RGB", (max_side, max_side))
+    img = ImageOps.exif_transpose(img)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", quality=RENDER_INPUT_QUALITY, optimize=True)
+    data = buffer.getvalue()
+    _count(upload_bytes=len(data))
+    return data
+
+
+def stats() -> Dict:
+    with _lock:
+        return dict(_stats, max_side=RENDER_INPUT_MAX_SIDE)
@@ -0,0 +1,107 @@
+"""
+Output stage of the renovation pipeline.
+Every render is saved once in several sizes sharing the same stem:
+    <stem>_thumb.webp   gallery thumbnails
+    <stem>_card.webp    cards and previews
+    <stem>_full.webp    full screen (native resolution)
+    <stem>.png          lossless original, only with RENDER_KEEP_ORIGINAL=true
+The format is WebP by default, AVIF with RENDER_OUTPUT_FORMAT=avif (when Pillow supports it).
+The `_full` file is the render's primary filename (the one stored in the render cache).
+"""
+
+import os
+import mimetypes
+from io import BytesIO
+from typing import Dict, List
+
+from PIL import Image, features
+from dotenv import load_dotenv
+
+load_dotenv("../secret.env")
+
+GENERATED_DIR = "generated_images"
+PUBLIC_BASE_URL = "http://localhost:8000/generated_images"
+
+RENDER_OUTPUT_FORMAT = os.getenv("RENDER_OUTPUT_FORMAT", "webp").lower()
+RENDER_OUTPUT_QUALITY = int(os.getenv("RENDER_OUTPUT_QUALITY", "82"))
+RENDER_KEEP_ORIGINAL = os.getenv("RENDER_KEEP_ORIGINAL", "false").lower() == "true"
+
+# Lato lungo massimo per ogni variante (None = risoluzione nativa del render)
+VARIANTS = {"thumb": 320, "card": 800, "full": None}
+PRIMARY_VARIANT = "full"
+
+# Python < 3.11 non conosce il MIME di .avif (serve a StaticFiles)
+mimetypes.add_type("image/avif", ".avif")
+mimetypes.add_type("image/webp", ".webp")
+
+if RENDER_OUTPUT_FORMAT == "avif" and not features.check("avif"):
+    print("⚠️ Pillow built without AVIF support, saving renders as WebP")
+    RENDER_OUTPUT_FORMAT = "webp"
+if RENDER_OUTPUT_FORMAT not in ("webp", "avif"):
+    RENDER_OUTPUT_FORMAT = "webp"
+
+
+def stem_of(filename: str) -> str:
+    """Common stem of all the files of a render (`renovated_<hash>_card.webp` -> `renovated_<hash>`)."""
+    base = filename.rsplit(".", 1)[0]
+    for variant in VARIANTS:
+        if base.endswith("_" + variant):
+            return base[:-len(variant) - 1]
+    return base
+
+
+def save_render(image_bytes: bytes, stem: str) -> str:
+    """Writes all the variants of a generated image and returns the primary filename."""
+    image = Image.open(BytesIO(image_bytes))
+    image.load()
+
+    if RENDER_KEEP_ORIGINAL:
+        with open(os.path.join(GENERATED_DIR, f"{stem}.png"), "wb") as f:
+            f.write(image_bytes)
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGB")
+
+    ext = RENDER_OUTPUT_FORMAT
+    for variant, max_side in VARIANTS.items():
+        resized = image
+        if max_side and max(image.size) > max_side:
+            resized = image.copy()
+            resized.thumbnail((max_side, max_side), Image.LANCZOS)
+        path = os.path.join(GENERATED_DIR, f"{stem}_{variant}.{ext}")
+        # Scrittura su file temporaneo + rename: nessuno legge mai un file a metà
+        tmp_path = path + ".tmp"
+        options = {"quality": RENDER_OUTPUT_QUALITY}
+        if ext == "webp":
+            options["method"] = 4
+        resized.save(tmp_path, format=ext.upper(), **options)
+        os.replace(tmp_path, path)
+
+    return f"{stem}_{PRIMARY_VARIANT}.{ext}"
+
+
+def variant_files(filename: str) -> Dict[str, str]:
+    """Variant name -> filename for a render (primary filename, or a legacy single PNG)."""
+    stem = stem_of(filename)
+    ext = filename.rsplit(".", 1)[-1]
+    files = {
+        variant: f"{stem}_{variant}.{ext}" for variant in VARIANTS
+        if os.path.exists(os.path.join(GENERATED_DIR, f"{stem}_{variant}.{ext}"))
+    }
+    if not files:
+        # Render salvati prima delle varianti: un solo file per tutte le dimensioni
+        return {variant: filename for variant in VARIANTS}
+    if os.path.exists(os.path.join(GENERATED_DIR, f"{stem}.png")):
+        files["original"] = f"{stem}.png"
+    return files
+
+
+def render_files(filename: str) -> List[str]:
+    """All the files on disk belonging to a render (for size accounting and eviction)."""
+    return sorted(set(variant_files(filename).values()))
+
+
+def variant_urls(url: str) -> Dict[str, str]:
+    """Variant map for the public URL of a render, so the UI can pick the smallest usable file."""
+    filename = url.rsplit("/", 1)[-1]
+    return {variant: f"{PUBLIC_BASE_URL}/{name}" for variant, name in variant_files(filename).items()}
@@ -0,0 +1,195 @@
+"""
+Serving and lifecycle of the files in generated_images.
+- RenderStaticFiles: the /generated_images mount. Render files never change once written
+  (content-addressed names), so they are sent with a one-year immutable Cache-Control; ETag,
+  If-None-Match/If-Modified-Since (304) and Range requests (206) are handled by Starlette.
+- RenderStorage: a background janitor keeping the directory within RENDER_DISK_BUDGET_BYTES.
+  Renders (all their variants together) are deleted least recently accessed first; access time
+  is the file atime, set explicitly on every serve/cache hit so it does not depend on mount options.
+  Renders still referenced (e.g. by renovation jobs) and files younger than
+  RENDER_JANITOR_MIN_AGE are never deleted.
+"""
+
+import os
+import time
+import asyncio
+import threading
+from typing import Callable, Dict, Iterable, List, Set
+
+from fastapi.staticfiles import StaticFiles
+from starlette.exceptions import HTTPException
+from dotenv import load_dotenv
+
+from render_outputs import GENERATED_DIR, stem_of
+
+load_dotenv("../secret.env")
+
+RENDER_DISK_BUDGET_BYTES = int(os.getenv("RENDER_DISK_BUDGET_BYTES", str(1024 * 1024 * 1024)))
+RENDER_JANITOR_INTERVAL = int(os.getenv("RENDER_JANITOR_INTERVAL", "600"))
+RENDER_JANITOR_MIN_AGE = int(os.getenv("RENDER_JANITOR_MIN_AGE", "3600"))
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Aggiorniamo l'atime al massimo una volta ogni tanto (una syscall in meno per richiesta)
+TOUCH_RESOLUTION_SECONDS = 3600
+
+
+class RenderStorage:
+
+    def __init__(self, directory: str = GENERATED_DIR, budget_bytes: int = RENDER_DISK_BUDGET_BYTES,
+                 interval: int = RENDER_JANITOR_INTERVAL, min_age: int = RENDER_JANITOR_MIN_AGE):
+        self.directory = directory
+        self.budget_bytes = budget_bytes
+        self.interval = interval
+        self.min_age = min_age
+        self._lock = threading.Lock()
+        self._references: List[Callable[[], Iterable[str]]] = []
+        self._task = None
+
+        # Metriche
+        self._served = {"full": 0, "partial": 0, "not_modified": 0, "missing": 0}
+        self._sweeps = 0
+        self._deleted_renders = 0
+        self._deleted_bytes = 0
+        self._last_usage = {"bytes": 0, "files": 0, "renders": 0}
+
+    # --- Accessi ---
+    def record_access(self, filename: str) -> None:
+        """Marks a render as used now (file atime), for the LRU order of the janitor."""
+        path = os.path.join(self.directory, os.path.basename(filename))
+        try:
+            st = os.stat(path)
+            now = time.time()
+            if now - st.st_atime > TOUCH_RESOLUTION_SECONDS:
+                os.utime(path, (now, st.st_mtime))
+        except FileNotFoundError:
+            pass
+
+    def record_response(self, kind: str) -> None:
+        with self._lock:
+            self._served[kind] += 1
+
+    def add_references(self, provider: Callable[[], Iterable[str]]) -> None:
+        """Registers a source of filenames that must not be deleted (called from the event loop)."""
+        self._references.append(provider)
+
+    def referenced_stems(self) -> Set[str]:
+        stems = set()
+        for provider in self._references:
+            for filename in provider():
+                stems.add(stem_of(os.path.basename(filename)))
+        return stems
+
+    # --- Janitor ---
+    def _scan(self) -> Dict[str, Dict]:
+        """Groups the directory by render: stem -> {files, bytes, last_access, created}."""
+        renders: Dict[str, Dict] = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.endswith(".tmp"):
+                    continue
+                st = entry.stat()
+                group = renders.setdefault(stem_of(entry.name), {"files": [], "bytes": 0, "last_access": 0.0, "created": 0.0})
+                group["files"].append(entry.name)
+                group["bytes"] += st.st_size
+                group["last_access"] = max(group["last_access"], st.st_atime, st.st_mtime)
+                group["created"] = max(group["created"], st.st_mtime)
+        return renders
+
+    def sweep(self, protected: Set[str] = frozenset()) -> Dict:
+        """Deletes least recently accessed renders until the directory fits the budget."""
+        renders = self._scan()
+        total = sum(r["bytes"] for r in renders.values())
+        files = sum(len(r["files"]) for r in renders.values())
+        deleted, freed = 0, 0
+        now = time.time()
+
+        if total > self.budget_bytes:
+            for stem, render in sorted(renders.items(), key=lambda item: item[1]["last_access"]):
+                if total <= self.budget_bytes:
+                    break
+                if stem in protected or now - render["created"] < self.min_age:
+                    continue
+                for name in render["files"]:
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        pass
+                # La entry nella render cache si invalida da sola (il file non esiste più)
+                total -= render["bytes"]
+                files -= len(render["files"])
+                freed += render["bytes"]
+                deleted += 1
+            if deleted:
+                print(f"🧹 Janitor: removed {deleted} render(s), {freed / 1e6:.1f} MB freed")
+
+        with self._lock:
+            self._sweeps += 1
+            self._deleted_renders += deleted
+            self._deleted_bytes += freed
+            self._last_usage = {"bytes": total, "files": files, "renders": len(renders) - deleted}
+        return {"deleted": deleted, "freed_bytes": freed, "bytes": total}
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                # I riferimenti si leggono nell'event loop, la scansione del disco in un thread
+                protected = self.referenced_stems()
+                await asyncio.to_thread(self.sweep, protected)
+            except Exception as e:
+                print(f"⚠️ Render janitor failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stats(self) -> Dict:
+        with self._lock:
+            served = dict(self._served)
+            usage = dict(self._last_usage)
+            sweeps, deleted_renders, deleted_bytes = self._sweeps, self._deleted_renders, self._deleted_bytes
+        answered = served["full"] + served["partial"] + served["not_modified"]
+        return {
+            "directory_bytes": usage["bytes"],
+            "files": usage["files"],
+            "renders": usage["renders"],
+            "budget_bytes": self.budget_bytes,
+            "served": served,
+            # Quota delle richieste risolte dalla cache del browser/CDN con una revalidation (304)
+            "revalidation_hit_rate": round(served["not_modified"] / answered, 3) if answered else 0.0,
+            "sweeps": sweeps,
+            "deleted_renders": deleted_renders,
+            "deleted_bytes": deleted_bytes,
+        }
+
+
+class RenderStaticFiles(StaticFiles):
+    """StaticFiles for generated_images: immutable caching, access tracking, serve stats."""
+
+    def __init__(self, *args, storage: RenderStorage, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.storage = storage
+
+    async def get_response(self, path: str, scope):
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as e:
+            if e.status_code == 404:
+                self.storage.record_response("missing")
+            raise
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        if response.status_code == 304:
+            self.storage.record_response("not_modified")
+        else:
+            headers = dict(scope.get("headers") or [])
+            self.storage.record_response("partial" if b"range" in headers else "full")
+            self.storage.record_access(str(full_path))
+        return response
+
+
+# Istanza condivisa dal backend
+render_storage = RenderStorage()
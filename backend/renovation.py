@@ -0,0 +1,143 @@
+import hashlib
+import traceback
+from typing import Dict, Optional, Tuple
+
+from google.genai import types
+
+from clients import genai_generate, CircuitBreaker
+from render_inputs import read_source, prepare_for_model
+from render_cache import render_cache, make_key
+from render_outputs import save_render, PUBLIC_BASE_URL
+from render_storage import render_storage
+from models import ContractorQuote
+
+PRIMARY_MODEL = "gemini-3-pro-image-preview"
+FALLBACK_MODEL = "gemini-2.5-pro"
+
+# Ricorda se il modello primario non è disponibile (evita di pagare ogni volta la latenza del fallimento)
+primary_model_breaker = CircuitBreaker(PRIMARY_MODEL)
+
+def estimate_costs(style: str, mode: str, sqm: int) -> Dict:
+    """Stima del preventivo (stessa formula per l'endpoint sincrono e per i job)."""
+    base_price_mq = 600 if style == "Industrial" else 800 if style == "Modern" else 1000
+    area_to_calculate = sqm if mode == 'house' else 25
+    total_est = base_price_mq * area_to_calculate
+
+    contractors = [
+        ContractorQuote(name="EdilMilano Pro", price=int(total_est * 0.9), rating=4.8),
+        ContractorQuote(name="RistrutturaFacile", price=int(total_est * 0.85), rating=4.5),
+        ContractorQuote(name="Luxury Design Studio", price=int(total_est * 1.2), rating=4.9),
+    ]
+    return {
+        "estimated_cost_min": int(total_est * 0.9),
+        "estimated_cost_max": int(total_est * 1.1),
+        "contractors": contractors,
+    }
+
+def build_prompt(style: str) -> str:
+    # Prompt Ottimizzato per Interior Design
+    return f"""
+        Act as a professional interior designer. 
+        Renovate this room in a **{style}** style.
+        Preserve the structural elements (windows, ceiling, general layout) but completely replace furniture, flooring, and decor to match the {style} aesthetic.
+        High quality, photorealistic 4k render.
+        """
+
+def generate_render(source_bytes: bytes, full_prompt: str) -> Optional[Tuple[str, str]]:
+    """
+    Genera e salva una singola immagine usando Google GenAI (Gemini 3 Pro).
+    Il nome del file deriva dall'hash dei byte generati: un filename non cambia mai contenuto
+    (i render sono serviti come immutable), anche quando un render del fallback viene rigenerato.
+    Ritorna (filename, modello che l'ha prodotta) o None.
+    """
+    # Foto raddrizzata, RGB e ridotta alla risoluzione che il modello usa davvero (meno byte in upload)
+    input_image = types.Part.from_bytes(data=prepare_for_model(source_bytes), mime_type="image/jpeg")
+
+    # 2. Configurazione Modello (Gemini 3 Pro Image Preview)
+    model_name = PRIMARY_MODEL
+    response = None
+    
+    # Se il modello primario è noto come non disponibile andiamo subito al fallback
+    if primary_model_breaker.allow():
+        try:
+            print(f"🎨 Generating with {model_name}...")
+            response = genai_generate(
+                model=model_name,
+                contents=[full_prompt, input_image],
+                config=types.GenerateContentConfig(
+                    response_modalities=["IMAGE"], # Ci interessa solo l'immagine
+                    image_config=types.ImageConfig(
+                        aspect_ratio="4:3", # Standard per foto immobiliari
+                        image_size="2K"     # Alta qualità
+                    )
+                ),
+            )
+            primary_model_breaker.record_success()
+        except Exception as e:
+            print(f"⚠️ Primary model failed: {e}")
+            primary_model_breaker.record_failure()
+
+    if response is None:
+        print("🔄 Falling back to Gemini 2.5 Pro...")
+        # Fallback a 2.5 Pro se il 3.0 Preview non è disponibile per la chiave API
+        model_name = FALLBACK_MODEL
+        response = genai_generate(
+            model=model_name,
+            contents=[full_prompt, input_image],
+        )
+
+    # 3. Salvataggio Immagine Generata (thumb/card/full in WebP o AVIF, vedi render_outputs)
+    if hasattr(response, "parts"):
+        for part in response.parts:
+            image_bytes = None
+            if hasattr(part, "as_image"):
+                # Metodo diretto SDK
+                image = part.as_image()
+                image_bytes = image.image_bytes if image is not None else None
+            elif hasattr(part, "inline_data"):
+                # Metodo Base64
+                import base64
+                image_bytes = base64.b64decode(part.inline_data.data)
+            if image_bytes:
+                stem = f"renovated_{hashlib.sha256(image_bytes).hexdigest()[:32]}"
+                return save_render(image_bytes, stem), model_name
+    
+    print("❌ No image found in response parts.")
+    return None
+
+def accept_cached_model(model: Optional[str]) -> bool:
+    """
+    I render del modello primario valgono sempre; quelli del fallback solo finché il primario
+    è giù (circuito aperto). Appena torna disponibile (o va in probe) si rigenera con il primario.
+    """
+    return model == PRIMARY_MODEL or primary_model_breaker.state == "open"
+
+# --- HELPER: Elaborazione Singola Immagine (UPDATED FOR GEMINI 3 PRO) ---
+def process_renovation_sync(image_url: str, style: str) -> Optional[str]:
+    """
+    Legge l'immagine sorgente, poi restituisce il render dalla cache o lo genera (una sola volta
+    anche se arrivano richieste identiche in parallelo).
+    """
+    try:
+        # 1. Immagine originale: dal disco se è nostra (assets, generated_images), altrimenti download
+        source_bytes = read_source(image_url)
+
+        full_prompt = build_prompt(style)
+        key = make_key(source_bytes, style, full_prompt, PRIMARY_MODEL)
+
+        renovated_filename = render_cache.get_or_generate(
+            key, lambda: generate_render(source_bytes, full_prompt), accept=accept_cached_model
+        )
+        
+        if renovated_filename:
+            print(f"✅ Image ready: {renovated_filename}")
+            # Anche un hit della render cache conta come accesso (ordine LRU del janitor)
+            render_storage.record_access(renovated_filename)
+            # URL per il frontend
+            return f"{PUBLIC_BASE_URL}/{renovated_filename}"
+            
+    except Exception as e:
+        print(f"⚠️ Error processing {image_url[-15:]}: {e}")
+        traceback.print_exc()
+    
+    return None
@@ -0,0 +1,186 @@
+"""
+Asynchronous renovation jobs.
+Submitting returns a job id at once; every room is rendered independently and published as
+soon as it is ready, so clients can follow the job over SSE (replay + live events) or by polling.
+Jobs live in the event loop: no locks, results stay attached to the id until JOB_TTL_SECONDS.
+"""
+
+import os
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from models import RenovateRequest
+from renovation import process_renovation_sync, estimate_costs
+from render_outputs import variant_urls
+from streaming import sse_event
+from generation_scheduler import generation_scheduler, PRIORITY_ROOM, PRIORITY_HOUSE
+
+JOB_TTL_SECONDS = int(os.getenv("RENOVATION_JOB_TTL", "3600"))
+MAX_JOBS = int(os.getenv("RENOVATION_MAX_JOBS", "500"))
+# Limitiamo a max 4 immagini per sicurezza demo (evitare rate limits)
+MAX_HOUSE_IMAGES = 4
+
+TERMINAL_STATES = ("done", "failed", "cancelled")
+
+
+class RenovationJob:
+
+    def __init__(self, request: RenovateRequest, user: str):
+        self.id = uuid.uuid4().hex
+        self.user = user
+        self.style = request.style
+        self.mode = request.mode
+        if request.mode == "house" and request.gallery_images:
+            self.sources = list(request.gallery_images[:MAX_HOUSE_IMAGES])
+            self.priority = PRIORITY_HOUSE
+        else:
+            self.sources = [request.image_url]
+            self.priority = PRIORITY_ROOM
+        self.estimate = estimate_costs(request.style, request.mode, request.sqm)
+        self.status = "queued"
+        self.images: List[Dict[str, Any]] = [
+            {"index": i, "source_url": url, "status": "pending", "url": None, "variants": {}} for i, url in enumerate(self.sources)
+        ]
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.events: List[tuple] = []
+        self._subscribers: List[asyncio.Queue] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATES
+
+    def snapshot(self) -> Dict:
+        ready = [img for img in self.images if img["url"]]
+        gallery = [img["url"] for img in ready]
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "mode": self.mode,
+            "style": self.style,
+            "total": len(self.images),
+            "completed": sum(img["status"] != "pending" for img in self.images),
+            "renovated_image_url": gallery[0] if gallery else None,
+            "renovated_gallery": gallery,
+            "renovated_variants": [img["variants"] or None for img in ready],
+            "images": [dict(img, variants=dict(img["variants"])) for img in self.images],
+            **self.estimate,
+        }
+
+    def publish(self, event: str, data: Dict) -> None:
+        # Lo storico serve per il replay di chi si collega (o si ricollega) a job avviato
+        self.events.append((event, data))
+        for queue in self._subscribers:
+            queue.put_nowait((event, data))
+
+
+class RenovationJobManager:
+
+    def __init__(self, ttl_seconds: int = JOB_TTL_SECONDS, max_jobs: int = MAX_JOBS):
+        self.ttl_seconds = ttl_seconds
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, RenovationJob]" = OrderedDict()
+        self._submitted = 0
+        self._cancelled = 0
+
+    def submit(self, request: RenovateRequest, user: str) -> RenovationJob:
+        """Creates the job and starts it in the background. Must be called from the event loop."""
+        self._purge()
+        job = RenovationJob(request, user)
+        self._jobs[job.id] = job
+        self._submitted += 1
+        job.publish("status", {"job": job.snapshot()})
+        job._task = asyncio.get_running_loop().create_task(self._run(job))
+        print(f"🧾 Renovation job {job.id[:8]}: {len(job.sources)} image(s), {job.style} ({job.mode})")
+        return job
+
+    def get(self, job_id: str) -> Optional[RenovationJob]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[RenovationJob]:
+        job = self._jobs.get(job_id)
+        if job is not None and not job.finished and job._task is not None:
+            job._task.cancel()
+        return job
+
+    async def _render(self, job: RenovationJob, index: int) -> None:
+        image = job.images[index]
+        # Le generazioni passano dallo scheduler globale (rate limit, priorità, turno tra utenti)
+        url = await generation_scheduler.submit(
+            process_renovation_sync, image["source_url"], job.style, user=job.user, priority=job.priority,
+        )
+        image["status"] = "done" if url else "failed"
+        image["url"] = url
+        if url:
+            image["variants"] = variant_urls(url)
+        job.publish("image", {"image": dict(image), "job": job.snapshot()})
+
+    async def _run(self, job: RenovationJob) -> None:
+        job.status = "running"
+        job.publish("status", {"job": job.snapshot()})
+        try:
+            await asyncio.gather(*(self._render(job, i) for i in range(len(job.images))))
+            job.status = "done" if any(img["url"] for img in job.images) else "failed"
+        except asyncio.CancelledError:
+            # I thread già avviati finiscono comunque (il render resta in cache), il risultato viene scartato
+            job.status = "cancelled"
+            self._cancelled += 1
+            for img in job.images:
+                if img["status"] == "pending":
+                    img["status"] = "cancelled"
+        except Exception as e:
+            print(f"⚠️ Renovation job {job.id[:8]} failed: {e}")
+            job.status = "failed"
+        job.finished_at = time.time()
+        job.publish(job.status, {"job": job.snapshot()})
+        print(f"🏁 Renovation job {job.id[:8]}: {job.status}")
+
+    async def stream(self, job: RenovationJob) -> AsyncIterator[str]:
+        """SSE: replays the events so far, then follows the job until it ends."""
+        queue: asyncio.Queue = asyncio.Queue()
+        # Nessun await tra la copia dello storico e l'iscrizione: nessun evento perso o duplicato
+        history = list(job.events)
+        job._subscribers.append(queue)
+        try:
+            for event, data in history:
+                yield sse_event(event, data)
+                if event in TERMINAL_STATES:
+                    return
+            while True:
+                event, data = await queue.get()
+                yield sse_event(event, data)
+                if event in TERMINAL_STATES:
+                    return
+        finally:
+            # Il client si è disconnesso o il job è finito: il job prosegue comunque
+            job._subscribers.remove(queue)
+
+    def referenced_files(self) -> List[str]:
+        """Renders attached to the jobs still kept in memory (protected from the janitor)."""
+        return [img["url"].rsplit("/", 1)[-1] for job in self._jobs.values() for img in job.images if img["url"]]
+
+    def _purge(self) -> None:
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and now - job.finished_at > self.ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        # Oltre il limite scartiamo i job conclusi più vecchi
+        for job_id in [j for j, job in self._jobs.items() if job.finished][:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict:
+        states: Dict[str, int] = {}
+        for job in self._jobs.values():
+            states[job.status] = states.get(job.status, 0) + 1
+        return {"jobs": len(self._jobs), "states": states, "submitted": self._submitted, "cancelled": self._cancelled}
+
+
+# Istanza condivisa dal backend
+renovation_jobs = RenovationJobManager()
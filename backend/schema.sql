@@ -51,10 +51,126 @@ CREATE INDEX IF NOT EXISTS idx_properties_rooms ON properties(rooms);
 CREATE INDEX IF NOT EXISTS idx_properties_specs ON properties USING GIN (specs);
 CREATE INDEX IF NOT EXISTS idx_property_images_property_id ON property_images(property_id);
 
--- 4. ENABLE ROW LEVEL SECURITY (Optional for MVP, recommended for production)
+-- 4. PROPERTY_CARDS: denormalized read model (one row = one UI card)
+-- Kept up to date by the ingest path (seed_db.py calls refresh_property_card after each listing).
+-- Search tools and the agent read this table instead of aggregating property_images per request.
+CREATE TABLE IF NOT EXISTS property_cards (
+    id UUID PRIMARY KEY REFERENCES properties(id) ON DELETE CASCADE,
+    title TEXT NOT NULL,
+    city TEXT,
+    zone TEXT,
+    address TEXT,
+    price INTEGER,
+    rooms INTEGER,
+    bathrooms INTEGER,
+    sqm INTEGER,
+    floor INTEGER,
+    total_floors INTEGER,
+    elevator BOOLEAN,
+    specs JSONB DEFAULT '{}'::jsonb,
+    description_ai TEXT,
+    ai_vibe_tags TEXT[],
+    main_image TEXT,
+    images TEXT[] DEFAULT '{}',  -- ordered gallery, main image first
+    gallery JSONB DEFAULT '[]'::jsonb, -- [{"url", "room_type", "is_main"}] same order as images
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_property_cards_zone ON property_cards(zone);
+CREATE INDEX IF NOT EXISTS idx_property_cards_price ON property_cards(price);
+CREATE INDEX IF NOT EXISTS idx_property_cards_rooms ON property_cards(rooms);
+CREATE INDEX IF NOT EXISTS idx_property_cards_specs ON property_cards USING GIN (specs);
+
+-- Set-based refresh of many cards in one statement (bulk loads: scripts/bulk_load.py)
+CREATE OR REPLACE FUNCTION refresh_property_cards(pids UUID[]) RETURNS INTEGER AS $$
+DECLARE
+    n INTEGER;
+BEGIN
+    INSERT INTO property_cards (
+        id, title, city, zone, address, price, rooms, bathrooms, sqm, floor, total_floors,
+        elevator, specs, description_ai, ai_vibe_tags, main_image, images, gallery, updated_at
+    )
+    SELECT
+        p.id, p.title, p.city, p.zone, p.address, p.price, p.rooms, p.bathrooms, p.sqm, p.floor,
+        p.total_floors, p.elevator, p.specs, p.description_ai, p.ai_vibe_tags,
+        g.images[1], COALESCE(g.images, '{}'), COALESCE(g.gallery, '[]'::jsonb), NOW()
+    FROM properties p
+    LEFT JOIN LATERAL (
+        SELECT
+            array_agg(pi.storage_url ORDER BY pi.is_main DESC, pi.id) AS images,
+            jsonb_agg(jsonb_build_object('url', pi.storage_url, 'room_type', pi.room_type, 'is_main', pi.is_main)
+                      ORDER BY pi.is_main DESC, pi.id) AS gallery
+        FROM property_images pi
+        WHERE pi.property_id = p.id
+    ) g ON TRUE
+    WHERE p.id = ANY(pids)
+    ON CONFLICT (id) DO UPDATE SET
+        title = EXCLUDED.title, city = EXCLUDED.city, zone = EXCLUDED.zone, address = EXCLUDED.address,
+        price = EXCLUDED.price, rooms = EXCLUDED.rooms, bathrooms = EXCLUDED.bathrooms, sqm = EXCLUDED.sqm,
+        floor = EXCLUDED.floor, total_floors = EXCLUDED.total_floors, elevator = EXCLUDED.elevator,
+        specs = EXCLUDED.specs, description_ai = EXCLUDED.description_ai, ai_vibe_tags = EXCLUDED.ai_vibe_tags,
+        main_image = EXCLUDED.main_image, images = EXCLUDED.images, gallery = EXCLUDED.gallery,
+        updated_at = EXCLUDED.updated_at;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION refresh_property_card(pid UUID) RETURNS VOID AS $$
+BEGIN
+    PERFORM refresh_property_cards(ARRAY[pid]);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill / full rebuild: SELECT refresh_all_property_cards();
+CREATE OR REPLACE FUNCTION refresh_all_property_cards() RETURNS INTEGER AS $$
+BEGIN
+    DELETE FROM property_cards c WHERE NOT EXISTS (SELECT 1 FROM properties p WHERE p.id = c.id);
+    RETURN refresh_property_cards(ARRAY(SELECT id FROM properties));
+END;
+$$ LANGUAGE plpgsql;
+
+-- 5. CHANGE NOTIFICATIONS (cache invalidation in the backend, see catalog_events.py)
+-- Every write on the catalog sends NOTIFY catalog_changed, '<table>:<property_id>'.
+-- Bulk loads set catalog.bulk_load = 'on' for their transaction and send a single '*:' instead.
+CREATE OR REPLACE FUNCTION notify_catalog_changed() RETURNS trigger AS $$
+DECLARE
+    changed_id UUID;
+BEGIN
+    IF current_setting('catalog.bulk_load', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_TABLE_NAME IN ('properties', 'property_cards') THEN
+        changed_id := COALESCE(NEW.id, OLD.id);
+    ELSE
+        changed_id := COALESCE(NEW.property_id, OLD.property_id);
+    END IF;
+    PERFORM pg_notify('catalog_changed', TG_TABLE_NAME || ':' || COALESCE(changed_id::text, ''));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_properties_changed ON properties;
+CREATE TRIGGER trg_properties_changed
+    AFTER INSERT OR UPDATE OR DELETE ON properties
+    FOR EACH ROW EXECUTE FUNCTION notify_catalog_changed();
+
+DROP TRIGGER IF EXISTS trg_property_images_changed ON property_images;
+CREATE TRIGGER trg_property_images_changed
+    AFTER INSERT OR UPDATE OR DELETE ON property_images
+    FOR EACH ROW EXECUTE FUNCTION notify_catalog_changed();
+
+DROP TRIGGER IF EXISTS trg_property_cards_changed ON property_cards;
+CREATE TRIGGER trg_property_cards_changed
+    AFTER INSERT OR UPDATE OR DELETE ON property_cards
+    FOR EACH ROW EXECUTE FUNCTION notify_catalog_changed();
+
+-- 6. ENABLE ROW LEVEL SECURITY (Optional for MVP, recommended for production)
 -- ALTER TABLE properties ENABLE ROW LEVEL SECURITY;
 -- ALTER TABLE property_images ENABLE ROW LEVEL SECURITY;
+-- ALTER TABLE property_cards ENABLE ROW LEVEL SECURITY;
 
--- 5. CREATE POLICY for public read access (uncomment if using RLS)
+-- 7. CREATE POLICY for public read access (uncomment if using RLS)
 -- CREATE POLICY "Allow public read access" ON properties FOR SELECT USING (true);
 -- CREATE POLICY "Allow public read access" ON property_images FOR SELECT USING (true);
+-- CREATE POLICY "Allow public read access" ON property_cards FOR SELECT USING (true);
@@ -0,0 +1,265 @@
+"""
+Query-plan benchmark for schema.sql against a LOCAL Postgres.
+For each catalog size it:
+  1. creates an isolated schema (bench_<size>) with schema.sql,
+  2. loads a synthetic catalog server-side (generate_series, deterministic seed),
+  3. replays a corpus of representative agent queries with EXPLAIN ANALYZE (baseline indexes),
+  4. applies search_indexes.sql and replays the corpus again (tuned indexes).
+Results: markdown table on stdout + JSON file.
+
+Usage:
+    python backend/scripts/bench_queries.py --dsn postgresql://postgres@localhost/bench --sizes 10000 100000 1000000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import psycopg2
+
+BASE_PATH = Path(__file__).parent.parent
+SCHEMA_FILE = BASE_PATH / "schema.sql"
+INDEXES_FILE = BASE_PATH / "search_indexes.sql"
+
+ZONES = [
+    "Milano|Brera", "Milano|Isola", "Milano|Navigli", "Milano|Città Studi", "Milano|Porta Romana",
+    "Milano|NoLo", "Milano|Corvetto", "Milano|City Life", "Roma|Trastevere", "Roma|Monti",
+    "Roma|Prati", "Torino|Crocetta", "Torino|San Salvario", "Bologna|Saragozza",
+]
+
+# --- DATI SINTETICI (tutto lato server: niente round trip per riga) ---
+LOAD_PROPERTIES = """
+SELECT setseed(%(seed)s);
+INSERT INTO properties (title, price, sqm, rooms, bathrooms, floor, total_floors, elevator,
+                        zone, city, address, specs, description_original, description_ai, ai_vibe_tags)
+SELECT
+    adj || ' ' || typ || ' in ' || split_part(zc, '|', 2),
+    -- Affitti a canone mensile (12-25 €/mq), vendite 3500-9000 €/mq: come il catalogo reale
+    CASE WHEN rent THEN (sqm * (12 + floor(random() * 14)))::int / 10 * 10
+         ELSE (sqm * (3500 + floor(random() * 5500)))::int / 1000 * 1000 END,
+    sqm, rooms, 1 + floor(random() * 3)::int, fl, 10, random() > 0.25,
+    split_part(zc, '|', 2), split_part(zc, '|', 1),
+    street || ' ' || (1 + floor(random() * 150))::int || ', ' || split_part(zc, '|', 1),
+    jsonb_build_object(
+        'heating', (ARRAY['Autonomo','Centralizzato'])[1 + floor(random() * 2)::int],
+        'ac', (ARRAY['Presente','Predisposizione'])[1 + floor(random() * 2)::int],
+        'contract', CASE WHEN rent THEN 'Affitto' ELSE 'Vendita' END,
+        'furnished', (ARRAY['Arredato','Vuoto'])[1 + floor(random() * 2)::int],
+        'type', typ
+    ),
+    'Ottimo investimento, zona servitissima e collegata con il centro.',
+    (ARRAY['Luminoso e silenzioso, ideale per famiglie.', 'Moderno con finiture di pregio e vista aperta.',
+           'Da ristrutturare, grande potenziale e affaccio sul cortile.', 'Accogliente, vicino ai parchi, perfetto con animali.'])
+        [1 + floor(random() * 4)::int],
+    ARRAY['bright', 'modern']
+FROM (
+    SELECT
+        g,
+        rooms,
+        random() < 0.2 AS rent,
+        rooms * (18 + floor(random() * 13))::int AS sqm,
+        1 + floor(random() * 10)::int AS fl,
+        (%(zones)s::text[])[1 + floor(random() * %(n_zones)s)::int] AS zc,
+        (ARRAY['Luminoso','Ampio','Prestigioso','Tranquillo','Storico','Moderno','Ristrutturato','Panoramico'])[1 + floor(random() * 8)::int] AS adj,
+        (ARRAY['Bilocale','Trilocale','Quadrilocale','Attico','Loft'])[1 + floor(random() * 5)::int] AS typ,
+        (ARRAY['Via Roma','Corso Italia','Via Dante','Viale Monza','Via Torino','Corso Buenos Aires','Via Savona'])[1 + floor(random() * 7)::int] AS street
+    FROM (SELECT g, 2 + floor(random() * 4)::int AS rooms FROM generate_series(1, %(n)s) g) s
+) r;
+"""
+
+LOAD_IMAGES = """
+INSERT INTO property_images (property_id, storage_url, room_type, is_main)
+SELECT p.id, 'https://cdn.example.com/listings/' || p.id || '/' || k || '.jpg',
+       (ARRAY['Living Room','Kitchen','Bedroom','Bathroom','Dining Room'])[k], k = 1
+FROM properties p, generate_series(1, 5) k;
+"""
+
+# Come refresh_all_property_cards(), ma set-based (1M righe in un solo statement)
+LOAD_CARDS = """
+INSERT INTO property_cards (id, title, city, zone, address, price, rooms, bathrooms, sqm, floor, total_floors,
+                            elevator, specs, description_ai, ai_vibe_tags, main_image, images, gallery)
+SELECT p.id, p.title, p.city, p.zone, p.address, p.price, p.rooms, p.bathrooms, p.sqm, p.floor, p.total_floors,
+       p.elevator, p.specs, p.description_ai, p.ai_vibe_tags, g.images[1], g.images, g.gallery
+FROM properties p
+LEFT JOIN LATERAL (
+    SELECT array_agg(pi.storage_url ORDER BY pi.is_main DESC, pi.id) AS images,
+           jsonb_agg(jsonb_build_object('url', pi.storage_url, 'room_type', pi.room_type, 'is_main', pi.is_main)
+                     ORDER BY pi.is_main DESC, pi.id) AS gallery
+    FROM property_images pi WHERE pi.property_id = p.id
+) g ON TRUE;
+"""
+
+# --- CORPUS: query tipiche scritte dall'agente / generate dai tool ---
+LEGACY_SELECT = """
+SELECT p.id::text AS id, p.title, p.city, p.zone, p.address, p.price, p.rooms, p.bathrooms, p.sqm,
+       p.floor, p.total_floors, p.elevator, p.specs, p.description_ai,
+       (SELECT storage_url FROM property_images WHERE property_id = p.id LIMIT 1) AS main_image,
+       array_agg(pi.storage_url) AS all_images
+FROM properties p
+LEFT JOIN property_images pi ON p.id = pi.property_id
+"""
+
+CARDS_SELECT = """
+SELECT id::text AS id, title, city, zone, address, price, rooms, bathrooms, sqm, floor, total_floors,
+       elevator, specs, description_ai, main_image, images
+FROM property_cards
+"""
+
+# Stessa forma della query di tools.search_property_cards (alias p, lower() su zone/city, specs @>)
+TOOL_SELECT = """
+SELECT p.id::text AS id, p.title, p.city, p.zone, p.address, p.price, p.rooms, p.bathrooms, p.sqm,
+       p.floor, p.total_floors, p.elevator, p.specs, p.description_ai, p.main_image, p.images,
+       p.ai_vibe_tags, p.gallery
+FROM property_cards p
+"""
+
+QUERIES = {
+    # Pattern storico del SYSTEM_PROMPT (aggregazione per richiesta)
+    "legacy_zone_price_rooms": LEGACY_SELECT + "WHERE p.zone = 'Isola' AND p.price BETWEEN 300000 AND 500000 AND p.rooms >= 3 GROUP BY p.id LIMIT 5",
+    "legacy_specs_rent": LEGACY_SELECT + "WHERE p.specs @> '{\"contract\": \"Affitto\"}' AND p.zone = 'Navigli' GROUP BY p.id LIMIT 5",
+    "legacy_ilike_address": LEGACY_SELECT + "WHERE p.address ILIKE '%corso italia 1%' GROUP BY p.id LIMIT 5",
+    # Read model property_cards
+    "cards_zone_price_rooms": CARDS_SELECT + "WHERE zone = 'Isola' AND price BETWEEN 300000 AND 500000 AND rooms >= 3 ORDER BY price LIMIT 5",
+    "cards_tool_lower_zone": CARDS_SELECT + "WHERE lower(zone) = lower('isola') AND price <= 450000 AND rooms >= 2 ORDER BY price ASC LIMIT 5",
+    "cards_tool_city_price_desc": CARDS_SELECT + "WHERE lower(city) = lower('Milano') AND rooms >= 4 ORDER BY price DESC LIMIT 5",
+    "cards_specs_elevator": CARDS_SELECT + "WHERE specs @> '{\"contract\": \"Vendita\", \"heating\": \"Autonomo\"}' AND elevator AND price <= 400000 ORDER BY price LIMIT 5",
+    "cards_rent_zone": CARDS_SELECT + "WHERE specs @> '{\"contract\": \"Affitto\"}' AND zone = 'Isola' ORDER BY price LIMIT 5",
+    "cards_ilike_address": CARDS_SELECT + "WHERE address ILIKE '%corso italia 1%' LIMIT 5",
+    "cards_ilike_title_zone": CARDS_SELECT + "WHERE title ILIKE '%attico%' AND zone = 'Brera' LIMIT 5",
+    "cards_ilike_description": CARDS_SELECT + "WHERE description_ai ILIKE '%animali%' AND price <= 300000 LIMIT 5",
+    # Ricerche testuali senza risultati: senza indice trigram leggono tutta la tabella
+    "legacy_ilike_address_miss": LEGACY_SELECT + "WHERE p.address ILIKE '%piazza duomo%' GROUP BY p.id LIMIT 5",
+    "cards_ilike_address_miss": CARDS_SELECT + "WHERE address ILIKE '%piazza duomo%' LIMIT 5",
+    "cards_ilike_title_miss": CARDS_SELECT + "WHERE title ILIKE '%mansarda%' LIMIT 5",
+    "cards_ilike_description_miss": CARDS_SELECT + "WHERE description_ai ILIKE '%piscina%' LIMIT 5",
+    # search_properties (tools.py): un "specs @>" per chiave
+    "tool_zone_budget": TOOL_SELECT + "WHERE lower(p.zone) = lower('Isola') AND p.price <= 450000 AND p.rooms >= 2 ORDER BY p.price ASC LIMIT 5",
+    "tool_city_rooms_desc": TOOL_SELECT + "WHERE lower(p.city) = lower('Roma') AND p.rooms >= 4 ORDER BY p.price DESC LIMIT 5",
+    "tool_city_sqm_desc": TOOL_SELECT + "WHERE lower(p.city) = lower('Torino') AND p.elevator = true ORDER BY p.sqm DESC LIMIT 5",
+    "tool_zone_sqm_desc": TOOL_SELECT + "WHERE lower(p.zone) = lower('Brera') AND p.rooms >= 3 ORDER BY p.sqm DESC LIMIT 5",
+    "tool_zone_rent_budget": TOOL_SELECT + "WHERE lower(p.zone) = lower('Navigli') AND p.price <= 1500 AND p.specs @> CAST('{\"contract\": \"Affitto\"}' AS jsonb) ORDER BY p.price ASC LIMIT 5",
+    "tool_zone_rent_desc": TOOL_SELECT + "WHERE lower(p.zone) = lower('Navigli') AND p.specs @> CAST('{\"contract\": \"Affitto\"}' AS jsonb) ORDER BY p.price DESC LIMIT 5",
+    "tool_city_rent_desc": TOOL_SELECT + "WHERE lower(p.city) = lower('Milano') AND p.specs @> CAST('{\"contract\": \"Affitto\"}' AS jsonb) AND p.specs @> CAST('{\"furnished\": \"Arredato\"}' AS jsonb) ORDER BY p.price DESC LIMIT 5",
+    "tool_city_sale_budget": TOOL_SELECT + "WHERE lower(p.city) = lower('Milano') AND p.price <= 300000 AND p.specs @> CAST('{\"contract\": \"Vendita\"}' AS jsonb) ORDER BY p.price ASC LIMIT 5",
+    "tool_zone_sale_budget": TOOL_SELECT + "WHERE lower(p.zone) = lower('Isola') AND p.price <= 300000 AND p.specs @> CAST('{\"contract\": \"Vendita\"}' AS jsonb) ORDER BY p.price ASC LIMIT 5",
+    "tool_sale_budget": TOOL_SELECT + "WHERE p.price <= 250000 AND p.specs @> CAST('{\"contract\": \"Vendita\"}' AS jsonb) ORDER BY p.price ASC LIMIT 5",
+    "tool_rent_heating": TOOL_SELECT + "WHERE p.specs @> CAST('{\"contract\": \"Affitto\"}' AS jsonb) AND p.specs @> CAST('{\"heating\": \"Autonomo\"}' AS jsonb) ORDER BY p.price DESC LIMIT 5",
+    "tool_city_no_elevator_desc": TOOL_SELECT + "WHERE lower(p.city) = lower('Roma') AND p.elevator = false ORDER BY p.price DESC LIMIT 5",
+}
+
+
+def explain(cur, sql: str, runs: int) -> dict:
+    """Median execution time of EXPLAIN ANALYZE over `runs` (after one warm-up) and the top plan nodes."""
+    timings = []
+    plan = None
+    for i in range(runs + 1):
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql)
+        result = cur.fetchone()[0][0]
+        if i == 0:
+            continue  # warm-up: cache fredda
+        timings.append(result["Execution Time"])
+        plan = result["Plan"]
+
+    def nodes(node, out):
+        name = node["Node Type"]
+        if node.get("Index Name"):
+            name += f" ({node['Index Name']})"
+        out.append(name)
+        for child in node.get("Plans", []):
+            nodes(child, out)
+        return out
+
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "plan": nodes(plan, [])[:6],
+    }
+
+
+def run_corpus(cur, runs: int) -> dict:
+    return {name: explain(cur, sql, runs) for name, sql in QUERIES.items()}
+
+
+def bench_size(conn, size: int, runs: int, seed: float) -> dict:
+    schema = f"bench_{size}"
+    cur = conn.cursor()
+
+    print(f"\n📦 [{size:,} listings] preparing schema {schema}...")
+    cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema};")
+    cur.execute(f"SET search_path TO {schema}, public, extensions;")
+    cur.execute(SCHEMA_FILE.read_text())
+    # Niente NOTIFY durante il caricamento massivo
+    for table in ("properties", "property_images", "property_cards"):
+        cur.execute(f"DROP TRIGGER IF EXISTS trg_{table}_changed ON {table};")
+
+    started = time.perf_counter()
+    cur.execute(LOAD_PROPERTIES, {"seed": seed, "n": size, "zones": ZONES, "n_zones": len(ZONES)})
+    cur.execute(LOAD_IMAGES)
+    cur.execute(LOAD_CARDS)
+    cur.execute("ANALYZE;")
+    load_s = time.perf_counter() - started
+    print(f"   loaded in {load_s:.1f}s")
+
+    print("   ⏱️  baseline indexes (schema.sql)...")
+    before = run_corpus(cur, runs)
+
+    print("   🛠️  applying search_indexes.sql...")
+    started = time.perf_counter()
+    cur.execute(INDEXES_FILE.read_text())
+    cur.execute("ANALYZE;")
+    index_s = time.perf_counter() - started
+
+    print("   ⏱️  tuned indexes...")
+    after = run_corpus(cur, runs)
+
+    cur.execute(f"DROP SCHEMA {schema} CASCADE;")
+    cur.execute("SET search_path TO DEFAULT;")
+    return {"size": size, "load_seconds": round(load_s, 1), "index_build_seconds": round(index_s, 1),
+            "before": before, "after": after}
+
+
+def print_report(results: list) -> None:
+    for res in results:
+        print(f"\n### {res['size']:,} listings (load {res['load_seconds']}s, tuned index build {res['index_build_seconds']}s)\n")
+        print("| query | before (ms) | after (ms) | speedup | plan after |")
+        print("|---|---:|---:|---:|---|")
+        for name in QUERIES:
+            b, a = res["before"][name], res["after"][name]
+            speedup = b["median_ms"] / a["median_ms"] if a["median_ms"] else float("inf")
+            print(f"| {name} | {b['median_ms']} | {a['median_ms']} | {speedup:.1f}x | {' > '.join(a['plan'][:3])} |")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=os.getenv("BENCH_DATABASE_URL"), help="Local Postgres DSN (default: BENCH_DATABASE_URL)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--runs", type=int, default=5, help="EXPLAIN ANALYZE runs per query (median)")
+    parser.add_argument("--seed", type=float, default=0.42, help="setseed() value, in [-1, 1]")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--allow-remote", action="store_true", help="Allow a non-local host (never the production DB!)")
+    args = parser.parse_args()
+
+    if not args.dsn:
+        parser.error("Missing --dsn (or BENCH_DATABASE_URL)")
+    host = urlparse(args.dsn).hostname or "localhost"
+    if host not in ("localhost", "127.0.0.1", "::1") and not args.allow_remote:
+        parser.error(f"Refusing to benchmark on remote host '{host}': use a local Postgres or --allow-remote")
+
+    conn = psycopg2.connect(args.dsn)
+    conn.autocommit = True
+
+    results = [bench_size(conn, size, args.runs, args.seed) for size in args.sizes]
+    conn.close()
+
+    print_report(results)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Bulk load path for the catalog over DATABASE_URL, for catalogs too large for the row-by-row
+REST inserts of seed_db.py (100k listings = minutes instead of days of round trips).
+- Listings are buffered and written per batch with COPY (properties, property_images), all inside
+  ONE transaction: either the whole catalog is loaded or nothing is.
+- Ids are generated client side, so photos reference their property without reading it back.
+- description_ai / ai_vibe_tags are staged in a temporary table and applied with one
+  UPDATE ... FROM per batch (they can arrive after the listing, e.g. from the vision stage).
+- property_cards are refreshed set-based per batch (refresh_property_cards in schema.sql).
+- The per-row NOTIFY triggers are muted for the transaction (catalog.bulk_load); a single
+  '*' notification at commit tells the backends to reload the catalog.
+
+Input listing: the fields of real_data.json plus
+    "property_id"                  optional, generated when missing
+    "image_rows"                   [{"storage_url", "room_type", "renovation_potential", "is_main"}]
+    or "image_urls"                plain list of URLs (the first is the main photo)
+    "description_ai", "ai_vibe_tags"  optional
+
+Usage:
+    python backend/scripts/bulk_load.py --input listings.jsonl
+    python backend/scripts/bulk_load.py --input backend/real_data.json   (photos from the ingest manifest)
+    python backend/scripts/generate_house.py --count 1000000 --to-db       (synthetic catalog, see there)
+"""
+
+import os
+import io
+import csv
+import sys
+import json
+import time
+import uuid
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv("../../secret.env")
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "5000"))
+
+PROPERTY_COLUMNS = ("id", "title", "price", "sqm", "rooms", "bathrooms", "floor", "total_floors", "elevator",
+                    "zone", "city", "address", "specs", "description_original")
+IMAGE_COLUMNS = ("id", "property_id", "storage_url", "room_type", "renovation_potential", "is_main")
+AI_COLUMNS = ("id", "description_ai", "ai_vibe_tags")
+
+STAGE_AI = """
+CREATE TEMP TABLE bulk_ai (id UUID PRIMARY KEY, description_ai TEXT, ai_vibe_tags TEXT[]) ON COMMIT DROP;
+"""
+APPLY_AI = """
+UPDATE properties p
+SET description_ai = s.description_ai, ai_vibe_tags = s.ai_vibe_tags
+FROM bulk_ai s
+WHERE p.id = s.id;
+TRUNCATE bulk_ai;
+"""
+
+
+def _pg_array(values: Optional[Iterable[str]]) -> Optional[str]:
+    """Text literal of a TEXT[] for COPY (None stays NULL)."""
+    if values is None:
+        return None
+    items = ('"' + str(v).replace("\\", "\\\\").replace('"', '\\"') + '"' for v in values)
+    return "{" + ",".join(items) + "}"
+
+
+def _pg_bool(value) -> Optional[str]:
+    return None if value is None else ("true" if value else "false")
+
+
+def property_record(prop: dict, property_id: str) -> tuple:
+    # Stessi default di seed_db.property_payload
+    specs = prop.get("specs") or prop.get("features") or {}
+    return (
+        property_id, prop["title"], prop.get("price"), prop.get("sqm"), prop.get("rooms"), prop.get("bathrooms"),
+        prop.get("floor"), prop.get("total_floors"), _pg_bool(prop.get("elevator")), prop.get("zone"),
+        prop.get("city", "Milano"), prop.get("address"), json.dumps(specs, ensure_ascii=False),
+        prop.get("description_original"),
+    )
+
+
+def image_rows_of(prop: dict) -> List[dict]:
+    if prop.get("image_rows") is not None:
+        return prop["image_rows"]
+    return [{"storage_url": url, "is_main": i == 0} for i, url in enumerate(prop.get("image_urls") or [])]
+
+
+class _CopyBuffer:
+    """CSV rows for one COPY, kept in memory only until the batch is flushed."""
+
+    def __init__(self, table: str, columns: tuple):
+        self.sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+        self.rows = 0
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def add(self, row: tuple) -> None:
+        # csv: None -> campo vuoto non quotato -> NULL
+        self._writer.writerow(row)
+        self.rows += 1
+
+    def copy(self, cur) -> int:
+        rows = self.rows
+        if rows:
+            self._buffer.seek(0)
+            cur.copy_expert(self.sql, self._buffer)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self.rows = 0
+        return rows
+
+
+class BulkLoader:
+    """
+    with BulkLoader(dsn) as loader:
+        for listing in listings:
+            loader.add(listing)
+    Commits on a clean exit, rolls everything back on an exception.
+    """
+
+    def __init__(self, dsn: str, batch_size: int = BULK_BATCH_SIZE):
+        self.dsn = dsn
+        self.batch_size = batch_size
+        self._conn = None
+        self._cur = None
+        self._properties = _CopyBuffer("properties", PROPERTY_COLUMNS)
+        self._images = _CopyBuffer("property_images", IMAGE_COLUMNS)
+        self._ai = _CopyBuffer("bulk_ai", AI_COLUMNS)
+        # id -> (description, tags): l'ultimo valore vince, niente duplicati nell'UPDATE ... FROM
+        self._pending_ai: Dict[str, tuple] = {}
+        self._touched: List[str] = []
+
+        # Metriche
+        self.listings = 0
+        self.images = 0
+        self.ai_updates = 0
+        self.cards = 0
+        self.batches = 0
+        self._started = 0.0
+
+    def __enter__(self) -> "BulkLoader":
+        self._conn = psycopg2.connect(self.dsn)
+        self._cur = self._conn.cursor()
+        # Niente NOTIFY per riga in questa transazione (schema.sql: notify_catalog_changed)
+        self._cur.execute("SELECT set_config('catalog.bulk_load', 'on', true);")
+        self._cur.execute(STAGE_AI)
+        self._started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                self.flush()
+                self._cur.execute("SELECT pg_notify('catalog_changed', '*:');")
+                self._conn.commit()
+            else:
+                self._conn.rollback()
+                print(f"❌ Bulk load rolled back after {self.listings} listings: {exc}")
+        finally:
+            self._conn.close()
+
+    def add(self, prop: dict) -> str:
+        """Queues a listing with its photos; returns its property id."""
+        property_id = str(prop.get("property_id") or uuid.uuid4())
+        self._properties.add(property_record(prop, property_id))
+        for image in image_rows_of(prop):
+            self._images.add((
+                str(image.get("id") or uuid.uuid4()), property_id, image["storage_url"], image.get("room_type"),
+                image.get("renovation_potential"), _pg_bool(bool(image.get("is_main"))),
+            ))
+        self._touched.append(property_id)
+        if prop.get("description_ai") is not None or prop.get("ai_vibe_tags") is not None:
+            self.set_ai(property_id, prop.get("description_ai"), prop.get("ai_vibe_tags"))
+        self.listings += 1
+        if self._properties.rows >= self.batch_size:
+            self.flush()
+        return property_id
+
+    def set_ai(self, property_id: str, description_ai: Optional[str], ai_vibe_tags: Optional[Iterable[str]]) -> None:
+        """Stages the AI columns of a listing (queued now or in an earlier batch of this load)."""
+        self._pending_ai[property_id] = (description_ai, list(ai_vibe_tags) if ai_vibe_tags is not None else None)
+        if len(self._pending_ai) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        cur = self._cur
+        self.images += self._images.rows
+        # Prima le proprietà (le foto hanno la foreign key), poi le foto, poi le colonne AI
+        self._properties.copy(cur)
+        self._images.copy(cur)
+
+        touched = set(self._touched)
+        if self._pending_ai:
+            for property_id, (description, tags) in self._pending_ai.items():
+                self._ai.add((property_id, description, _pg_array(tags)))
+            self._ai.copy(cur)
+            cur.execute(APPLY_AI)
+            self.ai_updates += len(self._pending_ai)
+            touched.update(self._pending_ai)
+            self._pending_ai = {}
+
+        if touched:
+            cur.execute("SELECT refresh_property_cards(%s::uuid[]);", (list(touched),))
+            self.cards += cur.fetchone()[0]
+            self.batches += 1
+            elapsed = time.monotonic() - self._started
+            print(f"📦 {self.listings:,} listings, {self.images:,} photos loaded "
+                  f"({self.listings / elapsed if elapsed else 0:,.0f} listings/s)")
+        self._touched = []
+
+    def stats(self) -> Dict:
+        elapsed = time.monotonic() - self._started
+        return {
+            "listings": self.listings,
+            "images": self.images,
+            "ai_updates": self.ai_updates,
+            "cards": self.cards,
+            "batches": self.batches,
+            "seconds": round(elapsed, 1),
+            "listings_per_s": round(self.listings / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+def analyze_tables(dsn: str) -> None:
+    """Fresh planner statistics after a large load."""
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("ANALYZE properties, property_images, property_cards;")
+    conn.close()
+
+
+def sync_semantic_index(dsn: str) -> None:
+    """
+    A running backend rebuilds the vector index itself on the '*' notification sent at commit.
+    Here we rebuild it only when it can be opened (Qdrant server, or local folder not in use).
+    """
+    try:
+        from sqlalchemy import create_engine
+        sys.path.append(str(Path(__file__).parent.parent))
+        from semantic_search import semantic_index
+        semantic_index.rebuild(create_engine(dsn))
+    except Exception as e:
+        print(f"ℹ️  Semantic index not rebuilt from this script ({e}): "
+              f"a running backend rebuilds it on the catalog notification, "
+              f"otherwise run `python backend/semantic_search.py`")
+
+
+def read_listings(path: Path) -> Iterator[dict]:
+    """JSONL streamed line by line, or a JSON array (real_data.json)."""
+    if path.suffix == ".jsonl":
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, encoding="utf-8") as f:
+            yield from json.load(f)
+
+
+def photos_from_manifest(listings: Iterable[dict], assets, manifest=None,
+                         image_base_url: Optional[str] = None) -> Iterator[dict]:
+    """
+    Inputs like real_data.json list photo filenames: content hash and vision analysis come from the
+    asset manifest, the URL from the ingest manifest (photos uploaded by seed_db.py), or
+    `image_base_url/<filename>` for photos never uploaded. Photos with neither are skipped.
+    """
+    # Per nome file, una volta sola per run: limitato al numero di foto, non di annunci
+    resolved: Dict[str, Optional[dict]] = {}
+
+    def resolve(filename: str) -> Optional[dict]:
+        if filename not in resolved:
+            asset = assets.get(filename)
+            file_hash = asset["sha256"] if asset else None
+            url = manifest.get_blob(file_hash) if manifest and file_hash else None
+            analysis = (assets.get_analysis(file_hash) if file_hash else None) or {}
+            if not url and image_base_url:
+                url = f"{image_base_url.rstrip('/')}/{filename}"
+            resolved[filename] = {"url": url, "analysis": analysis} if url else None
+        return resolved[filename]
+
+    missing = 0
+    for prop in listings:
+        if prop.get("image_rows") is None and prop.get("image_urls") is None and prop.get("images"):
+            rows, tags = [], set()
+            for filename in prop["images"]:
+                photo = resolve(filename)
+                if photo is None:
+                    missing += 1
+                    continue
+                analysis = photo["analysis"]
+                rows.append({
+                    "storage_url": photo["url"],
+                    "room_type": analysis.get("room_type"),
+                    "renovation_potential": ("High" if analysis.get("condition_score", 10) < 6 else "Low") if analysis else None,
+                    "is_main": not rows,
+                })
+                tags.update(tag.lower() for tag in analysis.get("vibe_tags", []))
+            prop = dict(prop, image_rows=rows)
+            if tags and prop.get("ai_vibe_tags") is None:
+                prop["ai_vibe_tags"] = sorted(tags)
+        yield prop
+    if missing:
+        print(f"⚠️  {missing} photo(s) without an uploaded copy were skipped (upload them with seed_db.py or pass --image-base-url)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", type=Path, required=True, help="listings as .jsonl (streamed) or .json array")
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL"), help="Postgres DSN (default: DATABASE_URL)")
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE, help="listings per COPY batch")
+    parser.add_argument("--assets", type=Path, default=Path(__file__).parent.parent / "assets")
+    parser.add_argument("--manifest", type=Path, default=Path(__file__).parent / "ingest_manifest.db",
+                        help="ingest manifest with the uploaded photos (for filename-based inputs)")
+    parser.add_argument("--image-base-url", help="URL prefix for photos never uploaded")
+    parser.add_argument("--no-semantic", action="store_true", help="do not rebuild the semantic index")
+    args = parser.parse_args()
+
+    if not args.dsn:
+        parser.error("Missing --dsn (or DATABASE_URL)")
+
+    sys.path.append(str(Path(__file__).parent.parent))
+    from asset_manifest import AssetManifest
+    assets = AssetManifest(args.assets)
+    print(f"🗂️  Asset manifest: {assets.refresh()}")
+
+    listings = read_listings(args.input)
+    manifest = None
+    if args.manifest.exists():
+        from ingest_manifest import IngestManifest
+        manifest = IngestManifest(str(args.manifest))
+    listings = photos_from_manifest(listings, assets, manifest, args.image_base_url)
+
+    print(f"\n🚚 BULK LOAD of {args.input} (batches of {args.batch_size:,})\n")
+    with BulkLoader(args.dsn, args.batch_size) as loader:
+        for prop in listings:
+            loader.add(prop)
+    print(f"\n✅ Committed: {loader.stats()}")
+
+    analyze_tables(args.dsn)
+    if not args.no_semantic:
+        sync_semantic_index(args.dsn)
+
+
+if __name__ == "__main__":
+    main()
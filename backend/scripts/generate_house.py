@@ -1,6 +1,26 @@
+"""
+Synthetic listings with photos drawn from the category buckets of the picture directory.
+Listings are generated and written one at a time, so memory stays constant up to millions of
+listings; listing i depends only on (seed, i), so the same seed always gives the same catalog.
+
+Usage:
+    python generate_house.py                                   # 50 listings -> properties.json
+    python generate_house.py --count 1000000 --output catalog.jsonl --seed 7
+    python generate_house.py --count 100000 --distribution zones.json --to-db
+"""
+
 import json
 import random
 import os
+import sys
+import time
+import argparse
+from itertools import accumulate
+from typing import Dict, Iterator, List, Optional
+
+# Moduli del backend (asset manifest, bulk loader)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from asset_manifest import AssetManifest
 
 # --- CONFIGURAZIONE ---
 # Percorso dove sono salvate le tue 5000 foto
@@ -11,6 +31,7 @@ OUTPUT_DB_FILE = "properties.json"
 
 # Numero di annunci da generare
 NUM_LISTINGS = 50 
+DEFAULT_SEED = 42
 
 # --- DATI GENERATORE ---
 zones = [
@@ -24,6 +45,17 @@ zones = [
     {"name": "City Life", "zip": "20145"}
 ]
 
+# Distribuzione di default: zone equiprobabili, 3500-9000 €/mq, galleria come sotto.
+# Si sovrascrive con --distribution file.json, stessa struttura (ogni chiave è opzionale), es.:
+# {"zones": [{"name": "Brera", "zip": "20121", "city": "Milano", "weight": 3, "price_sqm": [8000, 14000]}],
+#  "rooms": [1, 5], "rent_share": 0.2, "photos": {"din_probability": 0.5, "max_bed": 3}}
+DEFAULT_DISTRIBUTION = {
+    "zones": [dict(z, city="Milano", weight=1, price_sqm=[3500, 9000]) for z in zones],
+    "rooms": [2, 5],
+    "rent_share": 0.0,
+    "photos": {"din_probability": 0.5, "max_bed": 2, "max_bath": 1},
+}
+
 adjectives = ["Luminoso", "Ampio", "Prestigioso", "Tranquillo", "Storico", "Moderno", "Ristrutturato", "Panoramico"]
 types = ["Bilocale", "Trilocale", "Quadrilocale", "Attico", "Loft"]
 streets = ["Via Roma", "Corso Italia", "Via Dante", "Viale Monza", "Via Torino", "Corso Buenos Aires", "Via Savona"]
@@ -38,7 +70,8 @@ descriptions = [
 
 def scan_images(directory):
     """
-    Scansiona la directory e divide le immagini in categorie basate sul prefisso.
+    Divide le immagini in categorie basate sul prefisso, leggendo l'asset manifest della cartella
+    (aggiornato in modo incrementale: vengono letti solo i file nuovi o modificati).
     """
     categories = {
         "living": [],
@@ -52,37 +85,48 @@ def scan_images(directory):
         print(f"❌ ERRORE: La cartella '{directory}' non esiste. Controlla il percorso.")
         return None
 
-    print(f"📂 Scansiono la cartella: {directory} ...")
-    
-    count = 0
-    for filename in os.listdir(directory):
-        if not filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-            continue
-            
-        # Identifica la categoria dal prefisso
-        prefix = filename.split('_')[0] # es. "bath" da "bath_123.jpg"
-        
-        if prefix in categories:
-            categories[prefix].append(filename)
-            count += 1
-            
+    print(f"📂 Aggiorno l'asset manifest di: {directory} ...")
+    manifest = AssetManifest(directory)
+    print(f"   {manifest.refresh()}")
+
+    buckets = manifest.categories()
+    for cat in categories:
+        categories[cat] = buckets.get(cat, [])
+    count = sum(len(imgs) for imgs in categories.values())
+
     print(f"✅ Trovate {count} immagini totali.")
     for cat, imgs in categories.items():
         print(f"   - {cat}: {len(imgs)} foto")
         
     return categories
 
-def generate_listing(index, image_buckets):
+def load_distribution(path: Optional[str]) -> Dict:
+    distribution = json.loads(json.dumps(DEFAULT_DISTRIBUTION))
+    if path:
+        with open(path, encoding="utf-8") as f:
+            custom = json.load(f)
+        photos = dict(distribution["photos"], **custom.pop("photos", {}))
+        distribution.update(custom, photos=photos)
+        for zone in distribution["zones"]:
+            zone.setdefault("city", "Milano")
+            zone.setdefault("weight", 1)
+            zone.setdefault("price_sqm", [3500, 9000])
+    # Pesi cumulativi calcolati una volta sola (rng.choices li riusa per ogni annuncio)
+    distribution["cum_weights"] = list(accumulate(z["weight"] for z in distribution["zones"]))
+    return distribution
+
+def generate_listing(index, image_buckets, rng=random, distribution=DEFAULT_DISTRIBUTION):
     """
     Crea un annuncio pescando una foto per ogni categoria disponibile.
     """
-    zone = random.choice(zones)
-    listing_type = random.choice(types)
-    adj = random.choice(adjectives)
+    zone = rng.choices(distribution["zones"], cum_weights=distribution.get("cum_weights"))[0]
+    listing_type = rng.choice(types)
+    adj = rng.choice(adjectives)
+    photos = distribution["photos"]
     
-    rooms = random.randint(2, 5)
-    sqm = rooms * random.randint(18, 30)
-    price = sqm * random.randint(3500, 9000)
+    rooms = rng.randint(*distribution["rooms"])
+    sqm = rooms * rng.randint(18, 30)
+    price = sqm * rng.randint(*zone["price_sqm"])
     price = round(price / 1000) * 1000 # Arrotonda
     
     # --- SELEZIONE FOTO ---
@@ -92,7 +136,7 @@ def generate_listing(index, image_buckets):
     # Funzione helper per prendere una foto random senza rimuoverla (possono ripetersi tra annunci diversi)
     def pick_img(category):
         if image_buckets.get(category) and len(image_buckets[category]) > 0:
-            return random.choice(image_buckets[category])
+            return rng.choice(image_buckets[category])
         return None
 
     # Costruiamo la galleria dell'annuncio
@@ -104,22 +148,25 @@ def generate_listing(index, image_buckets):
     img = pick_img("kitchen")
     if img: listing_images.append(img)
     
-    # 3. Dining (opzionale, 50% probabilità)
-    if random.random() > 0.5:
+    # 3. Dining (opzionale, 50% probabilità di default)
+    if rng.random() < photos["din_probability"]:
         img = pick_img("din")
         if img: listing_images.append(img)
         
     # 4. Bed (tante camere quanti sono i locali - 1, ma almeno 1)
     num_bedrooms = max(1, rooms - 1) 
     # (semplifichiamo prendendo 1 o 2 foto diverse di letti)
-    for _ in range(min(num_bedrooms, 2)):
+    for _ in range(min(num_bedrooms, photos["max_bed"])):
         img = pick_img("bed")
         if img and img not in listing_images: # Evitiamo duplicati esatti nello stesso annuncio
             listing_images.append(img)
             
-    # 5. Bath (obbligatorio)
-    img = pick_img("bath")
-    if img: listing_images.append(img)
+    # 5. Bath (obbligatorio, una foto per bagno fino a max_bath)
+    bathrooms = rng.randint(1, 3)
+    for _ in range(min(bathrooms, photos["max_bath"])):
+        img = pick_img("bath")
+        if img and img not in listing_images:
+            listing_images.append(img)
 
     title = f"{adj} {listing_type} in {zone['name']}"
 
@@ -129,27 +176,89 @@ def generate_listing(index, image_buckets):
         "price": price,
         "sqm": sqm,
         "rooms": rooms,
-        "bathrooms": random.randint(1, 3),
-        "floor": random.randint(1, 10),
+        "bathrooms": bathrooms,
+        "floor": rng.randint(1, 10),
         "total_floors": 10,
         "elevator": True,
         "zone": zone['name'],
-        "city": "Milano",
-        "address": f"{random.choice(streets)} {random.randint(1, 150)}, Milano",
+        "city": zone.get("city", "Milano"),
+        "address": f"{rng.choice(streets)} {rng.randint(1, 150)}, {zone.get('city', 'Milano')}",
         "specs": {
-            "heating": random.choice(["Autonomo", "Centralizzato"]),
-            "ac": random.choice(["Presente", "Predisposizione"]),
-            "contract": "Vendita",
-            "furnished": random.choice(["Arredato", "Vuoto"]),
+            "heating": rng.choice(["Autonomo", "Centralizzato"]),
+            "ac": rng.choice(["Presente", "Predisposizione"]),
+            "contract": "Affitto" if rng.random() < distribution["rent_share"] else "Vendita",
+            "furnished": rng.choice(["Arredato", "Vuoto"]),
             "type": listing_type
         },
-        "description_original": random.choice(descriptions),
+        "description_original": rng.choice(descriptions),
         "images": listing_images
     }
 
+def stream_listings(count: int, image_buckets: Dict[str, List[str]], seed: int = DEFAULT_SEED,
+                    distribution: Dict = DEFAULT_DISTRIBUTION, start: int = 0) -> Iterator[dict]:
+    """
+    Lazily yields `count` listings. Each one has its own generator seeded with (seed, index):
+    the same listing comes out whatever the count, the start offset or the consumer.
+    """
+    # Ordine stabile dei bucket (il manifest li restituisce già ordinati)
+    buckets = {category: sorted(files) for category, files in image_buckets.items()}
+    for index in range(start, start + count):
+        yield generate_listing(index, buckets, random.Random(f"{seed}:{index}"), distribution)
+
+def write_listings(listings: Iterator[dict], output: str) -> int:
+    """Writes as JSONL (one listing per line) or as a JSON array, one listing at a time."""
+    count = 0
+    started = time.monotonic()
+    jsonl = output.endswith(".jsonl")
+    with open(output, 'w', encoding='utf-8') as f:
+        if not jsonl:
+            f.write("[\n")
+        for item in listings:
+            if jsonl:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+            else:
+                f.write((",\n" if count else "") + "    " + json.dumps(item, indent=4, ensure_ascii=False).replace("\n", "\n    "))
+            count += 1
+            if count % 100_000 == 0:
+                print(f"   ... {count:,} annunci ({count / (time.monotonic() - started):,.0f}/s)")
+        if not jsonl:
+            f.write("\n]\n")
+    return count
+
+def load_into_db(listings: Iterator[dict], args) -> None:
+    """Streams the listings straight into the bulk loader (COPY in one transaction)."""
+    from bulk_load import BulkLoader, analyze_tables, photos_from_manifest, sync_semantic_index
+    from ingest_manifest import IngestManifest
+
+    manifest = IngestManifest(args.manifest) if os.path.exists(args.manifest) else None
+    listings = photos_from_manifest(listings, AssetManifest(args.images_dir), manifest, args.image_base_url)
+    with BulkLoader(args.dsn, args.batch_size) as loader:
+        for item in listings:
+            loader.add(item)
+    print(f"✅ Bulk load: {loader.stats()}")
+    analyze_tables(args.dsn)
+    if not args.no_semantic:
+        sync_semantic_index(args.dsn)
+
 def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=NUM_LISTINGS)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="same seed = same catalog")
+    parser.add_argument("--start", type=int, default=0, help="index of the first listing (to generate in shards)")
+    parser.add_argument("--images-dir", default=IMG_SOURCE_DIR)
+    parser.add_argument("--distribution", help="JSON with zones (weights, €/mq ranges), rooms, photo fan-out")
+    parser.add_argument("--output", default=OUTPUT_DB_FILE, help=".jsonl = one listing per line, otherwise a JSON array")
+    parser.add_argument("--to-db", action="store_true", help="stream into the bulk loader instead of a file")
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL"), help="Postgres DSN for --to-db")
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("BULK_BATCH_SIZE", "5000")), help="listings per COPY batch (--to-db)")
+    parser.add_argument("--manifest", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingest_manifest.db"),
+                        help="ingest manifest with the uploaded photos (--to-db)")
+    parser.add_argument("--image-base-url", help="URL prefix for photos never uploaded (--to-db)")
+    parser.add_argument("--no-semantic", action="store_true", help="do not rebuild the semantic index (--to-db)")
+    args = parser.parse_args()
+
     # 1. Carica le immagini
-    image_buckets = scan_images(IMG_SOURCE_DIR)
+    image_buckets = scan_images(args.images_dir)
     
     if not image_buckets:
         return # Esci se errore cartella
@@ -160,20 +269,24 @@ def main():
         print("❌ Nessuna immagine trovata con i prefissi corretti (bed_, bath_, etc).")
         return
 
-    # 2. Genera database
-    database = []
-    print(f"\n🚀 Generazione di {NUM_LISTINGS} annunci in corso...")
-    
-    for i in range(NUM_LISTINGS):
-        item = generate_listing(i, image_buckets)
-        database.append(item)
+    # 2. Genera gli annunci (uno alla volta, mai tutti in memoria)
+    distribution = load_distribution(args.distribution)
+    listings = stream_listings(args.count, image_buckets, args.seed, distribution, args.start)
+    print(f"\n🚀 Generazione di {args.count:,} annunci in corso (seed {args.seed})...")
+
+    if args.to_db:
+        if not args.dsn:
+            print("❌ --to-db richiede DATABASE_URL (o --dsn).")
+            return
+        load_into_db(listings, args)
+        return
 
-    # 3. Salva JSON
-    with open(OUTPUT_DB_FILE, 'w', encoding='utf-8') as f:
-        json.dump(database, f, indent=4, ensure_ascii=False)
+    # 3. Salva JSON / JSONL
+    started = time.monotonic()
+    written = write_listings(listings, args.output)
 
-    print(f"\n🎉 Finito! File salvato: {OUTPUT_DB_FILE}")
-    print(f"📝 Nota: Assicurati che il tuo frontend possa leggere le immagini da: {IMG_SOURCE_DIR}")
+    print(f"\n🎉 Finito! {written:,} annunci in {time.monotonic() - started:.1f}s, file salvato: {args.output}")
+    print(f"📝 Nota: Assicurati che il tuo frontend possa leggere le immagini da: {args.images_dir}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,144 @@
+"""
+Local manifest of what seed_db.py already did, so a rerun (or a resume after a crash) only
+processes new or changed work. Photo hashes and vision analyses live in the asset manifest
+(backend/asset_manifest.py), this file only tracks what was written where.
+- listings:  one row per entry of real_data.json, with the hash of its fields and of its photo list,
+             the property id created in the database and how far the ingest got
+- images:    per listing and position, the photo hash, its uploaded URL, the vision analysis,
+             the id of the property_images row and whether upload and analysis succeeded
+- blobs:     per content hash, the storage URL shared by every listing that uses the same photo
+             (uploaded once)
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+LISTING_FIELDS_EXCLUDED = ("images",)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class IngestManifest:
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS listings (
+                listing_key TEXT PRIMARY KEY, fields_hash TEXT NOT NULL, images_hash TEXT NOT NULL,
+                property_id TEXT, status TEXT NOT NULL, updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS images (
+                listing_key TEXT NOT NULL, position INTEGER NOT NULL, file_hash TEXT NOT NULL,
+                storage_url TEXT, analysis TEXT, row_id TEXT, ok INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (listing_key, position)
+            );
+            CREATE TABLE IF NOT EXISTS blobs (file_hash TEXT PRIMARY KEY, storage_url TEXT NOT NULL);
+        """)
+        self._db.commit()
+
+    # --- Hash ---
+    @staticmethod
+    def listing_key(prop_data: dict) -> str:
+        # L'id di real_data.json se c'è, altrimenti titolo + indirizzo
+        if prop_data.get("id") is not None:
+            return f"id:{prop_data['id']}"
+        return "ta:" + _sha256(f"{prop_data.get('title')}|{prop_data.get('address')}".encode("utf-8"))[:32]
+
+    @staticmethod
+    def fields_hash(prop_data: dict) -> str:
+        fields = {k: v for k, v in prop_data.items() if k not in LISTING_FIELDS_EXCLUDED}
+        return _sha256(json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+
+    @staticmethod
+    def images_hash(file_hashes: List[Optional[str]]) -> str:
+        return _sha256("|".join(h or "-" for h in file_hashes).encode("utf-8"))
+
+    # --- Listings ---
+    def get_listing(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fields_hash, images_hash, property_id, status FROM listings WHERE listing_key = ?", (key,)
+            ).fetchone()
+        if not row:
+            return None
+        return {"fields_hash": row[0], "images_hash": row[1], "property_id": row[2], "status": row[3]}
+
+    def save_listing(self, key: str, fields_hash: str, images_hash: str, property_id: Optional[str], status: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?, ?, ?)",
+                (key, fields_hash, images_hash, property_id, status, time.time()),
+            )
+            self._db.commit()
+
+    # --- Images ---
+    def get_images(self, key: str) -> Dict[int, Dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT position, file_hash, storage_url, analysis, row_id, ok FROM images WHERE listing_key = ?", (key,)
+            ).fetchall()
+        return {
+            position: {
+                "file_hash": file_hash,
+                "storage_url": storage_url,
+                "analysis": json.loads(analysis) if analysis else None,
+                "row_id": row_id,
+                "ok": bool(ok),
+            }
+            for position, file_hash, storage_url, analysis, row_id, ok in rows
+        }
+
+    def save_image(self, key: str, position: int, file_hash: str, storage_url: Optional[str],
+                   analysis: Optional[dict], row_id: Optional[str], ok: bool) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, position, file_hash, storage_url, json.dumps(analysis) if analysis else None, row_id, int(ok)),
+            )
+            self._db.commit()
+
+    def delete_images_from(self, key: str, position: int) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM images WHERE listing_key = ? AND position >= ?", (key, position))
+            self._db.commit()
+
+    # --- Contenuti condivisi tra annunci ---
+    def get_blob(self, file_hash: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT storage_url FROM blobs WHERE file_hash = ?", (file_hash,)).fetchone()
+        return row[0] if row else None
+
+    def save_blob(self, file_hash: str, storage_url: str) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?)", (file_hash, storage_url))
+            self._db.commit()
+
+    def legacy_analyses(self) -> Dict[str, dict]:
+        """Analyses cached here by earlier versions (now in the asset manifest), for a one-off import."""
+        with self._lock:
+            exists = self._db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analyses'").fetchone()
+            rows = self._db.execute("SELECT file_hash, analysis FROM analyses").fetchall() if exists else []
+            if exists:
+                self._db.execute("DROP TABLE analyses")
+                self._db.commit()
+        return {file_hash: json.loads(analysis) for file_hash, analysis in rows}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.executescript("DELETE FROM listings; DELETE FROM images;")
+            self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            statuses = dict(self._db.execute("SELECT status, COUNT(*) FROM listings GROUP BY status").fetchall())
+            images, done = self._db.execute("SELECT COUNT(*), COALESCE(SUM(ok), 0) FROM images").fetchone()
+            blobs = self._db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+        return {"listings": statuses, "images": images, "images_done": done, "unique_uploads": blobs}
@@ -0,0 +1,198 @@
+"""
+Building blocks for the pipelined ingest of seed_db.py.
+Each stage (upload, vision, db...) has its own bounded worker pool and an optional rate limit,
+so a slow stage never starves the others and no external API sees more than its own budget.
+Stages record how many items they processed and how long they took, for the throughput report.
+"""
+
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+
+class RateLimiter:
+    """Thread-safe token bucket: `rate` acquisitions per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Stage:
+    """
+    A named worker pool. `submit` blocks when `workers * backlog` items are already pending
+    (backpressure towards the producers), `run` submits and waits for the result.
+    """
+
+    def __init__(self, name: str, workers: int, rate: Optional[float] = None, backlog: int = 4):
+        self.name = name
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(workers * backlog)
+        self._limiter = RateLimiter(rate, burst=workers) if rate else None
+        self._lock = threading.Lock()
+
+        # Metriche
+        self.completed = 0
+        self.failed = 0
+        self._busy = 0.0
+        self._waited = 0.0
+        self._first_start: Optional[float] = None
+        self._last_end: Optional[float] = None
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        self._slots.acquire()
+        enqueued_at = time.monotonic()
+
+        def _task():
+            if self._limiter:
+                self._limiter.acquire()
+            started_at = time.monotonic()
+            with self._lock:
+                self._waited += started_at - enqueued_at
+                if self._first_start is None:
+                    self._first_start = started_at
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                ended_at = time.monotonic()
+                with self._lock:
+                    self._busy += ended_at - started_at
+                    self._last_end = ended_at
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                self._slots.release()
+
+        return self._executor.submit(_task)
+
+    def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return self.submit(fn, *args, **kwargs).result()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            done = self.completed + self.failed
+            active = (self._last_end - self._first_start) if done and self._first_start else 0.0
+            return {
+                "stage": self.name,
+                "workers": self.workers,
+                "completed": self.completed,
+                "failed": self.failed,
+                "throughput_per_s": round(done / active, 2) if active else 0.0,
+                "avg_ms": round(1000 * self._busy / done, 1) if done else 0.0,
+                "avg_wait_ms": round(1000 * self._waited / done, 1) if done else 0.0,
+                # Quota del tempo in cui i worker erano occupati (vicino a 1 = stadio collo di bottiglia)
+                "utilization": round(self._busy / (active * self.workers), 2) if active else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+class InlineStage:
+    """Same interface as Stage, but runs in the caller's thread (sequential mode)."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return fn(*args, **kwargs)
+
+    def shutdown(self) -> None:
+        pass
+
+
+class SharedWork:
+    """
+    Coalesces identical work across listings in flight: the first caller for a key starts it,
+    the others get the same future (e.g. one upload for a photo used by several listings).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures: Dict[Any, Future] = {}
+        self.started = 0
+        self.shared = 0
+
+    def get_or_start(self, key: Any, start: Callable[[], Future]) -> Future:
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                self.shared += 1
+                return future
+            # Segnaposto registrato sotto lock; start() (Stage.submit può bloccarsi sugli slot) va fuori
+            future = Future()
+            self._futures[key] = future
+            self.started += 1
+        # Concluso (e salvato nel manifest) non serve più tenerlo in memoria
+        future.add_done_callback(lambda _: self._forget(key))
+        try:
+            inner = start()
+        except Exception as e:
+            future.set_exception(e)
+            return future
+        inner.add_done_callback(lambda done: _chain(done, future))
+        return future
+
+    def _forget(self, key: Any) -> None:
+        with self._lock:
+            self._futures.pop(key, None)
+
+
+def _chain(source: Future, target: Future) -> None:
+    """Copies the outcome of `source` into `target`."""
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+def bounded_map(executor: ThreadPoolExecutor, fn: Callable[[Any], Any], items: Iterable[Any], window: int) -> Iterator[Any]:
+    """Like executor.map, in order, but with at most `window` items submitted at a time (constant memory)."""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def print_report(stages: List[Stage], elapsed: float, listings: int) -> None:
+    print(f"\n📈 Ingest throughput ({listings} listings in {elapsed:.1f}s, {listings / elapsed if elapsed else 0:.2f}/s)")
+    print(f"   {'stage':<8} {'workers':>7} {'done':>7} {'failed':>7} {'items/s':>8} {'avg ms':>9} {'wait ms':>9} {'util':>5}")
+    for stage in stages:
+        s = stage.stats()
+        print(f"   {s['stage']:<8} {s['workers']:>7} {s['completed']:>7} {s['failed']:>7} "
+              f"{s['throughput_per_s']:>8} {s['avg_ms']:>9} {s['avg_wait_ms']:>9} {s['utilization']:>5}")
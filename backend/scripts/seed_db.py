@@ -6,10 +6,14 @@ Uses Google GenAI SDK v2 (Gemini 2.0 Flash) for automated image analysis & synth
 
 import json
 import os
+import sys
 import time
+import uuid
+import argparse
+import mimetypes
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
 from dotenv import load_dotenv
-from PIL import Image
 
 # Nuova SDK Google
 from google import genai
@@ -21,6 +25,14 @@ from supabase import create_client, Client
 # Load environment variables
 load_dotenv("../../secret.env")
 
+# Moduli del backend (indice semantico)
+sys.path.append(str(Path(__file__).parent.parent))
+from semantic_search import semantic_index
+from asset_manifest import AssetManifest
+from ingest_pipeline import Stage, InlineStage, SharedWork, bounded_map, print_report
+from ingest_manifest import IngestManifest
+from bulk_load import BULK_BATCH_SIZE, BulkLoader, analyze_tables, sync_semantic_index
+
 # 1. Initialize Clients
 # Supabase
 supabase: Client = create_client(
@@ -36,6 +48,16 @@ client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
 # Se non disponibile, usa "gemini-1.5-flash".
 VISION_MODEL = "gemini-2.0-flash-exp" 
 
+# Risultati di ripiego: il manifest non li considera lavoro concluso (vengono ritentati al prossimo run)
+FALLBACK_ANALYSIS = {
+    "room_type": "Unknown",
+    "condition_score": 5,
+    "vibe_tags": ["standard"],
+    "brief_caption": "Standard interior"
+}
+UPLOAD_ERROR_URL = "https://via.placeholder.com/800x600?text=Upload+Error"
+MANIFEST_PATH = Path(__file__).parent / "ingest_manifest.db"
+
 def analyze_image_with_flash(image_path: str) -> dict:
     """
     Analyze a property image using Gemini Flash Vision.
@@ -44,8 +66,9 @@ def analyze_image_with_flash(image_path: str) -> dict:
     print(f"  📸 Analyzing image: {Path(image_path).name}...")
     
     try:
-        # Load image with PIL
-        img = Image.open(image_path)
+        # Byte originali (niente decodifica PIL: dimensioni e hash sono già nell'asset manifest)
+        with open(image_path, "rb") as f:
+            img = types.Part.from_bytes(data=f.read(), mime_type=mimetypes.guess_type(image_path)[0] or "image/jpeg")
         
         prompt = """
         You are a real estate vision expert. Analyze this photo.
@@ -81,12 +104,7 @@ def analyze_image_with_flash(image_path: str) -> dict:
     except Exception as e:
         print(f"    ⚠️  Analysis failed: {e}")
         # Fallback sicuro
-        return {
-            "room_type": "Unknown",
-            "condition_score": 5,
-            "vibe_tags": ["standard"],
-            "brief_caption": "Standard interior"
-        }
+        return dict(FALLBACK_ANALYSIS)
 
 def generate_summary_description(property_title: str, room_data: list) -> str:
     """
@@ -113,20 +131,22 @@ def generate_summary_description(property_title: str, room_data: list) -> str:
     except Exception as e:
         return f"A beautiful property in {property_title}."
 
-def upload_to_supabase_storage(file_path: str, property_id: str) -> str:
+def upload_to_supabase_storage(file_path: str, file_hash: str) -> str:
     """
-    Upload image to Supabase Storage and return public URL
+    Upload image to Supabase Storage and return public URL.
+    Content-addressed path: the same photo is stored once, whatever listing uses it.
     """
     try:
         bucket_name = "listings"
-        filename = f"{property_id}/{Path(file_path).name}"
+        ext = Path(file_path).suffix.lower() or ".jpg"
+        filename = f"by-hash/{file_hash[:2]}/{file_hash}{ext}"
         
-        # Upload with upsert=true to overwrite if exists
+        # Upload with upsert=true to overwrite if exists (stesso path = stesso contenuto)
         with open(file_path, 'rb') as f:
             supabase.storage.from_(bucket_name).upload(
                 filename,
                 f,
-                file_options={"content-type": "image/jpeg", "x-upsert": "true"}
+                file_options={"content-type": mimetypes.guess_type(filename)[0] or "image/jpeg", "x-upsert": "true"}
             )
         
         # Get public URL
@@ -135,126 +155,462 @@ def upload_to_supabase_storage(file_path: str, property_id: str) -> str:
         
     except Exception as e:
         print(f"    ⚠️  Upload failed: {e}")
-        return "https://via.placeholder.com/800x600?text=Upload+Error"
+        return UPLOAD_ERROR_URL
+
+def upload_once(file_path: str, file_hash: str, manifest: IngestManifest) -> str:
+    public_url = upload_to_supabase_storage(file_path, file_hash)
+    if public_url != UPLOAD_ERROR_URL:
+        manifest.save_blob(file_hash, public_url)
+    return public_url
+
+def analyze_once(file_path: str, file_hash: str, assets: AssetManifest) -> dict:
+    analysis = analyze_image_with_flash(file_path)
+    if analysis != FALLBACK_ANALYSIS:
+        assets.save_analysis(file_hash, analysis)
+    return analysis
 
-def seed_database():
+def property_payload(prop_data: dict) -> dict:
+    # Prepare the insert payload matching your SQL Schema
+    return {
+        "title": prop_data["title"],
+        "price": prop_data["price"],
+        "sqm": prop_data["sqm"],
+        "rooms": prop_data.get("rooms"),
+        "bathrooms": prop_data.get("bathrooms"),
+        "floor": prop_data.get("floor"),
+        "total_floors": prop_data.get("total_floors"),
+        "elevator": prop_data.get("elevator"),
+        "zone": prop_data["zone"],
+        "city": prop_data.get("city", "Milano"), # Default a Milano se manca nel JSON
+        "address": prop_data.get("address"),
+        "description_original": prop_data.get("description_original"),
+        "specs": prop_data.get("features", {}) # Maps JSON 'features' to SQL 'specs'
+    }
+
+def insert_property(prop_data: dict) -> str:
     """
-    Main seeding orchestration
+    Insert the property core data and return its id
     """
-    print("\n🚀 STARTING IMMOBILIARE.AI DATA INGESTION\n")
+    res = supabase.table("properties").insert(property_payload(prop_data)).execute()
     
-    # Locate data
-    base_path = Path(__file__).parent.parent
+    # Gestione sicura della risposta Supabase (può variare in base alla versione lib)
+    if hasattr(res, 'data') and res.data:
+        return res.data[0]["id"]
+    # Fallback per versioni diverse della lib
+    return res[0]["id"] if isinstance(res, list) else None
+
+def update_property(property_id: str, prop_data: dict) -> None:
+    supabase.table("properties").update(property_payload(prop_data)).eq("id", property_id).execute()
+
+def renovation_potential(analysis: dict) -> str:
+    return "High" if analysis.get("condition_score", 10) < 6 else "Low"
+
+def insert_image_row(property_id: str, public_url: str, analysis: dict, is_main: bool) -> str:
+    res = supabase.table("property_images").insert({
+        "property_id": property_id,
+        "storage_url": public_url,
+        # Non salviamo local_filename nello schema SQL, rimosso per sicurezza
+        "room_type": analysis.get("room_type"),
+        "renovation_potential": renovation_potential(analysis),
+        # Nello schema SQL avevi 'renovation_potential', non 'ai_caption'. 
+        # Se vuoi 'ai_caption' devi aggiungerlo allo schema SQL.
+        # Per ora mappiamo caption dentro renovation_potential se serve o lo ignoriamo.
+        # Manteniamo la coerenza con lo schema SQL fornito:
+        "is_main": is_main
+    }).execute()
+    return res.data[0]["id"] if getattr(res, "data", None) else None
+
+def delete_image_row(row_id: str) -> None:
+    supabase.table("property_images").delete().eq("id", row_id).execute()
+
+def save_ai_description(property_id: str, prop_data: dict, final_description: str, all_tags: set) -> None:
+    """
+    Store description_ai / ai_vibe_tags and update the semantic index
+    """
+    # Update the property row
+    try:
+        supabase.table("properties").update({
+            "description_ai": final_description,
+            "ai_vibe_tags": list(all_tags)
+        }).eq("id", property_id).execute()
+        print(f"  ✨ AI Description Generated & Saved.")
+    except Exception as e:
+        print(f"  ⚠️ Could not update AI description: {e}")
+
+    # 4. Indice semantico (description_ai + vibe tags)
+    try:
+        semantic_index.upsert([{
+            **prop_data,
+            "id": property_id,
+            "description_ai": final_description,
+            "ai_vibe_tags": list(all_tags),
+        }])
+        print(f"  🧭 Semantic index updated.")
+    except Exception as e:
+        print(f"  ⚠️ Semantic index not updated (the backend will sync it): {e}")
+
+def refresh_card(property_id: str) -> None:
+    # 5. Read model per la UI (property_cards): una riga con card + galleria ordinata
+    try:
+        supabase.rpc("refresh_property_card", {"pid": property_id}).execute()
+        print(f"  🃏 Property card refreshed.")
+    except Exception as e:
+        print(f"  ⚠️ Could not refresh property card: {e}")
+
+def load_properties(base_path: Path):
     data_file = base_path / "real_data.json"
-    assets_dir = base_path / "assets"
-    
     if not data_file.exists():
         print("❌ Error: real_data.json not found in backend folder.")
-        return
+        return None
 
     with open(data_file, 'r') as f:
-        properties_data = json.load(f)
+        return json.load(f)
+
+def _cached(value) -> Future:
+    future = Future()
+    future.set_result(value)
+    return future
+
+def local_photos(prop_data: dict, assets: AssetManifest):
+    """Paths of the listing's photos known to the asset manifest, with their content hash."""
+    paths, file_hashes = [], []
+    for img_filename in prop_data.get("images", []):
+        asset = assets.get(img_filename)
+        if asset:
+            paths.append(asset["path"])
+            file_hashes.append(asset["sha256"])
+        else:
+            print(f"    ⚠️  File not found: {img_filename}")
+    return paths, file_hashes
+
+def photo_work(todo: list, stages: dict, manifest: IngestManifest, assets: AssetManifest, shared: SharedWork):
+    """
+    Upload and vision futures for (position, path, file_hash) items.
+    Per content: once per photo, even when several listings use it
+    (manifest for previous runs, shared for the listings in flight now).
+    """
+    uploads, analyses = [], []
+    for position, path, file_hash in todo:
+        stored_url = manifest.get_blob(file_hash)
+        uploads.append(_cached(stored_url) if stored_url else shared.get_or_start(
+            ("upload", file_hash), lambda: stages["upload"].submit(upload_once, path, file_hash, manifest)))
+        stored_analysis = assets.get_analysis(file_hash)
+        analyses.append(_cached(stored_analysis) if stored_analysis else shared.get_or_start(
+            ("vision", file_hash), lambda: stages["vision"].submit(analyze_once, path, file_hash, assets)))
+    return uploads, analyses
+
+def ingest_property(prop_data: dict, assets: AssetManifest, stages: dict, manifest: IngestManifest,
+                    shared: SharedWork) -> str:
+    """
+    One listing, skipping whatever the manifest says is already done.
+    Upload and vision of the photos run on their own stages, DB writes on the db stage.
+    Returns "skipped", "done", "partial" (some photo to retry next run) or "failed".
+    """
+    title = prop_data["title"]
+    key = manifest.listing_key(prop_data)
+
+    paths, file_hashes = local_photos(prop_data, assets)
+    fields_hash = manifest.fields_hash(prop_data)
+    images_hash = manifest.images_hash(file_hashes)
+
+    previous = manifest.get_listing(key)
+    if (previous and previous["status"] == "complete"
+            and previous["fields_hash"] == fields_hash and previous["images_hash"] == images_hash):
+        return "skipped"
+
+    # 1. Property Core Data: insert la prima volta, update se i campi sono cambiati
+    property_id = previous["property_id"] if previous else None
+    try:
+        if property_id is None:
+            property_id = stages["db"].run(insert_property, prop_data)
+            manifest.save_listing(key, fields_hash, "", property_id, "created")
+            print(f"  ✓ Property Created: {title} (ID: {property_id})")
+        elif previous["fields_hash"] != fields_hash:
+            stages["db"].run(update_property, property_id, prop_data)
+            print(f"  ✓ Property Updated: {title}")
+    except Exception as e:
+        print(f"  ❌ Critical Error inserting property '{title}': {e}")
+        return "failed"
+
+    # 2. Foto: rifacciamo solo le posizioni nuove, cambiate o fallite
+    cached = manifest.get_images(key)
+    todo = []
+    for position, (path, file_hash) in enumerate(zip(paths, file_hashes)):
+        row = cached.get(position)
+        if row and row["ok"] and row["row_id"] and row["file_hash"] == file_hash:
+            continue
+        todo.append((position, path, file_hash))
+
+    uploads, analyses = photo_work(todo, stages, manifest, assets, shared)
+
+    all_ok = True
+    for (position, path, file_hash), upload, analysis_future in zip(todo, uploads, analyses):
+        public_url, analysis = upload.result(), analysis_future.result()
+        ok = public_url != UPLOAD_ERROR_URL and analysis != FALLBACK_ANALYSIS
+        all_ok = all_ok and ok
+        try:
+            stale = cached.get(position)
+            if stale and stale["row_id"]:
+                stages["db"].run(delete_image_row, stale["row_id"])
+            row_id = stages["db"].run(insert_image_row, property_id, public_url, analysis, position == 0)
+            # Salviamo upload e analisi riusciti anche se l'altro è fallito: al retry si rifà solo quello
+            manifest.save_image(
+                key, position, file_hash,
+                public_url if public_url != UPLOAD_ERROR_URL else None,
+                analysis if analysis != FALLBACK_ANALYSIS else None,
+                row_id, ok,
+            )
+            print(f"    ✓ Image Processed: {analysis.get('room_type')} ({analysis.get('condition_score')}/10)")
+        except Exception as e:
+            all_ok = False
+            print(f"    ❌ DB Error saving image: {e}")
+
+    # Foto tolte dall'annuncio
+    for position, row in cached.items():
+        if position >= len(paths) and row["row_id"]:
+            stages["db"].run(delete_image_row, row["row_id"])
+    manifest.delete_images_from(key, len(paths))
+
+    # 3. Final AI Synthesis: solo se le foto sono cambiate o non era mai stata completata
+    images = manifest.get_images(key)
+    collected_ai_data = [row["analysis"] for _, row in sorted(images.items()) if row["analysis"]]
+    if collected_ai_data and (todo or previous is None or previous["status"] != "complete"
+                              or previous["images_hash"] != images_hash):
+        all_tags = {tag.lower() for analysis in collected_ai_data for tag in analysis.get("vibe_tags", [])}
+        final_description = stages["vision"].run(generate_summary_description, title, collected_ai_data)
+        stages["db"].run(save_ai_description, property_id, prop_data, final_description, all_tags)
+
+    stages["db"].run(refresh_card, property_id)
+
+    status = "complete" if all_ok else "partial"
+    manifest.save_listing(key, fields_hash, images_hash if all_ok else "", property_id, status)
+    return "done" if all_ok else "partial"
+
+def prepare_bulk_listing(prop_data: dict, assets: AssetManifest, stages: dict, manifest: IngestManifest,
+                         shared: SharedWork):
+    """
+    Photo work and AI synthesis of a listing for the bulk loader (no database round trip).
+    Returns (listing for BulkLoader.add, what to record in the manifest after the commit),
+    or None for listings the manifest already knows (they go through the incremental path).
+    """
+    key = manifest.listing_key(prop_data)
+    if manifest.get_listing(key) is not None:
+        return None
+
+    paths, file_hashes = local_photos(prop_data, assets)
+    todo = [(position, path, file_hash) for position, (path, file_hash) in enumerate(zip(paths, file_hashes))]
+    uploads, analyses = photo_work(todo, stages, manifest, assets, shared)
+
+    property_id = str(uuid.uuid4())
+    image_rows, images, collected_ai_data = [], [], []
+    all_ok = True
+    for (position, path, file_hash), upload, analysis_future in zip(todo, uploads, analyses):
+        public_url, analysis = upload.result(), analysis_future.result()
+        ok = public_url != UPLOAD_ERROR_URL and analysis != FALLBACK_ANALYSIS
+        all_ok = all_ok and ok
+        row_id = str(uuid.uuid4())
+        image_rows.append({
+            "id": row_id,
+            "storage_url": public_url,
+            "room_type": analysis.get("room_type"),
+            "renovation_potential": renovation_potential(analysis),
+            "is_main": position == 0,
+        })
+        images.append((position, file_hash,
+                       public_url if public_url != UPLOAD_ERROR_URL else None,
+                       analysis if analysis != FALLBACK_ANALYSIS else None,
+                       row_id, ok))
+        if analysis != FALLBACK_ANALYSIS:
+            collected_ai_data.append(analysis)
+
+    listing = dict(prop_data, property_id=property_id, image_rows=image_rows)
+    if collected_ai_data:
+        listing["ai_vibe_tags"] = sorted({tag.lower() for analysis in collected_ai_data
+                                          for tag in analysis.get("vibe_tags", [])})
+        listing["description_ai"] = stages["vision"].run(generate_summary_description, prop_data["title"], collected_ai_data)
+
+    record = {
+        "key": key,
+        "fields_hash": manifest.fields_hash(prop_data),
+        "images_hash": manifest.images_hash(file_hashes) if all_ok else "",
+        "property_id": property_id,
+        "status": "complete" if all_ok else "partial",
+        "images": images,
+    }
+    return listing, record
+
+def open_assets(base_path: Path, manifest: IngestManifest) -> AssetManifest:
+    """Asset manifest of backend/assets, refreshed incrementally (only new or modified photos are read)."""
+    assets = AssetManifest(base_path / "assets")
+    print(f"🗂️  Asset manifest: {assets.refresh()}")
+    # Analisi salvate nell'ingest manifest dalle versioni precedenti
+    for file_hash, analysis in manifest.legacy_analyses().items():
+        assets.save_analysis(file_hash, analysis)
+    return assets
+
+def open_manifest(args) -> IngestManifest:
+    manifest = IngestManifest(str(args.manifest))
+    if args.fresh:
+        # Ripartenza da zero (es. database svuotato): gli hash dei file restano validi
+        manifest.clear()
+    return manifest
+
+def seed_database(args):
+    """
+    Main seeding orchestration (one listing at a time)
+    """
+    print("\n🚀 STARTING IMMOBILIARE.AI DATA INGESTION\n")
     
+    # Locate data
+    base_path = Path(__file__).parent.parent
+    
+    properties_data = load_properties(base_path)
+    if properties_data is None:
+        return
+    
+    manifest = open_manifest(args)
+    assets = open_assets(base_path, manifest)
+    stages = {"upload": InlineStage("upload"), "vision": InlineStage("vision"), "db": InlineStage("db")}
+    shared = SharedWork()
     print(f"📊 Found {len(properties_data)} properties to process.\n")
     
+    results = {}
     for idx, prop_data in enumerate(properties_data, 1):
         print(f"[{idx}/{len(properties_data)}] Processing: {prop_data['title']}...")
-        
-        # 1. Insert Property Core Data
-        try:
-            # Prepare the insert payload matching your SQL Schema
-            insert_payload = {
-                "title": prop_data["title"],
-                "price": prop_data["price"],
-                "sqm": prop_data["sqm"],
-                "rooms": prop_data.get("rooms"),
-                "bathrooms": prop_data.get("bathrooms"),
-                "floor": prop_data.get("floor"),
-                "total_floors": prop_data.get("total_floors"),
-                "elevator": prop_data.get("elevator"),
-                "zone": prop_data["zone"],
-                "city": prop_data.get("city", "Milano"), # Default a Milano se manca nel JSON
-                "address": prop_data.get("address"),
-                "description_original": prop_data.get("description_original"),
-                "specs": prop_data.get("features", {}) # Maps JSON 'features' to SQL 'specs'
-            }
-            
-            res = supabase.table("properties").insert(insert_payload).execute()
-            
-            # Gestione sicura della risposta Supabase (può variare in base alla versione lib)
-            if hasattr(res, 'data') and res.data:
-                property_id = res.data[0]["id"]
-            else:
-                # Fallback per versioni diverse della lib
-                property_id = res[0]["id"] if isinstance(res, list) else None
-                
-            print(f"  ✓ Property Created (ID: {property_id})")
-            
-        except Exception as e:
-            print(f"  ❌ Critical Error inserting property: {e}")
-            continue
-        
-        # 2. Process Images & Collect Data for AI
-        collected_ai_data = [] 
-        all_tags = set()
-        
-        images_list = prop_data.get("images", [])
-        
-        for img_idx, img_filename in enumerate(images_list):
-            img_path = assets_dir / img_filename
-            
-            if not img_path.exists():
-                print(f"    ⚠️  File not found: {img_filename}")
-                continue
-            
-            # A. Upload
-            public_url = upload_to_supabase_storage(str(img_path), property_id)
-            
-            # B. Analyze (AI Vision)
-            analysis = analyze_image_with_flash(str(img_path))
-            
-            # C. Insert into property_images
-            try:
-                supabase.table("property_images").insert({
-                    "property_id": property_id,
-                    "storage_url": public_url,
-                    # Non salviamo local_filename nello schema SQL, rimosso per sicurezza
-                    "room_type": analysis.get("room_type"),
-                    "renovation_potential": "High" if analysis.get("condition_score", 10) < 6 else "Low",
-                    # Nello schema SQL avevi 'renovation_potential', non 'ai_caption'. 
-                    # Se vuoi 'ai_caption' devi aggiungerlo allo schema SQL.
-                    # Per ora mappiamo caption dentro renovation_potential se serve o lo ignoriamo.
-                    # Manteniamo la coerenza con lo schema SQL fornito:
-                    "is_main": (img_idx == 0)
-                }).execute()
-                print(f"    ✓ Image Processed: {analysis.get('room_type')} ({analysis.get('condition_score')}/10)")
-                
-                # Collect data for final synthesis
-                collected_ai_data.append(analysis)
-                for tag in analysis.get("vibe_tags", []):
-                    all_tags.add(tag.lower())
-                    
-            except Exception as e:
-                print(f"    ❌ DB Error saving image: {e}")
-
-        # 3. Final AI Synthesis (Update Property)
-        if collected_ai_data:
-            # Generate the cohesive description
-            final_description = generate_summary_description(prop_data["title"], collected_ai_data)
-            
-            # Update the property row
-            try:
-                supabase.table("properties").update({
-                    "description_ai": final_description,
-                    "ai_vibe_tags": list(all_tags)
-                }).eq("id", property_id).execute()
-                print(f"  ✨ AI Description Generated & Saved.")
-            except Exception as e:
-                print(f"  ⚠️ Could not update AI description: {e}")
-
-        print("  --------------------------------------------------")
+        result = ingest_property(prop_data, assets, stages, manifest, shared)
+        results[result] = results.get(result, 0) + 1
+        print(f"  {'⏭️  Already ingested' if result == 'skipped' else '--------------------------------------------------'}")
     
+    print(f"\n📒 {results} | manifest: {manifest.stats()} | assets: {assets.stats()}")
+    print(f"♻️  Photo work started: {shared.started}, shared with other listings: {shared.shared}")
     print("\n✅ SEEDING COMPLETE. Database is ready for the Demo.")
 
+def seed_database_pipelined(args):
+    """
+    Pipelined seeding: separate bounded pools (and rate limits) for upload, vision and DB,
+    several listings in flight at once, throughput report per stage at the end.
+    """
+    print("\n🚀 STARTING IMMOBILIARE.AI DATA INGESTION (pipelined)\n")
+
+    base_path = Path(__file__).parent.parent
+    properties_data = load_properties(base_path)
+    if properties_data is None:
+        return
+
+    manifest = open_manifest(args)
+    assets = open_assets(base_path, manifest)
+    stages = {
+        "upload": Stage("upload", args.upload_workers, args.upload_rate),
+        "vision": Stage("vision", args.vision_workers, args.vision_rate),
+        "db": Stage("db", args.db_workers, args.db_rate),
+    }
+    shared = SharedWork()
+    print(f"📊 Found {len(properties_data)} properties, {args.listings_in_flight} in flight "
+          f"(upload={args.upload_workers}, vision={args.vision_workers}, db={args.db_workers} workers)\n")
+
+    started = time.monotonic()
+    results = {}
+    processed = 0
+    # I thread "driver" coordinano un annuncio ciascuno e aspettano gli stadi: il lavoro vero è nei pool
+    with ThreadPoolExecutor(max_workers=args.listings_in_flight, thread_name_prefix="listing") as drivers:
+        futures = [drivers.submit(ingest_property, prop, assets, stages, manifest, shared)
+                   for prop in properties_data]
+        for future in as_completed(futures):
+            result = future.result()
+            results[result] = results.get(result, 0) + 1
+            processed += 1
+            if processed % 10 == 0 or processed == len(properties_data):
+                elapsed = time.monotonic() - started
+                print(f"⏱️  {processed}/{len(properties_data)} listings ({processed / elapsed:.2f}/s) {results}")
+
+    for stage in stages.values():
+        stage.shutdown()
+    print_report(list(stages.values()), time.monotonic() - started, processed - results.get("skipped", 0))
+    print(f"📒 Manifest: {manifest.stats()} | assets: {assets.stats()}")
+    print(f"♻️  Photo work started: {shared.started}, shared with other listings in flight: {shared.shared}")
+    print("\n✅ SEEDING COMPLETE. Database is ready for the Demo.")
+
+def seed_database_bulk(args):
+    """
+    Bulk seeding: photo work and descriptions on the usual stages, then every new listing
+    is written with COPY in a single transaction over DATABASE_URL (scripts/bulk_load.py).
+    """
+    print("\n🚀 STARTING IMMOBILIARE.AI DATA INGESTION (bulk)\n")
+    if not args.dsn:
+        print("❌ Error: --bulk needs DATABASE_URL (or --dsn).")
+        return
+
+    base_path = Path(__file__).parent.parent
+    properties_data = load_properties(base_path)
+    if properties_data is None:
+        return
+
+    manifest = open_manifest(args)
+    assets = open_assets(base_path, manifest)
+    stages = {
+        "upload": Stage("upload", args.upload_workers, args.upload_rate),
+        "vision": Stage("vision", args.vision_workers, args.vision_rate),
+    }
+    shared = SharedWork()
+    print(f"📊 Found {len(properties_data)} properties, {args.listings_in_flight} in flight, "
+          f"COPY batches of {args.batch_size}\n")
+
+    started = time.monotonic()
+    records, known = [], 0
+    prepare = lambda prop: prepare_bulk_listing(prop, assets, stages, manifest, shared)
+    with ThreadPoolExecutor(max_workers=args.listings_in_flight, thread_name_prefix="listing") as drivers:
+        with BulkLoader(args.dsn, args.batch_size) as loader:
+            for prepared in bounded_map(drivers, prepare, properties_data, args.listings_in_flight * 2):
+                if prepared is None:
+                    known += 1
+                    continue
+                listing, record = prepared
+                loader.add(listing)
+                records.append(record)
+
+    # Solo dopo il commit: il manifest non deve mai puntare a righe annullate da un rollback
+    for record in records:
+        for position, file_hash, public_url, analysis, row_id, ok in record["images"]:
+            manifest.save_image(record["key"], position, file_hash, public_url, analysis, row_id, ok)
+        manifest.save_listing(record["key"], record["fields_hash"], record["images_hash"],
+                              record["property_id"], record["status"])
+
+    for stage in stages.values():
+        stage.shutdown()
+    print_report(list(stages.values()), time.monotonic() - started, len(records))
+    print(f"🚚 Bulk load: {loader.stats()}")
+    if known:
+        print(f"⏭️  {known} listing(s) already in the manifest: run without --bulk to update them incrementally")
+
+    analyze_tables(args.dsn)
+    sync_semantic_index(args.dsn)
+    print(f"📒 Manifest: {manifest.stats()} | assets: {assets.stats()}")
+    print("\n✅ SEEDING COMPLETE. Database is ready for the Demo.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Populate Supabase with the listings in real_data.json")
+    parser.add_argument("--pipeline", action="store_true", help="concurrent ingest with per-stage pools")
+    parser.add_argument("--bulk", action="store_true", help="new listings written with COPY in one transaction")
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_URL"), help="Postgres DSN for --bulk (default: DATABASE_URL)")
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE, help="listings per COPY batch (--bulk)")
+    parser.add_argument("--manifest", type=Path, default=MANIFEST_PATH, help="ingest manifest (resume / incremental runs)")
+    parser.add_argument("--fresh", action="store_true", help="forget the manifest and ingest everything again")
+    parser.add_argument("--listings-in-flight", type=int, default=8)
+    parser.add_argument("--upload-workers", type=int, default=8)
+    parser.add_argument("--vision-workers", type=int, default=4)
+    parser.add_argument("--db-workers", type=int, default=4)
+    # Rate limit per stadio (operazioni al secondo, 0 = nessun limite)
+    parser.add_argument("--upload-rate", type=float, default=0)
+    parser.add_argument("--vision-rate", type=float, default=2.0)
+    parser.add_argument("--db-rate", type=float, default=0)
+    args = parser.parse_args()
+
+    if args.bulk:
+        seed_database_bulk(args)
+    elif args.pipeline:
+        seed_database_pipelined(args)
+    else:
+        seed_database(args)
+
 if __name__ == "__main__":
-    seed_database()
\ No newline at end of file
+    main()
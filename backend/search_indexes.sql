@@ -0,0 +1,64 @@
+-- Immobiliare.ai Search Indexes
+-- For the queries search_properties (tools.py) and the agent's free SQL actually run. Run after schema.sql.
+-- Each index below is kept because scripts/bench_queries.py measured it: EXPLAIN ANALYZE median
+-- of 5 runs on 1M synthetic listings (PostgreSQL 18.6), schema.sql indexes only -> with this file:
+--   tool_zone_rent_desc            3671 ms -> 0.02 ms   rent partial (lower(zone), price)
+--   tool_city_rent_desc            4159 ms -> 0.02 ms   rent partial (lower(city), price)
+--   tool_rent_heating              4176 ms -> 0.02 ms   rent partial (price)
+--   tool_zone_sale_budget          1133 ms -> 0.02 ms   sale partial (lower(zone), price)
+--   tool_city_sale_budget          1120 ms -> 0.02 ms   sale partial (lower(city), price)
+--   tool_sale_budget               1143 ms -> 0.02 ms   sale partial (price)
+--   tool_city_sqm_desc              896 ms -> 0.02 ms   (lower(city), sqm)
+--   tool_zone_sqm_desc              789 ms -> 0.02 ms   (lower(zone), sqm)
+--   cards_ilike_address_miss       1067 ms -> 0.05 ms   trigram on address
+--   cards_ilike_title_miss         1178 ms -> 0.03 ms   trigram on title
+--   cards_ilike_description_miss   1296 ms -> 0.03 ms   trigram on description_ai
+--   legacy_ilike_address_miss      3113 ms -> 0.10 ms   trigram on properties.address
+--   cards_tool_lower_zone         0.045 ms -> 0.015 ms  (lower(zone), price)
+-- Not added: an elevator partial (tool_city_no_elevator_desc is 0.03 ms with the composites).
+-- Not covered: agent SQL with contract and other keys in a single `specs @>` (cards_specs_elevator,
+-- 1213 -> 852 ms) cannot match the partial predicates.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- 1. EXPRESSION + COMPOSITE: search_properties filters on lower(zone) / lower(city)
+-- (case-insensitive match), which the plain idx_property_cards_zone cannot use.
+-- The second column is the sort key (sort=price_* / sqm_desc): ORDER BY ... LIMIT n reads n rows.
+CREATE INDEX IF NOT EXISTS idx_property_cards_lower_zone_price ON property_cards(lower(zone), price);
+CREATE INDEX IF NOT EXISTS idx_property_cards_lower_city_price ON property_cards(lower(city), price);
+CREATE INDEX IF NOT EXISTS idx_property_cards_lower_zone_sqm ON property_cards(lower(zone), sqm);
+CREATE INDEX IF NOT EXISTS idx_property_cards_lower_city_sqm ON property_cards(lower(city), sqm);
+
+-- 2. PARTIAL: one per contract. Rents (monthly prices) and sales share the price column, so
+-- "Affitto, price DESC" walks every sale first and "Vendita, max X" every rent.
+-- search_properties sends the contract as its own `specs @> '{"contract": ...}'` clause,
+-- which is what lets the planner match these predicates.
+CREATE INDEX IF NOT EXISTS idx_property_cards_rent_lower_zone_price ON property_cards(lower(zone), price)
+    WHERE specs @> '{"contract": "Affitto"}';
+CREATE INDEX IF NOT EXISTS idx_property_cards_rent_lower_city_price ON property_cards(lower(city), price)
+    WHERE specs @> '{"contract": "Affitto"}';
+CREATE INDEX IF NOT EXISTS idx_property_cards_rent_price ON property_cards(price)
+    WHERE specs @> '{"contract": "Affitto"}';
+CREATE INDEX IF NOT EXISTS idx_property_cards_sale_lower_zone_price ON property_cards(lower(zone), price)
+    WHERE specs @> '{"contract": "Vendita"}';
+CREATE INDEX IF NOT EXISTS idx_property_cards_sale_lower_city_price ON property_cards(lower(city), price)
+    WHERE specs @> '{"contract": "Vendita"}';
+CREATE INDEX IF NOT EXISTS idx_property_cards_sale_price ON property_cards(price)
+    WHERE specs @> '{"contract": "Vendita"}';
+
+-- 3. TRIGRAM: ILIKE '%...%' in the agent's free SQL, which no btree can serve
+-- (matters when few or no rows match: otherwise LIMIT stops the seq scan early)
+CREATE INDEX IF NOT EXISTS idx_property_cards_address_trgm ON property_cards USING GIN (address gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_property_cards_title_trgm ON property_cards USING GIN (title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_property_cards_description_trgm ON property_cards USING GIN (description_ai gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_properties_address_trgm ON properties USING GIN (address gin_trgm_ops);
+
+-- Rimossi perché sovrapposti a indici esistenti e senza guadagni misurati:
+-- (zone, price), (zone, rooms, price), properties(zone, price), il parziale su elevator,
+-- la vecchia versione del parziale Affitto su (zone, price) e la GIN jsonb_path_ops su specs.
+DROP INDEX IF EXISTS idx_property_cards_zone_price;
+DROP INDEX IF EXISTS idx_property_cards_zone_rooms_price;
+DROP INDEX IF EXISTS idx_properties_zone_price;
+DROP INDEX IF EXISTS idx_property_cards_rent_zone_price;
+DROP INDEX IF EXISTS idx_property_cards_elevator_price;
+DROP INDEX IF EXISTS idx_property_cards_specs_path;
@@ -0,0 +1,280 @@
+"""
+Semantic search over the listings (description_ai, ai_vibe_tags, title...) with Qdrant.
+- Embedder pluggable via EMBEDDER: "hashing" (default, offline, no API calls) or "openai".
+- Index in Qdrant local mode (QDRANT_PATH, ":memory:" for RAM only) or on a server (QDRANT_URL).
+  Note: local mode on disk can be opened by one process at a time.
+- Payload keeps the structured fields (zone, city, price, rooms) so vector similarity and
+  filters are resolved in the same index lookup.
+"""
+
+import os
+import re
+import hashlib
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv("../secret.env")
+
+EMBEDDER = os.getenv("EMBEDDER", "hashing")
+QDRANT_URL = os.getenv("QDRANT_URL", "")
+QDRANT_PATH = os.getenv("QDRANT_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "qdrant_data"))
+COLLECTION = "properties"
+
+
+# --- EMBEDDERS ---
+class HashingEmbedder:
+    """
+    Offline embedder: feature hashing of words and character trigrams, L2-normalized.
+    Deterministic across processes (md5, not Python's salted hash()).
+    Good enough to match "luminoso"/"luminosa", "cane"/"cani", tags and zone names.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _features(self, text: str) -> Iterable[str]:
+        text = unicodedata.normalize("NFKD", text.lower())
+        text = "".join(c for c in text if not unicodedata.combining(c))
+        for word in re.findall(r"[a-z0-9]+", text):
+            if len(word) < 3:
+                continue
+            yield "w:" + word
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield "t:" + padded[i:i + 3]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.md5(feature.encode("utf-8")).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                sign = 1.0 if digest[4] & 1 else -1.0
+                # Le parole intere pesano più dei trigrammi
+                vectors[row, bucket] += sign * (2.0 if feature[0] == "w" else 1.0)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).tolist()
+
+
+class OpenAIEmbedder:
+    """Embeddings from the OpenAI API (same key used by the chat agent)."""
+
+    def __init__(self, model: str = "text-embedding-3-small", dim: int = 1536):
+        from openai import OpenAI
+        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.model = model
+        self.dim = dim
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        response = self.client.embeddings.create(model=self.model, input=texts)
+        return [item.embedding for item in response.data]
+
+
+EMBEDDERS = {"hashing": HashingEmbedder, "openai": OpenAIEmbedder}
+
+
+def listing_text(row: Dict) -> str:
+    """Text embedded for a listing."""
+    tags = row.get("ai_vibe_tags") or []
+    return " ".join(str(part) for part in (
+        row.get("title"), row.get("zone"), row.get("description_ai"),
+        " ".join(tags), row.get("description_original"),
+    ) if part)
+
+
+# --- INDEX ---
+class SemanticIndex:
+
+    def __init__(self, embedder_name: str = EMBEDDER):
+        self.embedder_name = embedder_name
+        self._embedder = None
+        self._client = None
+        self._lock = threading.Lock()
+        # Ricostruzioni complete in background, richieste ravvicinate accorpate in una sola
+        self._rebuild_lock = threading.Lock()
+        self._rebuilding = False
+        self._rebuild_pending = False
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = EMBEDDERS[self.embedder_name]()
+        return self._embedder
+
+    @property
+    def client(self):
+        # Apertura lazy: importare il modulo non blocca la cartella locale di Qdrant
+        with self._lock:
+            if self._client is None:
+                from qdrant_client import QdrantClient
+                from qdrant_client.models import Distance, VectorParams, PayloadSchemaType
+
+                if QDRANT_URL:
+                    self._client = QdrantClient(url=QDRANT_URL)
+                elif QDRANT_PATH == ":memory:":
+                    self._client = QdrantClient(location=":memory:")
+                else:
+                    self._client = QdrantClient(path=QDRANT_PATH)
+
+                if not self._client.collection_exists(COLLECTION):
+                    self._client.create_collection(
+                        COLLECTION,
+                        vectors_config=VectorParams(size=self.embedder.dim, distance=Distance.COSINE),
+                    )
+                    for field, schema in (("zone", PayloadSchemaType.KEYWORD), ("city", PayloadSchemaType.KEYWORD),
+                                          ("price", PayloadSchemaType.INTEGER), ("rooms", PayloadSchemaType.INTEGER)):
+                        self._client.create_payload_index(COLLECTION, field, field_schema=schema)
+            return self._client
+
+    def upsert(self, rows: List[Dict]) -> None:
+        """Indexes (or re-indexes) listings. Each row needs at least id + the text fields."""
+        from qdrant_client.models import PointStruct
+
+        rows = [r for r in rows if r.get("id")]
+        if not rows:
+            return
+        vectors = self.embedder.embed([listing_text(r) for r in rows])
+        points = [
+            PointStruct(
+                id=str(row["id"]),
+                vector=vector,
+                payload={
+                    "zone": (row.get("zone") or "").lower(),
+                    "city": (row.get("city") or "").lower(),
+                    "price": row.get("price"),
+                    "rooms": row.get("rooms"),
+                },
+            )
+            for row, vector in zip(rows, vectors)
+        ]
+        self.client.upsert(COLLECTION, points=points)
+
+    def delete(self, property_ids: List[str]) -> None:
+        from qdrant_client.models import PointIdsList
+        self.client.delete(COLLECTION, points_selector=PointIdsList(points=property_ids))
+
+    def rebuild(self, engine, batch_size: int = 256) -> int:
+        """Re-indexes the whole catalog reading it from Postgres (and drops listings no longer there)."""
+        from sqlalchemy import text
+
+        query = text("""
+            SELECT id::text AS id, title, zone, city, price, rooms,
+                   description_ai, description_original, ai_vibe_tags
+            FROM properties
+        """)
+        count = 0
+        batch = []
+        seen = set()
+        with engine.connect() as conn:
+            for row in conn.execute(query).mappings():
+                batch.append(dict(row))
+                seen.add(row["id"])
+                if len(batch) >= batch_size:
+                    self.upsert(batch)
+                    count += len(batch)
+                    batch = []
+        self.upsert(batch)
+        count += len(batch)
+        removed = self._prune(seen)
+        print(f"🧭 Semantic index rebuilt: {count} listings" + (f", {removed} removed" if removed else ""))
+        return count
+
+    def _prune(self, keep_ids: set, batch_size: int = 1024) -> int:
+        stale = []
+        offset = None
+        while True:
+            points, offset = self.client.scroll(COLLECTION, limit=batch_size, offset=offset,
+                                                with_payload=False, with_vectors=False)
+            stale.extend(str(p.id) for p in points if str(p.id) not in keep_ids)
+            if offset is None:
+                break
+        for i in range(0, len(stale), batch_size):
+            self.delete(stale[i:i + batch_size])
+        return len(stale)
+
+    def schedule_rebuild(self, engine) -> None:
+        """Full rebuild in a background thread; requests arriving meanwhile trigger one more run."""
+        with self._rebuild_lock:
+            if self._rebuilding:
+                self._rebuild_pending = True
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_loop, args=(engine,), name="semantic-rebuild", daemon=True).start()
+
+    def _rebuild_loop(self, engine) -> None:
+        while True:
+            try:
+                self.rebuild(engine)
+            except Exception as e:
+                print(f"⚠️ Semantic index rebuild failed: {e}")
+            with self._rebuild_lock:
+                if not self._rebuild_pending:
+                    self._rebuilding = False
+                    return
+                self._rebuild_pending = False
+
+    def count(self) -> int:
+        return self.client.count(COLLECTION).count
+
+    def search(self, query: str, zone: Optional[str] = None, city: Optional[str] = None,
+               min_price: Optional[int] = None, max_price: Optional[int] = None,
+               min_rooms: Optional[int] = None, limit: int = 5) -> List[Dict]:
+        """Vector similarity restricted by the structured filters. Returns [{id, score}]."""
+        from qdrant_client.models import FieldCondition, Filter, MatchValue, Range
+
+        must = []
+        if zone:
+            must.append(FieldCondition(key="zone", match=MatchValue(value=zone.lower())))
+        if city:
+            must.append(FieldCondition(key="city", match=MatchValue(value=city.lower())))
+        if min_price is not None or max_price is not None:
+            must.append(FieldCondition(key="price", range=Range(gte=min_price, lte=max_price)))
+        if min_rooms is not None:
+            must.append(FieldCondition(key="rooms", range=Range(gte=min_rooms)))
+
+        vector = self.embedder.embed([query])[0]
+        response = self.client.query_points(
+            COLLECTION, query=vector, query_filter=Filter(must=must) if must else None, limit=limit,
+        )
+        return [{"id": str(point.id), "score": round(point.score, 4)} for point in response.points]
+
+    def on_catalog_change(self, table: str, property_id: Optional[str], engine=None) -> None:
+        """
+        Keeps the index aligned when a listing changes (description_ai, price...).
+        "*" (listener reconnect, bulk loads) schedules a rebuild of the whole index in this process, which is
+        the one holding the local Qdrant folder; changes to properties, property_images or
+        property_cards re-read that listing.
+        """
+        if engine is None:
+            return
+        if table == "*" or property_id is None:
+            self.schedule_rebuild(engine)
+            return
+        from sqlalchemy import text
+        try:
+            with engine.connect() as conn:
+                row = conn.execute(text("""
+                    SELECT id::text AS id, title, zone, city, price, rooms,
+                           description_ai, description_original, ai_vibe_tags
+                    FROM properties WHERE id = CAST(:id AS uuid)
+                """), {"id": property_id}).mappings().first()
+            if row:
+                self.upsert([dict(row)])
+            else:
+                self.delete([property_id])
+        except Exception as e:
+            print(f"⚠️ Semantic index update failed: {e}")
+
+
+# Istanza condivisa
+semantic_index = SemanticIndex()
+
+if __name__ == "__main__":
+    # Ricostruzione completa: python semantic_search.py
+    from sqlalchemy import create_engine
+    semantic_index.rebuild(create_engine(os.getenv("DATABASE_URL")))
@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv("../secret.env")
+
+# Configurazione (sovrascrivibile da secret.env)
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "12"))        # messaggi tenuti per sessione
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "5000")) # sessioni tenute in RAM
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "3600"))   # sessione inattiva -> evict
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "")              # es. "sessions.db" per persistenza
+
+
+class SessionStore:
+    """
+    Conversation history keyed by session id.
+    Each session keeps at most `max_turns` messages; idle sessions expire after `ttl`
+    seconds and the least recently used ones are evicted once `max_sessions` is reached.
+    If `db_path` is set, histories are also written to SQLite and survive restarts.
+    """
+
+    def __init__(self, max_turns: int = SESSION_MAX_TURNS, max_sessions: int = SESSION_MAX_SESSIONS,
+                 ttl: int = SESSION_TTL_SECONDS, db_path: str = SESSION_STORE_PATH):
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                "session_id TEXT PRIMARY KEY, updated_at REAL NOT NULL, history TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    # --- Lettura ---
+    def get_history(self, session_id: str) -> List[Dict]:
+        with self._lock:
+            entry = self._get_entry(session_id)
+            return list(entry["history"]) if entry else []
+
+    # --- Scrittura ---
+    def append(self, session_id: str, role: str, content: str) -> None:
+        with self._lock:
+            entry = self._get_entry(session_id)
+            if entry is None:
+                entry = {"history": [], "updated_at": time.time()}
+                self._sessions[session_id] = entry
+
+            entry["history"].append({"role": role, "content": content})
+            del entry["history"][:-self.max_turns]
+            entry["updated_at"] = time.time()
+            self._sessions.move_to_end(session_id)
+
+            self._evict()
+            self._persist(session_id, entry)
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            if self._db:
+                self._db.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "active_sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "max_turns": self.max_turns,
+                "ttl_seconds": self.ttl,
+                "persistent": self._db is not None,
+            }
+
+    # --- Interni (da chiamare con il lock acquisito) ---
+    def _get_entry(self, session_id: str) -> Optional[Dict]:
+        entry = self._sessions.get(session_id)
+
+        # Cache miss in RAM -> proviamo il disco (sessione sopravvissuta a un riavvio)
+        if entry is None and self._db:
+            row = self._db.execute(
+                "SELECT updated_at, history FROM chat_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row:
+                entry = {"updated_at": row[0], "history": json.loads(row[1])}
+                self._sessions[session_id] = entry
+
+        if entry is None:
+            return None
+
+        if time.time() - entry["updated_at"] > self.ttl:
+            self._sessions.pop(session_id, None)
+            return None
+
+        self._sessions.move_to_end(session_id)
+        return entry
+
+    def _evict(self) -> None:
+        now = time.time()
+        # Le sessioni sono ordinate per ultimo accesso: quelle scadute stanno in testa
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if len(self._sessions) > self.max_sessions or now - oldest["updated_at"] > self.ttl:
+                self._sessions.popitem(last=False)
+            else:
+                break
+
+        if self._db:
+            self._db.execute("DELETE FROM chat_sessions WHERE updated_at < ?", (now - self.ttl,))
+
+    def _persist(self, session_id: str, entry: Dict) -> None:
+        if not self._db:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO chat_sessions (session_id, updated_at, history) VALUES (?, ?, ?)",
+            (session_id, entry["updated_at"], json.dumps(entry["history"], ensure_ascii=False)),
+        )
+        self._db.commit()
+
+
+# Istanza condivisa dal backend
+session_store = SessionStore()
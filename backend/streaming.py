@@ -0,0 +1,61 @@
+import re
+import json
+import asyncio
+from typing import Any, AsyncIterator, Callable, List, Tuple
+
+# Stesso parsing del frontend (parseMessageContent): testo + blocco ```json con le card
+JSON_BLOCK_RE = re.compile(r"```(?:json)?\s*([\s\S]*?)\s*```")
+
+
+def split_reply(full_text: str) -> Tuple[str, List[dict]]:
+    """
+    Splits an agent reply into the Italian summary and the list of property cards.
+    """
+    match = JSON_BLOCK_RE.search(full_text)
+    if match:
+        try:
+            properties = json.loads(match.group(1))
+            if isinstance(properties, dict):
+                properties = [properties]
+            return full_text.replace(match.group(0), "").strip(), properties
+        except json.JSONDecodeError as e:
+            print(f"⚠️ JSON Parse Error (Block): {e}")
+    return full_text.strip(), []
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Formats a single Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def sse_channel() -> Tuple[Callable[[str, Any], None], asyncio.Queue]:
+    """
+    Creates the bridge between a worker thread and an SSE response.
+    The worker calls `emit(event, data)` from its own thread; events land in the queue
+    consumed by `sse_stream`. Must be called from the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def emit(event: str, data: Any) -> None:
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+    return emit, queue
+
+
+async def sse_stream(queue: asyncio.Queue, future: "asyncio.Future") -> AsyncIterator[str]:
+    """Yields the queued events as SSE until the worker future completes."""
+    # Il done_callback viene schedulato dopo tutti gli emit del worker: l'ordine è garantito
+    future.add_done_callback(lambda _: queue.put_nowait(None))
+
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        yield sse_event(*item)
+
+
+async def sse_static(events: List[Tuple[str, Any]]) -> AsyncIterator[str]:
+    """Yields already known events (e.g. a reply produced without the agent)."""
+    for event, data in events:
+        yield sse_event(event, data)
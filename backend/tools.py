@@ -1,10 +1,17 @@
 import os
 import json
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
 from supabase import create_client, Client
 from datapizza.tools import tool
 from datapizza.tools.SQLDatabase import SQLDatabase
 
+import catalog_events
+from query_cache import TTLCache, sql_cache, normalize_sql, is_read_only
+from semantic_search import semantic_index
+from catalog import property_catalog
+
 # Carica le variabili d'ambiente
 load_dotenv("../secret.env")
 
@@ -23,27 +30,316 @@ if not db_uri:
 # Inizializza il tool nativo di Datapizza
 sql_db = SQLDatabase(db_uri=db_uri)
 
+# Engine SQLAlchemy condiviso per le query parametrizzate (pool di connessioni riutilizzate)
+engine = create_engine(db_uri, pool_size=5, max_overflow=5, pool_pre_ping=True)
+
+# Qualsiasi scrittura su properties/property_images (trigger NOTIFY in schema.sql) svuota la cache
+catalog_events.subscribe(lambda table, property_id: sql_cache.clear())
+catalog_events.subscribe(property_catalog.on_catalog_change)
+catalog_events.subscribe(lambda table, property_id: semantic_index.on_catalog_change(table, property_id, engine))
+
+# Cache per-id dei dettagli (riga completa di property_cards), alimentata anche dai risultati di ricerca
+details_cache = TTLCache(ttl=int(os.getenv("DETAILS_CACHE_TTL", "60")), max_entries=5000, name="details")
+
+def _invalidate_details(table: str, property_id: Optional[str]) -> None:
+    if property_id is None:
+        details_cache.clear()
+    else:
+        details_cache.delete(property_id)
+
+catalog_events.subscribe(_invalidate_details)
+
+@tool
+def run_sql_query(query: str) -> str:
+    """
+    Runs a read-only SQL query on the real estate database and returns the rows.
+    Identical queries asked recently are served from cache.
+    """
+    key = normalize_sql(query)
+    if not is_read_only(key):
+        return sql_db.run_sql_query(query)
+
+    cached = sql_cache.get(("sql", key))
+    if cached is not None:
+        print("⚡ SQL cache hit")
+        return cached
+
+    result = sql_db.run_sql_query(query)
+    # Non mettiamo in cache gli errori
+    if not str(result).lower().startswith("error"):
+        sql_cache.set(("sql", key), result)
+    return result
+
 # 3. Tool ausiliario per dettagli specifici (opzionale, ma utile per formattazione precisa)
+def fetch_property_details(property_ids: List[str]) -> Dict[str, dict]:
+    """
+    Full `property_cards` rows for the given ids.
+    Ids seen recently (details or search results) come from memory; the others are
+    fetched together in a single Supabase round trip.
+    """
+    found = {}
+    missing = []
+    for pid in dict.fromkeys(property_ids):
+        cached = details_cache.get(pid)
+        if cached is not None:
+            found[pid] = cached
+        else:
+            missing.append(pid)
+
+    if missing:
+        # Una sola riga del read model per id: card + galleria ordinata (url, room_type, is_main)
+        response = supabase.table("property_cards")\
+            .select("*")\
+            .in_("id", missing)\
+            .execute()
+        for row in response.data or []:
+            details_cache.set(str(row["id"]), row)
+            found[str(row["id"])] = row
+
+    return found
+
 @tool
 def get_property_details(property_id: str) -> str:
     """
     Retrieves full details for a specific property ID, including all images.
     Useful when you need to show the final card to the user.
+    For several properties use get_properties_details instead.
     """
     print(f"🔍 Getting details for property: {property_id}")
     
     try:
-        response = supabase.table("properties")\
-            .select("*, property_images(storage_url, room_type, is_main)")\
-            .eq("id", property_id)\
-            .execute()
-        
-        if response.data and len(response.data) > 0:
-            prop = response.data[0]
+        prop = fetch_property_details([property_id]).get(property_id)
+        if prop:
             return json.dumps(prop, default=str)
             
         return json.dumps({"error": "Property not found"})
         
     except Exception as e:
         print(f"Supabase error: {e}")
-        return json.dumps({"error": str(e)})
\ No newline at end of file
+        return json.dumps({"error": str(e)})
+
+@tool
+def get_properties_details(property_ids: list[str]) -> str:
+    """
+    Retrieves full details (including all images) for several property IDs in one call.
+    Always prefer this to calling get_property_details once per property.
+    """
+    print(f"🔍 Getting details for {len(property_ids)} properties")
+
+    try:
+        details = fetch_property_details(property_ids)
+        return json.dumps([details[pid] for pid in property_ids if pid in details], default=str)
+    except Exception as e:
+        print(f"Supabase error: {e}")
+        return json.dumps({"error": str(e)})
+
+
+# 4. Ricerca deterministica: query preparata al posto dell'SQL scritto dall'LLM
+# Le card sono lette dal read model `property_cards` (vedi schema.sql): una riga = una card
+CARD_COLUMNS = """
+    p.id::text AS id, p.title, p.city, p.zone, p.address, p.price,
+    p.rooms, p.bathrooms, p.sqm, p.floor, p.total_floors, p.elevator,
+    p.specs, p.description_ai, p.main_image, p.images, p.ai_vibe_tags, p.gallery
+"""
+
+# Campi letti per la cache dei dettagli ma non inviati nelle card (risparmio token)
+DETAIL_ONLY_FIELDS = ("ai_vibe_tags", "gallery")
+
+def _as_cards(rows: List[dict]) -> List[dict]:
+    """Primes the details cache with the full rows and returns the UI cards."""
+    cards = []
+    for row in rows:
+        details_cache.set(row["id"], row)
+        cards.append({k: v for k, v in row.items() if k not in DETAIL_ONLY_FIELDS})
+    return cards
+
+SORT_OPTIONS = {
+    "price_asc": "p.price ASC",
+    "price_desc": "p.price DESC",
+    "sqm_desc": "p.sqm DESC",
+}
+
+def _fetch_cards(where: str, params: dict, order_by: str) -> List[dict]:
+    """Reads the matching rows of `property_cards`: no join, no aggregation per request."""
+    query = text(f"""
+        SELECT {CARD_COLUMNS}
+        FROM property_cards p
+        WHERE {where}
+        ORDER BY {order_by}
+        LIMIT :limit
+    """)
+
+    with engine.connect() as conn:
+        rows = conn.execute(query, params).mappings().all()
+
+    cards = []
+    for row in rows:
+        card = dict(row)
+        card["images"] = list(card.get("images") or [])
+        card["main_image"] = card.get("main_image") or (card["images"][0] if card["images"] else None)
+        cards.append(card)
+    return _as_cards(cards)
+
+def get_property_cards(property_ids: List[str]) -> List[dict]:
+    """Cards for the given ids, in the same order (unknown ids are skipped)."""
+    if not property_ids:
+        return []
+    if property_catalog.ready:
+        cards = _as_cards(property_catalog.get_cards(property_ids))
+    else:
+        cards = _fetch_cards("p.id = ANY(CAST(:ids AS uuid[]))", {"ids": list(property_ids), "limit": len(property_ids)}, "p.id")
+    by_id = {c["id"]: c for c in cards}
+    return [by_id[pid] for pid in property_ids if pid in by_id]
+
+def search_property_cards(
+    city: Optional[str] = None,
+    zone: Optional[str] = None,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    min_rooms: Optional[int] = None,
+    max_rooms: Optional[int] = None,
+    min_bathrooms: Optional[int] = None,
+    min_sqm: Optional[int] = None,
+    elevator: Optional[bool] = None,
+    specs: Optional[Dict[str, str]] = None,
+    sort: str = "price_asc",
+    limit: int = 5,
+) -> List[dict]:
+    """
+    Runs the parameterized search and returns cards in the exact shape the frontend expects.
+    Filters run on `property_cards` (zone/price/rooms indexes, GIN on specs).
+    If the in-memory catalog is loaded (CATALOG_IN_MEMORY=true) the query never reaches Postgres.
+    """
+    if property_catalog.ready:
+        return _as_cards(property_catalog.search(
+            city=city, zone=zone, min_price=min_price, max_price=max_price, min_rooms=min_rooms,
+            max_rooms=max_rooms, min_bathrooms=min_bathrooms, min_sqm=min_sqm, elevator=elevator,
+            specs=specs, sort=sort, limit=limit,
+        ))
+
+    conditions = []
+    params = {"limit": max(1, min(int(limit), 20))}
+
+    if city:
+        conditions.append("lower(p.city) = lower(:city)")
+        params["city"] = city
+    if zone:
+        conditions.append("lower(p.zone) = lower(:zone)")
+        params["zone"] = zone
+    if min_price is not None:
+        conditions.append("p.price >= :min_price")
+        params["min_price"] = min_price
+    if max_price is not None:
+        conditions.append("p.price <= :max_price")
+        params["max_price"] = max_price
+    if min_rooms is not None:
+        conditions.append("p.rooms >= :min_rooms")
+        params["min_rooms"] = min_rooms
+    if max_rooms is not None:
+        conditions.append("p.rooms <= :max_rooms")
+        params["max_rooms"] = max_rooms
+    if min_bathrooms is not None:
+        conditions.append("p.bathrooms >= :min_bathrooms")
+        params["min_bathrooms"] = min_bathrooms
+    if min_sqm is not None:
+        conditions.append("p.sqm >= :min_sqm")
+        params["min_sqm"] = min_sqm
+    if elevator is not None:
+        conditions.append("p.elevator = :elevator")
+        params["elevator"] = elevator
+    if specs:
+        # Un "@>" per chiave: il filtro sul contratto combacia con gli indici parziali di search_indexes.sql
+        for i, (key, value) in enumerate(sorted(specs.items())):
+            conditions.append(f"p.specs @> CAST(:specs_{i} AS jsonb)")
+            params[f"specs_{i}"] = json.dumps({key: value})
+
+    where = " AND ".join(conditions) if conditions else "TRUE"
+    order_by = SORT_OPTIONS.get(sort, SORT_OPTIONS["price_asc"])
+
+    cache_key = ("search", where, order_by, tuple(sorted(params.items())))
+    cached = sql_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    cards = _fetch_cards(where, params, order_by)
+    sql_cache.set(cache_key, cards)
+    return cards
+
+@tool
+def search_properties(
+    city: str = "",
+    zone: str = "",
+    min_price: int = 0,
+    max_price: int = 0,
+    min_rooms: int = 0,
+    max_rooms: int = 0,
+    min_bathrooms: int = 0,
+    min_sqm: int = 0,
+    elevator: str = "",
+    contract: str = "",
+    heating: str = "",
+    furnished: str = "",
+    sort: str = "price_asc",
+    limit: int = 5,
+) -> str:
+    """
+    Searches properties with structured filters and returns ready-to-use UI cards (JSON list).
+    Use this for every standard search instead of writing SQL.
+    Leave a filter empty/0 to ignore it. elevator: "yes" or "no".
+    contract: "Vendita" or "Affitto". heating: "Autonomo" or "Centralizzato".
+    sort: "price_asc", "price_desc" or "sqm_desc".
+    """
+    print(f"🔎 search_properties: zone={zone} city={city} price={min_price}-{max_price} rooms={min_rooms}-{max_rooms}")
+
+    specs = {k: v for k, v in {"contract": contract, "heating": heating, "furnished": furnished}.items() if v}
+    try:
+        cards = search_property_cards(
+            city=city or None,
+            zone=zone or None,
+            min_price=min_price or None,
+            max_price=max_price or None,
+            min_rooms=min_rooms or None,
+            max_rooms=max_rooms or None,
+            min_bathrooms=min_bathrooms or None,
+            min_sqm=min_sqm or None,
+            elevator={"yes": True, "no": False}.get(elevator.strip().lower()) if elevator else None,
+            specs=specs or None,
+            sort=sort,
+            limit=limit or 5,
+        )
+        return json.dumps(cards, default=str, ensure_ascii=False)
+    except Exception as e:
+        print(f"Search error: {e}")
+        return json.dumps({"error": str(e)})
+
+@tool
+def semantic_search_properties(
+    query: str,
+    zone: str = "",
+    city: str = "",
+    min_price: int = 0,
+    max_price: int = 0,
+    min_rooms: int = 0,
+    limit: int = 5,
+) -> str:
+    """
+    Finds properties matching a free-text description of vibe/lifestyle
+    (e.g. "luminoso, adatto a famiglie con cane"), optionally restricted by zone, city, budget, rooms.
+    Returns ready-to-use UI cards (JSON list) ordered by relevance. Leave a filter empty/0 to ignore it.
+    """
+    print(f"🧭 semantic_search_properties: '{query}' zone={zone} price={min_price}-{max_price}")
+    try:
+        hits = semantic_index.search(
+            query,
+            zone=zone or None,
+            city=city or None,
+            min_price=min_price or None,
+            max_price=max_price or None,
+            min_rooms=min_rooms or None,
+            limit=max(1, min(limit or 5, 20)),
+        )
+        cards = get_property_cards([h["id"] for h in hits])
+        return json.dumps(cards, default=str, ensure_ascii=False)
+    except Exception as e:
+        print(f"Semantic search error: {e}")
+        return json.dumps({"error": str(e)})
@@ -135,22 +135,53 @@ const RenovationPanel = ({ property, image, onClose }: { property: Property, ima
     const [mode, setMode] = useState<'room' | 'house'>('room');
     const [loading, setLoading] = useState(false);
     const [result, setResult] = useState<any>(null);
+    const [progress, setProgress] = useState<{ completed: number, total: number } | null>(null);
 
     // State for browsing generated gallery
     const [selectedRenovatedImage, setSelectedRenovatedImage] = useState<string | null>(null);
     const [expandedQuote, setExpandedQuote] = useState<number | null>(null);
     const [isComparing, setIsComparing] = useState(false);
 
+    // Job di generazione in corso (per aggiornamenti SSE e annullamento)
+    const jobRef = useRef<{ id: string, events: EventSource } | null>(null);
+
+    const withHost = (url: string) => url && url.startsWith('/') ? "http://localhost:8000" + url : url;
+
+    const cancelJob = () => {
+        const job = jobRef.current;
+        if (!job) return;
+        job.events.close();
+        jobRef.current = null;
+        fetch(`http://localhost:8000/api/renovate/jobs/${job.id}`, { method: "DELETE" }).catch(() => { });
+    };
+
+    useEffect(() => cancelJob, []);
+
+    const applyJob = (job: any) => {
+        if (!job.renovated_image_url) return;
+        const data = {
+            ...job,
+            renovated_image_url: withHost(job.renovated_image_url),
+            renovated_gallery: (job.renovated_gallery || []).map(withHost),
+        };
+        setResult(data);
+        // Mostriamo la prima stanza pronta mentre le altre sono ancora in generazione
+        setSelectedRenovatedImage(current => current || data.renovated_image_url);
+        setLoading(false);
+    };
+
     const handleGenerate = async () => {
+        cancelJob();
         setLoading(true);
         setResult(null);
         setSelectedRenovatedImage(null);
+        setProgress(null);
 
         // Se intera casa, prendiamo tutte le immagini, altrimenti solo quella attuale
         const galleryImages = property.images && property.images.length > 0 ? property.images : [property.main_image];
 
         try {
-            const res = await fetch("http://localhost:8000/api/renovate", {
+            const res = await fetch("http://localhost:8000/api/renovate/jobs", {
                 method: "POST", headers: { "Content-Type": "application/json" },
                 body: JSON.stringify({
                     image_url: image,
@@ -168,20 +199,36 @@ const RenovationPanel = ({ property, image, onClose }: { property: Property, ima
                 throw new Error("Failed to renovate");
             }
 
-            const data = await res.json();
-
-            // Fix URL relativi
-            if (data.renovated_image_url.startsWith('/')) data.renovated_image_url = "http://localhost:8000" + data.renovated_image_url;
-            if (data.renovated_gallery) {
-                data.renovated_gallery = data.renovated_gallery.map((url: string) =>
-                    url.startsWith('/') ? "http://localhost:8000" + url : url
-                );
-            }
-
-            setResult(data);
-            setSelectedRenovatedImage(data.renovated_image_url);
-        } catch (e) { console.error(e); }
-        setLoading(false);
+            const { job_id } = await res.json();
+
+            // Ogni stanza arriva appena pronta (eventi SSE del job)
+            const events = new EventSource(`http://localhost:8000/api/renovate/jobs/${job_id}/events`);
+            jobRef.current = { id: job_id, events };
+
+            const onUpdate = (e: MessageEvent) => {
+                const { job } = JSON.parse(e.data);
+                setProgress({ completed: job.completed, total: job.total });
+                applyJob(job);
+            };
+            const onEnd = (e: MessageEvent) => {
+                onUpdate(e);
+                events.close();
+                jobRef.current = null;
+                setProgress(null);
+                setLoading(false);
+            };
+            events.addEventListener("status", onUpdate);
+            events.addEventListener("image", onUpdate);
+            ["done", "failed", "cancelled"].forEach(name => events.addEventListener(name, onEnd as EventListener));
+            events.onerror = () => {
+                events.close();
+                jobRef.current = null;
+                setLoading(false);
+            };
+        } catch (e) {
+            console.error(e);
+            setLoading(false);
+        }
     };
 
     // Determine what image to show
@@ -196,7 +243,7 @@ const RenovationPanel = ({ property, image, onClose }: { property: Property, ima
 
             {/* LEFT: CANVAS */}
             <div className="flex-1 relative bg-black flex items-center justify-center overflow-hidden select-none">
-                <button onClick={onClose} className="absolute top-4 right-4 z-50 text-white bg-black/40 p-2 rounded-full hover:bg-black/60"><X size={20} /></button>
+                <button onClick={() => { cancelJob(); onClose(); }} className="absolute top-4 right-4 z-50 text-white bg-black/40 p-2 rounded-full hover:bg-black/60"><X size={20} /></button>
 
                 {/* Mode Switcher */}
                 <div className="absolute top-4 left-4 z-50 bg-white/90 backdrop-blur-md rounded-lg p-1 flex shadow-lg border border-white/20">
@@ -215,6 +262,13 @@ const RenovationPanel = ({ property, image, onClose }: { property: Property, ima
                     <div className="relative w-full h-full flex items-center justify-center">
                         <img src={displayImage} className="w-full h-full object-contain" alt="Renovation" draggable="false" />
 
+                        {/* Job Progress (altre stanze ancora in generazione) */}
+                        {progress && progress.completed < progress.total && (
+                            <div className="absolute top-20 left-4 bg-black/60 text-white text-xs font-bold px-3 py-1.5 rounded-full flex items-center gap-2">
+                                <Wand2 size={14} className="animate-spin" /> {progress.completed}/{progress.total} ambienti pronti
+                            </div>
+                        )}
+
                         {/* Compare Button */}
                         {result && (
                             <button
@@ -244,7 +298,8 @@ const RenovationPanel = ({ property, image, onClose }: { property: Property, ima
                                         onClick={() => setSelectedRenovatedImage(img)}
                                         className={`w-16 h-16 rounded-lg border-2 overflow-hidden shadow-lg cursor-pointer transition-all hover:scale-105 ${selectedRenovatedImage === img ? 'border-[#E31B23] scale-105' : 'border-white'}`}
                                     >
-                                        <img src={img} className="w-full h-full object-cover" />
+                                        {/* Miniatura: la variante più piccola del render, se disponibile */}
+                                        <img src={result.renovated_variants?.[i]?.thumb || img} className="w-full h-full object-cover" />
                                     </div>
                                 ))}
                             </div>
@@ -319,6 +374,7 @@ export function ChatInterface() {
 
     const [currentImageIndex, setCurrentImageIndex] = useState(0);
     const textareaRef = useRef<HTMLTextAreaElement>(null);
+    const sessionIdRef = useRef<string | null>(null);
 
     useEffect(() => { setCurrentImageIndex(0); }, [selectedProperty]);
 
@@ -346,17 +402,44 @@ export function ChatInterface() {
         if (textareaRef.current) textareaRef.current.style.height = 'auto';
 
         try {
-            const response = await fetch("http://localhost:8000/api/chat", {
+            const response = await fetch("http://localhost:8000/api/chat/stream", {
                 method: "POST", headers: { "Content-Type": "application/json" },
-                body: JSON.stringify({ message: input }),
+                body: JSON.stringify({ message: input, session_id: sessionIdRef.current }),
             });
-            if (!response.ok) throw new Error("Server Error");
-            const rawText = await response.text();
-            const { text, properties: fetchedProps } = parseMessageContent(rawText);
-            setAiMessage(text);
+            if (!response.ok || !response.body) throw new Error("Server Error");
+            sessionIdRef.current = response.headers.get("X-Session-Id") ?? sessionIdRef.current;
             setInput("");
-            if (fetchedProps && fetchedProps.length > 0) {
-                setProperties(fetchedProps);
+
+            // Server-Sent Events: testo in arrivo, poi le card come evento separato
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = "";
+            let text = "";
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const events = buffer.split("\n\n");
+                buffer = events.pop() ?? "";
+                for (const raw of events) {
+                    const event = raw.match(/^event: (.*)$/m)?.[1];
+                    const data = raw.match(/^data: (.*)$/m)?.[1];
+                    if (!event || !data) continue;
+                    const payload = JSON.parse(data);
+                    if (event === "text") {
+                        text += payload.delta;
+                        setAiMessage(text);
+                        setIsLoading(false);
+                    } else if (event === "text_reset") {
+                        // Preambolo di uno step con tool call: arriverà la risposta vera
+                        text = "";
+                        setAiMessage(text);
+                    } else if (event === "properties" && payload.length > 0) {
+                        setProperties(payload);
+                    } else if (event === "error") {
+                        throw new Error(payload.message);
+                    }
+                }
             }
         } catch (error) {
             console.error(error);